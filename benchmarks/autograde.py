@@ -0,0 +1,77 @@
+"""Auto-grading throughput for one large assignment as the worker count grows.
+
+Run from the repository root:
+    python -m benchmarks.autograde                     # 2,000 submissions, 1..cpu_count workers
+    python -m benchmarks.autograde --submissions 10000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from models.autograder import AutoGrader, KeywordGrader, RegexGrader, ReferenceGrader
+from models.content_models import Assignment, Submission
+from models.course_models import Course
+from models.database_manager import DatabaseManager
+from models.registry import Registry
+from models.user_models import Instructor, Student
+from .synthetic import WORDS
+
+GRADERS = {
+    "keyword": lambda: KeywordGrader({"entropy": 2, "heap": 1, "binary search": 2, "kernel": 1}),
+    "regex": lambda: RegexGrader([(r"\bO\(n log n\)", 2), (r"\b(heap|tree)s?\b.*\bqueue", 1), (r"\d+\s*ms", 1)]),
+    "reference": lambda: ReferenceGrader(" ".join(WORDS[:12])),
+}
+
+
+def build(db, submissions, words, seed):
+    rng = random.Random(seed)
+    registry = Registry()
+    registry.db, db.registry = db, registry
+    teacher = Instructor("inst0", "secret", "inst0@gmail.com")
+    registry.add_user(teacher)
+    course = Course(registry.next_course_id(), "Essays", teacher)
+    registry.add_course(course)
+    assignment = Assignment("Essay", "Long answer", "2025-06-01 23:59", 20)
+    course.assignments.append(assignment)
+    for i in range(submissions):
+        s = Student(f"stud{i}", "secret", f"stud{i}@gmail.com")
+        registry.add_user(s)
+        course.add_student(s)
+        course.submissions.append(Submission(s, course, assignment, " ".join(rng.choices(WORDS, k=words))))
+    db.save_full_state(registry.users, registry.courses, [])
+    return course, assignment
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time auto-grading across worker counts.")
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=400, help="words per submission")
+    parser.add_argument("--grader", choices=sorted(GRADERS), default="reference")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DatabaseManager.DB_NAME = os.path.join(tmp, "lms_data.db")
+        db = DatabaseManager()
+        course, assignment = build(db, args.submissions, args.words, args.seed)
+        print(f"{args.submissions} submissions of {args.words} words, {args.grader} grader, "
+              f"{os.cpu_count()} CPUs")
+        base = None
+        for workers in args.workers:
+            grader = AutoGrader(db, GRADERS[args.grader](), workers=workers)
+            start = time.perf_counter()
+            stats = grader.grade(course.cid, assignment.title, regrade=True)
+            seconds = time.perf_counter() - start
+            base = base or seconds
+            print(f"  {workers:>3} workers  {seconds:7.2f}s  {stats.graded / seconds:9,.0f}/s  x{base / seconds:.2f}")
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Shows that load_full_state issues a constant number of queries.
+
+Run from the repository root:  python -m benchmarks.load_queries
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from models.blob_store import pack
+from models.database_manager import DatabaseManager
+from models.timestamps import parse_deadline
+
+
+def count_selects(db):
+    statements = []
+
+    def trace(sql):
+        if sql.lstrip().upper().startswith("SELECT"):
+            statements.append(sql)
+
+    with db.pool.reader() as conn:
+        conn.set_trace_callback(trace)
+        db.load_full_state()
+        conn.set_trace_callback(None)
+    return len(statements)
+
+
+def populate(path, students, seed=7):
+    rng = random.Random(seed)
+    courses = max(1, students // 50)
+    con = sqlite3.connect(path)
+    con.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                    [(f"inst{i}", "secret", f"inst{i}@gmail.com", "Instructor") for i in range(courses)]
+                    + [(f"stud{i}", "secret", f"stud{i}@gmail.com", "Student") for i in range(students)])
+    con.executemany("INSERT INTO courses VALUES (?, ?, ?)",
+                    [(str(100 + i), f"Course {i}", f"inst{i}") for i in range(courses)])
+    enrollments, assignments, grades, submissions, messages = [], [], [], [], []
+    answer = pack("answer")
+    due = parse_deadline("2025-06-01")
+    con.execute("INSERT INTO blobs (hash, size, data) VALUES (?, ?, ?)", answer)
+    for i in range(students):
+        for cid in rng.sample(range(courses), min(3, courses)):
+            enrollments.append((f"stud{i}", str(100 + cid)))
+        messages.append(("inst0", f"stud{i}", "Welcome", "Hello", 1735722000, 0))
+    for c in range(courses):
+        for a in range(4):
+            assignments.append((len(assignments) + 1, str(100 + c), f"HW{a}", "", "2025-06-01", 10, due))
+    by_course = {}
+    for student, cid in enrollments:
+        by_course.setdefault(cid, []).append(student)
+    for aid, cid, title, *_ in assignments:
+        for student in by_course.get(cid, []):
+            submissions.append((cid, title, student, answer[0], answer[1], 1746093600, 1))
+            grades.append((aid, student, rng.randint(0, 10)))
+    con.executemany("INSERT INTO enrollments VALUES (?, ?)", enrollments)
+    con.executemany("INSERT INTO assignments (id, course_cid, title, description, deadline, max_marks, due_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", assignments)
+    con.executemany("INSERT INTO assignment_grades VALUES (?, ?, ?)", grades)
+    con.executemany("INSERT INTO submissions (course_cid, assignment_title, student_username, content_hash, content_size,"
+                    " submitted_at, is_graded) VALUES (?, ?, ?, ?, ?, ?, ?)", submissions)
+    con.executemany("INSERT INTO messages (sender, recipient, subject, body, sent_at, is_read)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", messages)
+    con.commit()
+    con.close()
+
+
+def main():
+    print(f"{'students':>9} {'queries':>8} {'seconds':>8}")
+    for students in (100, 1000, 10000):
+        with tempfile.TemporaryDirectory() as tmp:
+            DatabaseManager.DB_NAME = os.path.join(tmp, "lms_data.db")
+            db = DatabaseManager()
+            populate(DatabaseManager.DB_NAME, students)
+            start = time.perf_counter()
+            queries = count_selects(db)
+            print(f"{students:>9} {queries:>8} {time.perf_counter() - start:>8.3f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Concurrent load against the JSON service; reports latency percentiles and throughput.
+
+Run from the repository root:
+    python -m benchmarks.load_service                        # seeds 2,000 students, starts a service
+    python -m benchmarks.load_service --clients 200 --duration 30 --readers 16
+    python -m benchmarks.load_service --url http://127.0.0.1:8080   # a running service on synthetic data
+
+Each client logs in as a student (a tenth as instructors) and loops over
+a mix of reads and writes on one keep-alive connection. The service runs
+in its own process so the generator does not share its GIL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlsplit
+
+from models.database_manager import DatabaseManager
+from .synthetic import generate, shape, _text, WORDS
+
+STUDENT_MIX = (("courses", 30), ("course", 25), ("inbox", 15), ("search", 5), ("submit", 15), ("message", 10))
+INSTRUCTOR_MIX = (("courses", 30), ("submissions", 40), ("grade", 30))
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+        self.token = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        auth = f"Authorization: Bearer {self.token}\r\n" if self.token else ""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n{auth}"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length)) if length else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def user_loop(client, username, role, students, deadline, samples, errors, rng):
+    status, body = await client.request("POST", "/login", {"username": username, "password": "secret"})
+    if status != 200:
+        errors["login"] += 1
+        return
+    client.token = body["token"]
+    _, body = await client.request("GET", "/courses")
+    courses = [c["cid"] for c in body["courses"]] or ["100"]
+    mix = STUDENT_MIX if role == "Student" else INSTRUCTOR_MIX
+    kinds, weights = zip(*mix)
+    seen = {}  # cid -> (assignment titles, students who submitted)
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        cid = rng.choice(courses)
+        titles = seen.get(cid, (["HW0"], []))[0]
+        start = time.perf_counter()
+        if kind == "courses":
+            status, _ = await client.request("GET", "/courses")
+        elif kind == "course":
+            status, body = await client.request("GET", f"/courses/{cid}")
+            if status == 200:
+                seen[cid] = ([a["title"] for a in body["assignments"]] or ["HW0"], seen.get(cid, ([], []))[1])
+        elif kind == "inbox":
+            status, _ = await client.request("GET", "/inbox?limit=20")
+        elif kind == "search":
+            status, _ = await client.request("GET", f"/search?q={rng.choice(WORDS)}&limit=10")
+        elif kind == "submit":
+            status, _ = await client.request("POST", f"/courses/{cid}/assignments/{quote(rng.choice(titles))}/submission",
+                                             {"content": _text(rng, 60)})
+        elif kind == "message":
+            status, _ = await client.request("POST", "/messages", {"to": f"stud{rng.randrange(students)}",
+                                                                   "subject": "Hi", "body": _text(rng, 10)})
+        elif kind == "submissions":
+            title = rng.choice(titles)
+            status, body = await client.request("GET", f"/courses/{cid}/assignments/{quote(title)}/submissions")
+            if status == 200:
+                seen[cid] = (titles, [(title, s["student"]) for s in body["submissions"]][:50])
+        else:
+            graded = seen.get(cid, ([], []))[1]
+            if not graded:
+                continue
+            title, student = rng.choice(graded)
+            status, _ = await client.request("POST", f"/courses/{cid}/assignments/{quote(title)}/grades",
+                                             {"student": student, "score": rng.randint(0, 10)})
+        samples[kind].append(time.perf_counter() - start)
+        if status >= 500 or status in (401, 405):
+            errors[kind] += 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def run(host, port, clients, duration, students, seed):
+    rng = random.Random(seed)
+    instructors = max(1, shape(students)["instructors"])
+    samples, errors = defaultdict(list), defaultdict(int)
+    conns = [Client(host, port) for _ in range(clients)]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        user_loop(c, *((f"inst{i % instructors}", "Instructor") if i % 10 == 9 else
+                       (f"stud{rng.randrange(students)}", "Student")),
+                  students, deadline, samples, errors, random.Random(seed + i))
+        for i, c in enumerate(conns)))
+    elapsed = time.perf_counter() - start
+    for c in conns:
+        c.close()
+    return samples, errors, elapsed
+
+
+def report(samples, errors, elapsed, clients):
+    every = [s for values in samples.values() for s in values]
+    print(f"\n{len(every)} requests from {clients} clients in {elapsed:.1f}s: {len(every) / elapsed:,.0f} req/s")
+    print(f"  {'endpoint':<12} {'count':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for kind in sorted(samples, key=lambda k: -len(samples[k])) + ["all"]:
+        values = every if kind == "all" else samples[kind]
+        errs = sum(errors.values()) if kind == "all" else errors.get(kind, 0)
+        print(f"  {kind:<12} {len(values):>8} {percentile(values, 0.5) * 1000:>9.2f} "
+              f"{percentile(values, 0.99) * 1000:>9.2f} {max(values, default=0) * 1000:>9.2f} {errs:>7}")
+    return {"requests": len(every), "seconds": elapsed, "rps": len(every) / elapsed,
+            "p50_ms": percentile(every, 0.5) * 1000, "p99_ms": percentile(every, 0.99) * 1000,
+            "errors": dict(errors)}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(host, port, timeout=60):
+    until = time.monotonic() + timeout
+    while time.monotonic() < until:
+        try:
+            status, _ = await Client(host, port).request("GET", "/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("service did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the JSON service.")
+    parser.add_argument("--url", help="test a running service instead of starting one")
+    parser.add_argument("--students", type=int, default=2000, help="size of the seeded dataset")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--readers", type=int, default=8, help="service read threads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the summary here as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            path = os.path.join(tmp, "lms_data.db")
+            DatabaseManager.DB_NAME = path
+            db = DatabaseManager()
+            users, courses, logs = generate(db, args.students, args.seed)
+            db.save_full_state(users, courses, logs)
+            db.close()
+            host, port = "127.0.0.1", free_port()
+            server = subprocess.Popen([sys.executable, "-m", "models.service", "--db", path, "--host", host,
+                                       "--port", str(port), "--readers", str(args.readers)])
+        try:
+            asyncio.run(wait_ready(host, port))
+            print(f"{args.clients} clients for {args.duration:.0f}s against http://{host}:{port}", file=sys.stderr)
+            samples, errors, elapsed = asyncio.run(run(host, port, args.clients, args.duration,
+                                                       args.students, args.seed))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(30)
+    summary = report(samples, errors, elapsed, args.clients)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if sum(errors.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
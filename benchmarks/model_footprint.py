@@ -0,0 +1,45 @@
+"""Construction time and resident size of one million PrivateMessage objects.
+
+Run from the repository root:  python -m benchmarks.model_footprint [count]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from models.change_tracker import tracker
+from models.user_models import PrivateMessage
+
+
+def build_new(n):
+    with tracker.paused():
+        return [PrivateMessage("alice", "Subject", "Body") for _ in range(n)]
+
+
+def build_restored(n):
+    return [PrivateMessage.restore(i, "alice", "bob", "Subject", "Body", 1735722000, False) for i in range(n)]
+
+
+def measure(label, build, n):
+    gc.collect()
+    start = time.perf_counter()
+    items = build(n)
+    elapsed = time.perf_counter() - start
+    del items
+    gc.collect()
+    tracemalloc.start()
+    items = build(n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    print(f"{label:<10} {elapsed:>7.2f}s {size / 2**20:>8.0f} MB {size / n:>7.0f} B/object")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    measure("new", build_new, n)
+    measure("restored", build_restored, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Times the persistence and model hot paths on seeded synthetic data.
+
+Run from the repository root:
+    python -m benchmarks.suite                                   # 1k and 10k students
+    python -m benchmarks.suite --scales 1000 10000 100000 --out results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json   # exit 1 on a regression
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+
+Metric names end in their unit: _s seconds, _ms milliseconds, _us
+microseconds per call, _mb peak traced memory. Timings come from a pass
+without tracemalloc; peaks from a second pass with it.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from models.change_tracker import tracker
+from models.database_manager import DatabaseManager
+from models.report_models import CourseReport
+from .synthetic import generate, churn, shape
+
+DEFAULT_SCALES = (1000, 10000)
+TOLERANCE = 0.25
+# Differences below these never count as regressions; small numbers are noisy
+FLOORS = {"_s": 0.02, "_ms": 0.5, "_us": 0.3, "_mb": 2.0}
+
+
+def fresh_db(path):
+    if os.path.exists(path):
+        os.remove(path)
+    DatabaseManager.DB_NAME = path
+    return DatabaseManager()
+
+
+def timed(fn, *args, **kw):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn(*args, **kw)
+    return result, time.perf_counter() - start
+
+
+def per_call_us(fn, items, repeat=5):
+    """Best-of-repeat microseconds per call of fn(item)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best / max(len(items), 1) * 1e6
+
+
+def time_scale(students, seed, tmp):
+    r = {}
+    db = fresh_db(os.path.join(tmp, f"time-{students}.db"))
+    (users, courses, logs), r["generate_s"] = timed(generate, db, students, seed)
+    _, r["save_full_s"] = timed(db.save_full_state, users, courses, logs)
+    churn(users.registry, random.Random(seed))
+    _, r["save_churn_s"] = timed(db.save_full_state, users, courses, logs)
+    del users, courses, logs
+
+    _, r["load_lazy_s"] = timed(db.load_full_state, lazy=True)
+    (users, courses, logs), r["load_eager_s"] = timed(db.load_full_state)
+    registry = users.registry
+    rng = random.Random(seed)
+
+    # Course.has_submitted over a mix of hits and misses
+    course_list = list(courses)
+    pairs = [(c, s.get_username(), a.title) for c in rng.sample(course_list, min(50, len(course_list)))
+             for s in list(c.students)[:40] for a in c.assignments]
+    r["has_submitted_us"] = per_call_us(lambda p: p[0].has_submitted(p[1], p[2]), pairs)
+
+    # Course.add_student for students not yet enrolled; undone untimed
+    students_list = list(registry.users_by_role("Student"))
+    adds = []
+    for _ in range(2000):
+        c, s = rng.choice(course_list), rng.choice(students_list)
+        if not c.is_enrolled(s.get_username()):
+            adds.append((c, s))
+    start = time.perf_counter()
+    for c, s in adds:
+        c.add_student(s)
+    r["add_student_us"] = (time.perf_counter() - start) / max(len(adds), 1) * 1e6
+    for c, s in adds:
+        c.remove_student(s)
+    tracker.drain()
+
+    r["unread_count_us"] = per_call_us(lambda u: u.get_unread_count(), list(users))
+
+    # What the admin overview computes on every visit
+    stats = registry.stats
+    overview = lambda _: (stats.user_count(), stats.course_count(), stats.user_count("Student"), stats.total("ungraded"))
+    r["dashboard_us"] = per_call_us(overview, range(1000))
+    _, seconds = timed(db.page_course_stats)
+    r["course_stats_page_ms"] = seconds * 1000
+    CourseReport._cache.pop(db, None)  # cold: nothing cached for this database
+    _, seconds = timed(CourseReport().rows, db)
+    r["course_report_ms"] = seconds * 1000
+    db.close()
+    return r
+
+
+def peak_mb(fn, *args, **kw):
+    gc.collect()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(*args, **kw)
+    return result, (tracemalloc.get_traced_memory()[1] - before) / 2**20
+
+
+def memory_scale(students, seed, tmp):
+    r = {}
+    db = fresh_db(os.path.join(tmp, f"memory-{students}.db"))
+    tracemalloc.start()
+    try:
+        (users, courses, logs), r["generate_peak_mb"] = peak_mb(generate, db, students, seed)
+        _, r["save_full_peak_mb"] = peak_mb(db.save_full_state, users, courses, logs)
+        del users, courses, logs
+        state, r["load_lazy_peak_mb"] = peak_mb(db.load_full_state, lazy=True)
+        del state
+        state, r["load_eager_peak_mb"] = peak_mb(db.load_full_state)
+        del state
+    finally:
+        tracemalloc.stop()
+        db.close()
+    return r
+
+
+def run(scales, seed=42, memory=True, progress=print):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for students in scales:
+            progress(f"{students} students: {shape(students)}")
+            r = time_scale(students, seed, tmp)
+            if memory:
+                r.update(memory_scale(students, seed, tmp))
+            results[str(students)] = r
+    return {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(), "seed": seed, "results": results}
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """(scale, metric, baseline, current) for every metric that got worse than allowed."""
+    worse = []
+    for scale, metrics in baseline["results"].items():
+        for name, base in metrics.items():
+            value = current["results"].get(scale, {}).get(name)
+            if value is None:
+                continue
+            floor = next((f for suffix, f in FLOORS.items() if name.endswith(suffix)), 0)
+            if value > base * (1 + tolerance) and value - base > floor:
+                worse.append((scale, name, base, value))
+    return worse
+
+
+def print_table(report, baseline=None):
+    for scale, metrics in report["results"].items():
+        print(f"\n{scale} students")
+        base = baseline["results"].get(scale, {}) if baseline else {}
+        for name, value in metrics.items():
+            line = f"  {name:<24} {value:>12.3f}"
+            if name in base and base[name]:
+                line += f"  {(value / base[name] - 1) * 100:>+7.1f}% vs {base[name]:.3f}"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the persistence and model hot paths.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="student counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.seed, not args.no_memory, progress=lambda m: print(m, file=sys.stderr))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = [dict(zip(("scale", "metric", "baseline", "current"), w))
+                                 for w in compare(report, baseline, args.tolerance)]
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    print_table(report, baseline)
+    for w in report.get("regressions", ()):
+        print(f"REGRESSION {w['scale']} {w['metric']}: {w['baseline']:.3f} -> {w['current']:.3f}")
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Seeded synthetic LMS data, built through the models so saving it is realistic.
+
+A dataset scales with the number of students: one course per 50
+students, one instructor per two courses, five assignments and three
+materials per course, three enrollments and five messages per student,
+and a submission for 70% of the assignments a student could do, half of
+them graded.
+"""
+import random
+
+from models.audit_log import AuditLog
+from models.content_models import Assignment, LectureMaterial, Submission
+from models.course_models import Course
+from models.registry import Registry
+from models.user_models import Admin, Instructor, Student, PrivateMessage
+
+WORDS = ("alpha beta gamma delta epsilon zeta theta lambda sigma omega entropy vector matrix "
+         "proof lemma graph tree heap queue stack kernel thread cache index query").split()
+
+
+def _text(rng, n):
+    return " ".join(rng.choices(WORDS, k=n))
+
+
+def shape(students):
+    courses = max(1, students // 50)
+    return {"students": students, "courses": courses, "instructors": max(1, courses // 2),
+            "assignments": courses * 5, "materials": courses * 3, "messages": students * 5}
+
+
+def generate(db, students, seed=42):
+    """Builds a dataset in memory and attaches it to db; returns (users, courses, logs).
+
+    Nothing is written until save_full_state is called, so the first save
+    writes everything.
+    """
+    rng = random.Random(seed)
+    size = shape(students)
+    registry = Registry()
+    registry.db, db.registry = db, registry
+
+    admin = Admin("admin", "secret", "admin@gmail.com")
+    registry.add_user(admin)
+    instructors = [Instructor(f"inst{i}", "secret", f"inst{i}@gmail.com") for i in range(size["instructors"])]
+    learners = [Student(f"stud{i}", "secret", f"stud{i}@gmail.com") for i in range(students)]
+    for u in instructors + learners:
+        registry.add_user(u)
+
+    courses = []
+    for i in range(size["courses"]):
+        course = Course(registry.next_course_id(), f"Course {i}", instructors[i % len(instructors)])
+        registry.add_course(course)
+        for j in range(3):
+            course.materials.append(LectureMaterial(f"Lecture {j}", _text(rng, 8), f"lecture{j}.pdf"))
+        for j in range(5):
+            course.assignments.append(Assignment(f"HW{j}", _text(rng, 12), f"2025-0{j + 1}-15 23:59", 10))
+        courses.append(course)
+
+    for s in learners:
+        for course in rng.sample(courses, min(3, len(courses))):
+            course.add_student(s)
+            s.enrolled_courses.append(course)
+            for a in course.assignments:
+                if rng.random() < 0.7:
+                    sub = Submission(s, course, a, _text(rng, 40))
+                    course.submissions.append(sub)
+                    if rng.random() < 0.5:
+                        a.set_grade(s.get_username(), rng.randint(0, 10))
+                        sub.is_graded = True
+
+    people = instructors + learners
+    for s in learners:
+        for _ in range(5):
+            sender = rng.choice(people)
+            s.inbox.append(PrivateMessage(sender.get_username(), _text(rng, 3), _text(rng, 20)))
+        for m in rng.sample(s.inbox, 2):
+            m.is_read = True
+
+    logs = AuditLog(db, db.LOG_CAPACITY)
+    logs.append("Synthetic dataset generated", actor="admin")
+    return registry.users, registry.courses, logs
+
+
+def churn(registry, rng, fraction=0.01):
+    """Changes about `fraction` of the data the way a busy day would; returns the change count."""
+    students = list(registry.users_by_role("Student"))
+    changed = 0
+    for s in rng.sample(students, max(1, int(len(students) * fraction))):
+        if s.enrolled_courses:
+            course = rng.choice(s.enrolled_courses)
+            a = rng.choice(list(course.assignments))
+            sub = course.get_submission(s.get_username(), a.title)
+            if sub is None:
+                course.submissions.append(Submission(s, course, a, _text(rng, 40)))
+            else:
+                sub.content = _text(rng, 40)
+        if s.inbox:
+            s.inbox[0].is_read = not s.inbox[0].is_read
+        changed += 1
+    return changed
+
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+from .timestamps import now, format_ts, to_epoch
 
 class IdentifiableEntity(ABC):
     def __init__(self, entity_id):
@@ -10,10 +10,20 @@ class IdentifiableEntity(ABC):
         pass
 
 class BaseContent(ABC):
+    __slots__ = ("title", "description", "created_at")
+
     def __init__(self, title, description):
         self.title = title
         self.description = description
-        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.created_at = now()
+
+    @property
+    def timestamp(self):
+        return format_ts(self.created_at)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self.created_at = to_epoch(value)
 
     @abstractmethod
     def get_info(self):
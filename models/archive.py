@@ -0,0 +1,226 @@
+"""Moves finished courses out of the live database into per-term archive files.
+
+    archive = TermArchive(db)
+    archive.archive("2024-fall", archive.finished_courses(before=to_epoch("2025-01-15", DAY)))
+    with archive.attached("2024-fall") as conn:
+        rows = conn.execute("SELECT * FROM archive.submissions WHERE student_username = ?", ("stud1",))
+
+A course goes out with its enrollments, assignments, grades, materials,
+submissions, announcements, quizzes and the blobs its content points
+at. The live database keeps one catalog row per archived course, so
+loading and saving only ever see current terms. Archives are attached
+read-only and only for as long as a query needs them.
+
+The live database runs in WAL mode, and SQLite does not make a
+transaction spanning a WAL database and an attached one atomic across
+both files. The move is therefore two transactions: the copy is
+committed to the archive first, then the live rows are deleted and the
+catalog row is written in one transaction. A crash between the two
+leaves the course live, with a copy that the next run replaces. Either
+way nothing is lost, and running the same archive again is harmless.
+"""
+import os
+import re
+import zlib
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from .change_tracker import tracker
+from .timestamps import now
+
+_ARCHIVING = "cid IN (SELECT cid FROM temp.archiving)"
+_COURSE = "course_cid IN (SELECT cid FROM temp.archiving)"
+
+# table -> rows belonging to the courses being moved; {db} is main or archive.
+# Children come before their parents so deletes never orphan a lookup.
+TABLES = (
+    ("assignment_grades", f"assignment_id IN (SELECT id FROM {{db}}.assignments WHERE {_COURSE})"),
+    ("quiz_attempts", f"quiz_id IN (SELECT id FROM {{db}}.quizzes WHERE {_COURSE})"),
+    ("assignments", _COURSE),
+    ("quizzes", _COURSE),
+    ("materials", _COURSE),
+    ("submissions", _COURSE),
+    ("enrollments", _COURSE),
+    ("announcements", _COURSE),
+    ("courses", _ARCHIVING),
+)
+INDEXES = {"assignment_grades": "assignment_id", "quiz_attempts": "quiz_id", "courses": "cid"}
+_TERM = re.compile(r"^[\w.-]+$")
+
+
+class TermArchive:
+    """Archive files live next to the live database as lms_archive_<term>.db."""
+
+    def __init__(self, db, directory=None):
+        self.db = db
+        self.directory = directory or os.path.dirname(os.path.abspath(db.pool.path))
+
+    def path(self, term):
+        if not _TERM.match(term or ""):
+            raise ValueError("a term name may only use letters, digits, '.', '-' and '_'")
+        return os.path.join(self.directory, f"lms_archive_{term}.db")
+
+    def finished_courses(self, before):
+        """Courses whose assignments were all due before `before` (epoch seconds)."""
+        with self.db.pool.reader() as conn:
+            return [r[0] for r in conn.execute("""
+                SELECT cid FROM courses c
+                WHERE EXISTS (SELECT 1 FROM assignments a WHERE a.course_cid = c.cid)
+                  AND NOT EXISTS (SELECT 1 FROM assignments a WHERE a.course_cid = c.cid
+                                  AND (a.due_at IS NULL OR a.due_at >= ?))
+                ORDER BY cid
+            """, (before,))]
+
+    # Moving courses out
+    def archive(self, term, cids):
+        """Moves the courses into the term's archive; returns how many left the live database."""
+        path = self.path(term)
+        cids = [str(c) for c in cids]
+        if not cids:
+            return 0
+        # Whatever the models still hold for these courses has to be on disk before it is moved
+        changes = tracker.drain()
+        if self.db.writer is not None:
+            self.db.writer.submit(changes)
+        else:
+            self.db.write_changes(changes)
+        self.db.flush()
+
+        with self.db._write_lock, self.db.pool.connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS archiving (cid TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.archiving")
+            conn.executemany("INSERT OR IGNORE INTO temp.archiving VALUES (?)", [(c,) for c in cids])
+            # Only courses still live are copied; an archived copy is never replaced by nothing
+            conn.execute("DELETE FROM temp.archiving WHERE cid NOT IN (SELECT cid FROM main.courses)")
+            conn.commit()
+            if not conn.execute("SELECT 1 FROM temp.archiving").fetchone():
+                self._forget(cids)
+                return 0
+            conn.execute("ATTACH DATABASE ? AS archive", (path,))
+            try:
+                conn.execute("PRAGMA archive.journal_mode = DELETE")
+                conn.execute("PRAGMA archive.synchronous = FULL")
+                self._prepare(conn)
+                self._copy(conn)
+            finally:
+                conn.execute("DETACH DATABASE archive")
+            moved = self._remove(conn, term)
+            conn.execute("DELETE FROM temp.archiving")
+            conn.commit()
+        self.db.bump_versions([t for t, _ in TABLES] + ["blobs", "archived_courses"])
+        self._forget(cids)
+        return moved
+
+    def _prepare(self, conn):
+        # Archive tables mirror the live columns, without keys or constraints: they are never written again
+        conn.execute("CREATE TABLE IF NOT EXISTS archive.blobs (id INTEGER PRIMARY KEY, hash TEXT UNIQUE, size INTEGER, data BLOB)")
+        for table, _ in TABLES:
+            live = [r[1] for r in conn.execute(f"PRAGMA main.table_info({table})")]
+            have = [r[1] for r in conn.execute(f"PRAGMA archive.table_info({table})")]
+            if not have:
+                conn.execute(f"CREATE TABLE archive.{table} AS SELECT * FROM main.{table} WHERE 0")
+            for column in live:
+                if have and column not in have:
+                    conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {column}")
+            column = INDEXES.get(table, "course_cid")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS archive.ix_{table}_{column} ON {table}({column})")
+
+    def _copy(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, where in TABLES:
+                conn.execute(f"DELETE FROM archive.{table} WHERE {where.format(db='archive')}")
+            for table, where in reversed(TABLES):
+                columns = ", ".join(r[1] for r in conn.execute(f"PRAGMA main.table_info({table})"))
+                conn.execute(f"INSERT INTO archive.{table} ({columns}) "
+                             f"SELECT {columns} FROM main.{table} WHERE {where.format(db='main')}")
+            conn.execute(f"""
+                INSERT INTO archive.blobs (hash, size, data)
+                SELECT hash, size, data FROM main.blobs WHERE hash IN (
+                    SELECT content_hash FROM main.submissions WHERE {_COURSE}
+                    UNION SELECT content_hash FROM main.materials WHERE {_COURSE})
+                ON CONFLICT(hash) DO NOTHING
+            """)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _remove(self, conn, term):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO archived_courses
+                    (cid, title, instructor_username, term, students, submissions, archived_at)
+                SELECT cid, title, instructor_username, ?,
+                    (SELECT COUNT(*) FROM enrollments e WHERE e.course_cid = courses.cid),
+                    (SELECT COUNT(*) FROM submissions s WHERE s.course_cid = courses.cid), ?
+                FROM courses WHERE {_ARCHIVING}
+            """, (term, now()))
+            moved = 0
+            for table, where in TABLES:
+                cursor = conn.execute(f"DELETE FROM main.{table} WHERE {where.format(db='main')}")
+                if table == "courses":
+                    moved = cursor.rowcount
+            self.db.blobs.collect_garbage(conn.cursor())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return moved
+
+    def _forget(self, cids):
+        registry = self.db.registry
+        if registry is None:
+            return
+        with tracker.paused():
+            for cid in cids:
+                course = registry.get_course(cid)
+                if course is not None:
+                    registry.remove_course(course)
+                    if self.db.content_cache is not None:
+                        self.db.content_cache.forget(course)
+
+    # Reading archives
+    def terms(self):
+        """(term, course count) for every archived term."""
+        with self.db.pool.reader() as conn:
+            return [tuple(r) for r in conn.execute(
+                "SELECT term, COUNT(*) FROM archived_courses GROUP BY term ORDER BY term")]
+
+    def page_courses(self, term=None, after=None, limit=100):
+        return self.db._keyset_page("SELECT * FROM archived_courses", ("term", "cid"),
+                                    ["term = ?"] if term else [], [term] if term else [], after, limit)
+
+    @contextmanager
+    def attached(self, term):
+        """A read-only connection with the term's archive attached as `archive`."""
+        path = self.path(term)
+        if not os.path.exists(path):
+            raise KeyError(f"no archive for term {term!r}")
+        with self.db.pool.reader() as conn:
+            conn.execute("ATTACH DATABASE ? AS archive", (f"file:{quote(path)}?mode=ro",))
+            try:
+                yield conn
+            finally:
+                conn.execute("DETACH DATABASE archive")
+
+    def course_report(self, term):
+        """One row per archived course: enrollment, submissions and the average grade in percent."""
+        with self.attached(term) as conn:
+            return [dict(r) for r in conn.execute("""
+                SELECT c.cid, c.title, c.instructor_username AS instructor,
+                    (SELECT COUNT(*) FROM archive.enrollments e WHERE e.course_cid = c.cid) AS students,
+                    (SELECT COUNT(*) FROM archive.submissions s WHERE s.course_cid = c.cid) AS submissions,
+                    (SELECT ROUND(AVG(100.0 * g.score / a.max_marks), 1)
+                     FROM archive.assignment_grades g JOIN archive.assignments a ON a.id = g.assignment_id
+                     WHERE a.course_cid = c.cid AND a.max_marks > 0) AS average
+                FROM archive.courses c ORDER BY c.title, c.cid
+            """)]
+
+    def read_content(self, term, digest):
+        with self.attached(term) as conn:
+            row = conn.execute("SELECT data FROM archive.blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"no blob {digest}")
+        return zlib.decompress(row[0])
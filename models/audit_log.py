@@ -0,0 +1,141 @@
+import threading
+from collections import Counter, deque, namedtuple
+
+from .timestamps import now, format_ts
+
+
+class LogEntry(namedtuple("LogEntry", "ts level actor message")):
+    __slots__ = ()
+
+    def __str__(self):
+        return self.message
+
+
+class AuditLog:
+    """Append-only audit trail.
+
+    Only the newest `capacity` entries stay in memory; everything else is
+    read back from the logs table a page at a time. It keeps the old list
+    interface (append, len, iteration) so `lms.logs` callers still work.
+    """
+
+    LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+    DAY_SECONDS = 24 * 60 * 60
+
+    def __init__(self, db=None, capacity=1000, retention_days=None, max_rows=None):
+        self.db = db
+        self.retention_days = retention_days  # drop stored entries older than this
+        self.max_rows = max_rows              # and keep at most this many
+        self._ring = deque(maxlen=capacity)
+        self._unsaved = []
+        self._lock = threading.Lock()
+
+    def append(self, message, level="INFO", actor=None):
+        if level not in self.LEVELS:
+            raise ValueError(f"unknown log level {level!r}")
+        entry = LogEntry(now(), level, actor, str(message))
+        with self._lock:
+            self._ring.append(entry)
+            self._unsaved.append(entry)
+        return entry
+
+    def extend(self, messages):
+        for m in messages:
+            self.append(m)
+
+    def restore(self, entries):
+        """Seeds the ring with entries that are already stored."""
+        with self._lock:
+            self._ring.extend(entries)
+
+    def take_unsaved(self):
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+        return unsaved
+
+    def pending(self):
+        """Entries not yet in the logs table, oldest first: queued saves, then unsaved."""
+        queued = self.db.writer.queued() if self.db is not None and self.db.writer is not None else []
+        with self._lock:
+            unsaved = list(self._unsaved)
+        # An entry taken for a save between the two reads shows up in both
+        entries = {id(e): e for c in queued for e in c.logs}
+        entries.update((id(e), e) for e in unsaved)
+        return list(entries.values())
+
+    def __len__(self):
+        return len(self._ring)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._ring))
+
+    def __reversed__(self):
+        with self._lock:
+            return reversed(list(self._ring))
+
+    def __getitem__(self, index):
+        with self._lock:
+            return list(self._ring)[index]
+
+    # Queries against the stored history
+    def tail(self, n=100):
+        """Newest n entries, newest first."""
+        with self._lock:
+            if n <= len(self._ring) or self.db is None:
+                return list(self._ring)[:-n - 1:-1]
+        self.db.flush()
+        return [self.from_row(r) for r in self.db.page_logs(limit=n)[0]]
+
+    def page(self, after=None, limit=200, start=None, end=None, actor=None, level=None):
+        """Entries newest first; pass the returned key back as `after`.
+
+        The first page leads with the matching entries still waiting to be
+        written, so paging never has to wait for a save.
+        """
+        fresh = []
+        if after is None:
+            fresh = [e for e in reversed(self.pending())
+                     if (start is None or e.ts >= start) and (end is None or e.ts < end)
+                     and (not actor or e.actor == actor) and (not level or e.level == level)]
+        rows, last = self.db.page_logs(after, limit, start, end, actor, level)
+        if fresh:
+            # Drop entries whose save committed after they were picked up above
+            stored = Counter((r["ts"], r["level"], r["actor"], r["message"]) for r in rows)
+            unwritten = []
+            for e in fresh:
+                if stored[e]:
+                    stored[e] -= 1
+                else:
+                    unwritten.append(dict(e._asdict(), id=None))
+            rows = unwritten + rows
+            if last is None:
+                last = (0, 0)  # nothing stored matches; the next page must not repeat these
+        return rows, last
+
+    def query(self, start=None, end=None, actor=None, level=None):
+        """Streams every entry in [start, end), newest first."""
+        after = None
+        while True:
+            rows, after = self.page(after, 500, start, end, actor, level)
+            for r in rows:
+                yield self.from_row(r)
+            if len(rows) < 500:
+                return
+
+    def compact(self):
+        """Applies the retention policy to the stored history; returns rows removed."""
+        if self.db is None or (self.retention_days is None and self.max_rows is None):
+            return 0
+        before = now() - self.retention_days * self.DAY_SECONDS if self.retention_days is not None else None
+        self.db.flush()
+        return self.db.compact_logs(before, self.max_rows)
+
+    @staticmethod
+    def from_row(row):
+        return LogEntry(row["ts"], row["level"], row["actor"], row["message"])
+
+    @staticmethod
+    def format(entry):
+        actor = f" {entry.actor}" if entry.actor else ""
+        return f"[{format_ts(entry.ts)}] {entry.level}{actor}: {entry.message}"
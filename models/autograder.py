@@ -0,0 +1,275 @@
+"""Grades submissions automatically across a pool of worker processes.
+
+    grader = KeywordGrader({"entropy": 2, "heap": 1, "binary search": 2})
+    stats = AutoGrader(db, grader, on_progress=print).grade("C1", "HW1")
+
+Ungraded submissions are read from the database in id order and handed
+to the workers in chunks as ids and content hashes; each worker opens
+its own read-only connection and inflates the content itself, so the
+app process only schedules and writes. Grades and is_graded flags go
+back in batched transactions and are mirrored into the loaded models.
+Save first: submissions that are not in the database yet are not seen.
+"""
+import math
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .blob_store import BlobStore
+from .change_tracker import tracker
+
+_WORD = re.compile(r"\w+")
+
+
+class Grader(ABC):
+    """Scores one submission's text as a fraction of the marks, 0.0 to 1.0.
+
+    Graders are pickled to the workers, so keep their state plain.
+    """
+
+    @abstractmethod
+    def score(self, text):
+        pass
+
+
+class KeywordGrader(Grader):
+    """Marks for each keyword or phrase the text contains, case-insensitively."""
+
+    def __init__(self, keywords):
+        # keyword -> weight; a plain list weighs every keyword the same
+        self.keywords = {k.lower(): w for k, w in (keywords.items() if isinstance(keywords, dict)
+                                                   else ((k, 1) for k in keywords))}
+        self.total = sum(self.keywords.values())
+
+    def score(self, text):
+        tokens = _WORD.findall(text.lower())
+        words, padded = set(tokens), f" {' '.join(tokens)} "
+        found = sum(w for k, w in self.keywords.items()
+                    if (f" {k} " in padded if " " in k else k in words))
+        return found / self.total if self.total else 0.0
+
+
+class RegexGrader(Grader):
+    """Marks for each rubric pattern that matches somewhere in the text."""
+
+    def __init__(self, rubric, flags=re.IGNORECASE):
+        # rubric: (pattern, points) pairs
+        self.rubric = [(re.compile(p, flags), points) for p, points in rubric]
+        self.total = sum(points for _, points in self.rubric)
+
+    def score(self, text):
+        found = sum(points for pattern, points in self.rubric if pattern.search(text))
+        return found / self.total if self.total else 0.0
+
+
+class ReferenceGrader(Grader):
+    """Cosine similarity of word counts against a reference answer.
+
+    Similarity at or above `full` earns full marks; below it marks fall
+    off linearly.
+    """
+
+    def __init__(self, reference, full=0.8):
+        self.reference = Counter(_WORD.findall(reference.lower()))
+        self.norm = math.sqrt(sum(n * n for n in self.reference.values()))
+        self.full = full
+
+    def score(self, text):
+        counts = Counter(_WORD.findall(text.lower()))
+        norm = math.sqrt(sum(n * n for n in counts.values()))
+        if not norm or not self.norm:
+            return 0.0
+        similarity = sum(n * self.reference.get(w, 0) for w, n in counts.items()) / (norm * self.norm)
+        return min(1.0, similarity / self.full)
+
+
+class GradingTimeout(Exception):
+    pass
+
+
+class GradeStats:
+    def __init__(self, total=0):
+        self.total = total
+        self.graded = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = False
+        self.started = time.perf_counter()
+
+    @property
+    def done(self):
+        return self.graded + self.failed + self.timed_out
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.done / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.done}/{self.total} submissions: {self.graded} graded, {self.failed} failed, "
+                f"{self.timed_out} timed out{' (cancelled)' if self.cancelled else ''} "
+                f"in {self.seconds:.1f}s ({self.rate:,.0f}/s)")
+
+
+# Worker side: one read-only connection per process
+_conn = None
+_blobs = BlobStore()
+
+
+def _init_worker(path):
+    global _conn
+    _conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _alarm(signum, frame):
+    raise GradingTimeout()
+
+
+def _grade_chunk(grader, chunk, timeout):
+    """[(submission id, fraction or None, error or None)] for [(submission id, content hash)]."""
+    # SIGALRM interrupts a runaway grader where there is one; elsewhere it is only caught afterwards
+    alarm = timeout and hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+    results = []
+    for sub_id, digest in chunk:
+        start = time.perf_counter()
+        try:
+            text = _blobs.read(digest, _conn).decode("utf-8", "replace")
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                fraction = float(grader.score(text))
+            finally:
+                if alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            if timeout and time.perf_counter() - start > timeout:
+                raise GradingTimeout()
+            results.append((sub_id, max(0.0, min(1.0, fraction)), None))
+        except GradingTimeout:
+            results.append((sub_id, None, "timeout"))
+        except Exception as e:
+            results.append((sub_id, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class AutoGrader:
+    """Fans one assignment's ungraded submissions out to worker processes.
+
+    Call grade() from the thread that owns the models. cancel() may be
+    called from anywhere, including on_progress; chunks already running
+    finish and their grades are kept.
+    """
+
+    def __init__(self, db, grader, workers=None, chunk_size=50, batch_size=500, timeout=5.0,
+                 on_progress=None, on_error=None):
+        self.db = db
+        self.grader = grader
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.on_progress = on_progress or (lambda stats: None)
+        self.on_error = on_error or (lambda student, reason: None)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def grade(self, course_cid, assignment_title, regrade=False):
+        """Grades the assignment's submissions (all of them with regrade); returns GradeStats."""
+        self._cancel.clear()
+        self.db.flush()
+        with self.db.pool.reader() as conn:
+            found = conn.execute("SELECT id, max_marks FROM assignments WHERE course_cid = ? AND title = ?",
+                                 (course_cid, assignment_title)).fetchone()
+            if found is None:
+                raise ValueError(f"no assignment {assignment_title!r} in course {course_cid}")
+            assignment_id, max_marks = found
+            rows = conn.execute(f"""
+                SELECT id, student_username, content_hash FROM submissions
+                WHERE course_cid = ? AND assignment_title = ? AND content_hash IS NOT NULL
+                {"" if regrade else "AND is_graded = 0"} ORDER BY id
+            """, (course_cid, assignment_title)).fetchall()
+
+        students = {r[0]: r[1] for r in rows}
+        stats = GradeStats(len(rows))
+        chunks = [[(r[0], r[2]) for r in rows[i:i + self.chunk_size]] for i in range(0, len(rows), self.chunk_size)]
+        chunks.reverse()  # popped from the end, so oldest first
+        batch = []
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.db.pool.path,)) as pool:
+            running = set()
+            try:
+                while chunks or running:
+                    # Keep a couple of chunks queued per worker; the rest wait here so cancel is quick
+                    while chunks and len(running) < self.workers * 2 and not self._cancel.is_set():
+                        running.add(pool.submit(_grade_chunk, self.grader, chunks.pop(), self.timeout))
+                    if not running:
+                        break
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        for sub_id, fraction, error in future.result():
+                            if fraction is not None:
+                                batch.append((sub_id, students[sub_id], self._marks(fraction, max_marks)))
+                                stats.graded += 1
+                            else:
+                                stats.timed_out += error == "timeout"
+                                stats.failed += error != "timeout"
+                                self.on_error(students[sub_id], error)
+                    if len(batch) >= self.batch_size:
+                        self._write(course_cid, assignment_title, assignment_id, batch)
+                        batch = []
+                    self.on_progress(stats)
+            finally:
+                for future in running:
+                    future.cancel()
+                if batch:
+                    self._write(course_cid, assignment_title, assignment_id, batch)
+        stats.cancelled = self._cancel.is_set() and stats.done < stats.total
+        self.on_progress(stats)
+        return stats
+
+    @staticmethod
+    def _marks(fraction, max_marks):
+        score = round(fraction * (max_marks or 0), 2)
+        return int(score) if score == int(score) else score
+
+    def _write(self, course_cid, title, assignment_id, batch):
+        with self.db._write_lock, self.db.pool.connection() as conn, conn:
+            conn.executemany("""
+                INSERT INTO assignment_grades (assignment_id, student_username, score) VALUES (?, ?, ?)
+                ON CONFLICT(assignment_id, student_username) DO UPDATE SET score = excluded.score
+            """, [(assignment_id, student, score) for _, student, score in batch])
+            newly = conn.executemany("UPDATE submissions SET is_graded = 1 WHERE id = ? AND is_graded = 0",
+                                     [(sub_id,) for sub_id, _, _ in batch]).rowcount
+        self.db.bump_versions(("assignment_grades", "submissions"))
+        self._mirror(course_cid, title, batch, newly)
+
+    def _mirror(self, course_cid, title, batch, newly):
+        # The rows are written already; only the loaded objects and the counters need to catch up
+        registry = self.db.registry
+        course = registry.get_course(course_cid) if registry is not None else None
+        if course is None:
+            return
+        if not course._content_resident():
+            # Nothing loaded to update, but the counters still describe the stored rows
+            course._count("ungraded", -newly)
+            return
+        assignment = course.get_assignment(title)
+        with tracker.paused():
+            for sub_id, student, score in batch:
+                if assignment is not None:
+                    assignment.set_grade(student, score)
+                for sub in course._submission_index.get((student, title), ()):
+                    if sub._row_id == sub_id:
+                        sub.is_graded = True
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import zlib
+
+CHUNK = 64 * 1024
+LEVEL = 6
+
+
+def pack(data):
+    """(sha256 hex, size, zlib-compressed bytes) for str or bytes content."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest(), len(data), zlib.compress(data, LEVEL)
+
+
+class BlobStore:
+    """Content-addressed, compressed storage for submission and material content.
+
+    Blobs are keyed by the SHA-256 of their content, so identical content is
+    stored once however many rows point at it. New blobs are held in memory
+    until the save that references them writes them in the same
+    transaction; stored blobs are streamed with SQLite's incremental blob
+    I/O and never held whole.
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self._pending = {}  # hash -> (size, compressed bytes) not yet written
+        self._lock = threading.Lock()
+
+    def put(self, data):
+        """Stores str or bytes content; returns (hash, size)."""
+        digest, size, packed = pack(data)
+        with self._lock:
+            self._pending.setdefault(digest, (size, packed))
+        return digest, size
+
+    def put_stream(self, chunks):
+        """Stores content arriving as byte chunks without holding it uncompressed."""
+        sha, comp = hashlib.sha256(), zlib.compressobj(LEVEL)
+        size, parts = 0, []
+        for chunk in chunks:
+            sha.update(chunk)
+            size += len(chunk)
+            parts.append(comp.compress(chunk))
+        parts.append(comp.flush())
+        digest = sha.hexdigest()
+        with self._lock:
+            self._pending.setdefault(digest, (size, b"".join(parts)))
+        return digest, size
+
+    def open(self, digest, conn=None):
+        """Yields the content of a blob as decompressed byte chunks."""
+        with self._lock:
+            pending = self._pending.get(digest)
+        if pending is not None:
+            yield zlib.decompress(pending[1])
+            return
+        if conn is None:
+            with self.db.pool.reader() as conn:
+                yield from self.open(digest, conn)
+            return
+        row = conn.execute("SELECT id FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"no blob {digest}")
+        inflate = zlib.decompressobj()
+        with conn.blobopen("blobs", "data", row[0], readonly=True) as blob:
+            for packed in iter(lambda: blob.read(CHUNK), b""):
+                out = inflate.decompress(packed)
+                if out:
+                    yield out
+        tail = inflate.flush()
+        if tail:
+            yield tail
+
+    def read(self, digest, conn=None):
+        return b"".join(self.open(digest, conn))
+
+    def verify(self, digest):
+        """True if the stored content still hashes to its key."""
+        sha = hashlib.sha256()
+        for chunk in self.open(digest):
+            sha.update(chunk)
+        return sha.hexdigest() == digest
+
+    # Called by the database while saving
+    def write(self, cursor, digest):
+        with self._lock:
+            pending = self._pending.get(digest)
+        if pending is not None:
+            cursor.execute("INSERT INTO blobs (hash, size, data) VALUES (?, ?, ?) ON CONFLICT(hash) DO NOTHING",
+                           (digest, *pending))
+
+    def saved(self, digests):
+        """Forgets pending blobs once the transaction that wrote them has committed."""
+        with self._lock:
+            for digest in digests:
+                self._pending.pop(digest, None)
+
+    def collect_garbage(self, cursor):
+        """Deletes blobs no row refers to any more; returns how many."""
+        cursor.execute("""
+            DELETE FROM blobs WHERE NOT EXISTS (SELECT 1 FROM submissions s WHERE s.content_hash = blobs.hash)
+                                AND NOT EXISTS (SELECT 1 FROM materials m WHERE m.content_hash = blobs.hash)
+        """)
+        return cursor.rowcount
@@ -0,0 +1,254 @@
+"""Streams users, courses or enrollments from CSV / JSON Lines into the database.
+
+    python -m models.bulk_import users students.csv
+    python -m models.bulk_import courses courses.jsonl --db lms_data.db --errors rejected.csv
+
+Rows are validated, checked against what is already stored and written
+in chunked transactions; bad rows are reported and skipped. Run it while
+the app is closed, since a running app does not see the new rows.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+from validators import Validator
+from .database_manager import DatabaseManager
+
+ROLES = ("Admin", "Instructor", "Student")
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows: {self.imported} imported, {self.duplicates} duplicates, "
+                f"{self.errors} errors in {self.seconds:.1f}s ({self.rate:,.0f} rows/s)")
+
+
+class BulkImporter:
+    """Validates rows and writes them chunk by chunk; memory does not grow with the input."""
+
+    # kind -> (key fields, required fields)
+    KINDS = {
+        "users": (("username",), ("username", "password", "email", "role")),
+        "courses": (("cid",), ("cid", "title", "instructor")),
+        "enrollments": (("student", "course"), ("student", "course")),
+    }
+
+    def __init__(self, db, kind, chunk_size=5000, on_error=None, on_progress=None, progress_every=50000):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown import kind {kind!r}")
+        self.db = db
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.on_error = on_error or (lambda line, row, reason: None)
+        self.on_progress = on_progress or (lambda stats: None)
+        self.progress_every = progress_every
+
+    def run(self, rows):
+        """rows yields (line number, dict); returns ImportStats."""
+        stats = ImportStats()
+        keys, required = self.KINDS[self.kind]
+        chunk, seen = [], set()
+        for line, row in rows:
+            stats.rows += 1
+            if isinstance(row, Exception):
+                self._reject(stats, line, {}, f"unreadable row: {row}")
+            else:
+                row = {k: str(v).strip() for k, v in row.items() if k is not None and v is not None}
+                missing = [f for f in required if not row.get(f)]
+                reason = f"missing {', '.join(missing)}" if missing else self._invalid(row)
+                key = tuple(row.get(k) for k in keys)
+                if reason:
+                    self._reject(stats, line, row, reason)
+                elif key in seen:
+                    stats.duplicates += 1
+                    self._reject(stats, line, row, "duplicate in input", count=False)
+                else:
+                    seen.add(key)
+                    chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, stats)
+                chunk, seen = [], set()
+            if stats.rows % self.progress_every == 0:
+                self.on_progress(stats)
+        if chunk:
+            self._flush(chunk, stats)
+        self.on_progress(stats)
+        return stats
+
+    def _reject(self, stats, line, row, reason, count=True):
+        if count:
+            stats.errors += 1
+        self.on_error(line, row, reason)
+
+    def _invalid(self, row):
+        if self.kind == "users":
+            if not Validator.validate_gmail(row["email"]):
+                return "e-mail must be a gmail.com address"
+            if not Validator.validate_password(row["password"]):
+                return "password must be at least 6 characters"
+            if row["role"] not in ROLES:
+                return f"role must be one of {', '.join(ROLES)}"
+        return None
+
+    def _flush(self, chunk, stats):
+        with self.db._write_lock, self.db.pool.connection() as conn, conn:
+            cursor = conn.cursor()
+            accepted = getattr(self, f"_check_{self.kind}")(cursor, chunk, stats)
+            getattr(self, f"_write_{self.kind}")(cursor, accepted)
+        stats.imported += len(accepted)
+        self.db.bump_versions(("users",) if self.kind == "users" else
+                              ("courses", "sequences") if self.kind == "courses" else ("enrollments",))
+
+    def _existing(self, cursor, sql, values):
+        # One query per chunk: the values travel as a single JSON array
+        cursor.execute(sql, (json.dumps(list(values)),))
+        return {tuple(r) if len(r) > 1 else r[0] for r in cursor.fetchall()}
+
+    def _check_users(self, cursor, chunk, stats):
+        taken = self._existing(cursor, "SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))",
+                               (row["username"] for _, row in chunk))
+        return self._keep(chunk, stats, lambda row: row["username"] in taken, lambda row: None)
+
+    def _check_courses(self, cursor, chunk, stats):
+        taken = self._existing(cursor, "SELECT cid FROM courses WHERE cid IN (SELECT value FROM json_each(?))",
+                               (row["cid"] for _, row in chunk))
+        instructors = self._existing(cursor, """
+            SELECT username FROM users WHERE role = 'Instructor' AND username IN (SELECT value FROM json_each(?))
+        """, {row["instructor"] for _, row in chunk})
+
+        def problem(row):
+            if row["instructor"] not in instructors:
+                return f"no instructor named {row['instructor']!r}"
+        return self._keep(chunk, stats, lambda row: row["cid"] in taken, problem)
+
+    def _check_enrollments(self, cursor, chunk, stats):
+        students = self._existing(cursor, """
+            SELECT username FROM users WHERE role = 'Student' AND username IN (SELECT value FROM json_each(?))
+        """, {row["student"] for _, row in chunk})
+        courses = self._existing(cursor, "SELECT cid FROM courses WHERE cid IN (SELECT value FROM json_each(?))",
+                                 {row["course"] for _, row in chunk})
+        cursor.execute("""
+            SELECT e.student_username, e.course_cid FROM enrollments e
+            JOIN json_each(?) j ON e.student_username = json_extract(j.value, '$[0]')
+                               AND e.course_cid = json_extract(j.value, '$[1]')
+        """, (json.dumps([[row["student"], row["course"]] for _, row in chunk]),))
+        enrolled = {tuple(r) for r in cursor.fetchall()}
+
+        def problem(row):
+            if row["student"] not in students:
+                return f"no student named {row['student']!r}"
+            if row["course"] not in courses:
+                return f"no course with id {row['course']!r}"
+        return self._keep(chunk, stats, lambda row: (row["student"], row["course"]) in enrolled, problem)
+
+    def _keep(self, chunk, stats, stored, problem):
+        accepted = []
+        for line, row in chunk:
+            if stored(row):
+                stats.duplicates += 1
+                self._reject(stats, line, row, "already in the database", count=False)
+                continue
+            reason = problem(row)
+            if reason is None:
+                accepted.append(row)
+            else:
+                self._reject(stats, line, row, reason)
+        return accepted
+
+    def _write_users(self, cursor, rows):
+        cursor.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                           [(r["username"], r["password"], r["email"], r["role"]) for r in rows])
+
+    def _write_courses(self, cursor, rows):
+        cursor.executemany("INSERT INTO courses (cid, title, instructor_username) VALUES (?, ?, ?)",
+                           [(r["cid"], r["title"], r["instructor"]) for r in rows])
+        # New course ids must never reuse an imported one
+        numeric = [int(r["cid"]) for r in rows if r["cid"].isdigit()]
+        if numeric:
+            cursor.execute("""
+                INSERT INTO sequences (name, value) VALUES ('course_id', ?)
+                ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+            """, (max(numeric) + 1,))
+
+    def _write_enrollments(self, cursor, rows):
+        cursor.executemany("INSERT OR IGNORE INTO enrollments (student_username, course_cid) VALUES (?, ?)",
+                           [(r["student"], r["course"]) for r in rows])
+
+
+def read_rows(path):
+    """Yields (line number, dict) from a CSV or JSON Lines file without reading it all."""
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    try:
+                        row = json.loads(text)
+                        yield line, row if isinstance(row, dict) else ValueError("expected a JSON object")
+                    except ValueError as e:
+                        yield line, e
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import users, courses or enrollments.")
+    parser.add_argument("kind", choices=sorted(BulkImporter.KINDS))
+    parser.add_argument("path", help="CSV or JSON Lines file ('-' reads CSV from stdin)")
+    parser.add_argument("--db", default=DatabaseManager.DB_NAME)
+    parser.add_argument("--chunk", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--errors", help="write rejected rows to this CSV instead of stderr")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args(argv)
+
+    DatabaseManager.DB_NAME = args.db
+    db = DatabaseManager()
+    err_file = open(args.errors, "w", newline="", encoding="utf-8") if args.errors else None
+    err_writer = csv.writer(err_file) if err_file else None
+    if err_writer:
+        err_writer.writerow(["line", "row", "error"])
+
+    def on_error(line, row, reason):
+        if err_writer:
+            err_writer.writerow([line, json.dumps(row), reason])
+        else:
+            print(f"line {line}: {reason}", file=sys.stderr)
+
+    def on_progress(stats):
+        if not args.quiet:
+            print(stats, file=sys.stderr)
+
+    try:
+        stats = BulkImporter(db, args.kind, args.chunk, on_error, on_progress).run(read_rows(args.path))
+    finally:
+        if err_file:
+            err_file.close()
+        db.close()
+    print(stats)
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
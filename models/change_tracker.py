@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+
+
+class ChangeSet:
+    """Model changes that have not been written to the database yet."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.dirty = {}        # id(obj) -> obj needing an insert or update
+        self.deleted = {}      # id(obj) -> obj whose rows must be removed
+        self.collections = {}  # (id(owner), name) -> [owner, name, added items, rewrite?, removed items]
+        self.logs = []         # log lines not yet stored
+        self.course_seq = None # course id counter to persist, if it moved
+
+    def has_changes(self):
+        return bool(self.dirty or self.deleted or self.collections or self.logs or self.course_seq is not None)
+
+    def merge(self, newer):
+        """Folds a later change set into this one so both are written together."""
+        for key, obj in newer.deleted.items():
+            self.dirty.pop(key, None)
+            self.deleted[key] = obj
+            for ckey in [k for k in self.collections if k[0] == key]:
+                del self.collections[ckey]
+        self.dirty.update(newer.dirty)
+        for key, (owner, name, added, rewrite, removed) in newer.collections.items():
+            mine = self.collections.get(key)
+            if mine is None or rewrite:
+                self.collections[key] = [owner, name, list(added), rewrite, list(removed)]
+            elif not mine[3]:
+                mine[2].extend(added)
+                mine[4].extend(removed)
+        self.logs.extend(newer.logs)
+        if newer.course_seq is not None:
+            self.course_seq = newer.course_seq
+        return self
+
+
+class ChangeTracker(ChangeSet):
+    """Collects unsaved model changes so a save only writes the deltas."""
+
+    def __init__(self):
+        self.enabled = True
+        self.clear()
+
+    def drain(self):
+        """Hands the pending changes to the caller and starts a fresh set."""
+        changes = ChangeSet()
+        changes.dirty, changes.deleted, changes.collections = self.dirty, self.deleted, self.collections
+        self.clear()
+        return changes
+
+    def mark_dirty(self, obj):
+        if self.enabled and id(obj) not in self.deleted:
+            self.dirty[id(obj)] = obj
+
+    def mark_attached(self, obj):
+        if self.enabled:
+            self.deleted.pop(id(obj), None)
+            self.dirty[id(obj)] = obj
+
+    def mark_deleted(self, obj):
+        if not self.enabled:
+            return
+        self.dirty.pop(id(obj), None)
+        self.deleted[id(obj)] = obj
+        for key in [k for k in self.collections if k[0] == id(obj)]:
+            del self.collections[key]
+
+    def mark_added(self, owner, name, item):
+        if self.enabled:
+            entry = self._entry(owner, name)
+            if not entry[3]:
+                entry[2].append(item)
+
+    def mark_removed(self, owner, name, item):
+        # For keyed collections (grades); lists report removals with mark_rewrite
+        if self.enabled:
+            entry = self._entry(owner, name)
+            if not entry[3]:
+                entry[4].append(item)
+
+    def mark_rewrite(self, owner, name):
+        if self.enabled:
+            entry = self._entry(owner, name)
+            entry[2] = []
+            entry[3] = True
+            entry[4] = []
+
+    def _entry(self, owner, name):
+        key = (id(owner), name)
+        entry = self.collections.get(key)
+        if entry is None:
+            entry = self.collections[key] = [owner, name, [], False, []]
+        return entry
+
+    @contextmanager
+    def paused(self):
+        previous, self.enabled = self.enabled, False
+        try:
+            yield
+        finally:
+            self.enabled = previous
+
+
+tracker = ChangeTracker()
+
+
+class TrackedList(list):
+    """List that reports appends and removals to its owning model."""
+
+    def __init__(self, owner, name, items=()):
+        super().__init__(items)
+        self._owner = owner
+        self._name = name
+
+    def append(self, item):
+        super().append(item)
+        self._owner._child_added(self._name, item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def remove(self, item):
+        super().remove(item)
+        self._owner._child_removed(self._name, item)
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._owner._child_removed(self._name, item)
+        return item
+
+    def _reset(method):
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._owner._collection_reset(self._name)
+            return result
+        return wrapper
+
+    insert = _reset(list.insert)
+    clear = _reset(list.clear)
+    sort = _reset(list.sort)
+    reverse = _reset(list.reverse)
+    __setitem__ = _reset(list.__setitem__)
+    __delitem__ = _reset(list.__delitem__)
+    __imul__ = _reset(list.__imul__)
+    del _reset
+
+
+class Trackable:
+    """Mixin that marks a model dirty when one of its persisted fields changes."""
+
+    __slots__ = ()
+    _tracked_fields = frozenset()
+    _tracked_lists = frozenset()
+
+    def __setattr__(self, name, value):
+        if name in self._tracked_lists and not isinstance(value, TrackedList):
+            value = TrackedList(self, name, value)
+            object.__setattr__(self, name, value)
+            self._collection_reset(name)
+            return
+        object.__setattr__(self, name, value)
+        if name in self._tracked_fields:
+            tracker.mark_dirty(self)
+
+    def _child_added(self, name, item):
+        tracker.mark_added(self, name, item)
+
+    def _child_removed(self, name, item):
+        tracker.mark_rewrite(self, name)
+
+    def _collection_reset(self, name):
+        tracker.mark_rewrite(self, name)
+
+    def mark_deleted(self):
+        tracker.mark_deleted(self)
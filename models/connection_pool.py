@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from .instrumentation import metrics, InstrumentedConnection
+
+
+class ConnectionPool:
+    """Keeps tuned SQLite connections open and lends one to each thread.
+
+    Writers and readers come from separate pools; readers are opened
+    read-only so GUI queries never take the write lock.
+    """
+
+    PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA cache_size = -32000",
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA busy_timeout = 5000",
+    )
+
+    def __init__(self, path, size=4, readers=4):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = {"writer": [], "reader": []}
+        self._slots = {"writer": threading.BoundedSemaphore(size), "reader": threading.BoundedSemaphore(readers)}
+        self._opened = []
+
+    def _open(self, kind):
+        if kind == "reader":
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False,
+                                   factory=InstrumentedConnection)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False, factory=InstrumentedConnection)
+            conn.execute("PRAGMA journal_mode = WAL")
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        metrics.attach(conn)
+        with self._lock:
+            self._opened.append(conn)
+        return conn
+
+    @contextmanager
+    def _lend(self, kind):
+        held = getattr(self._local, kind, None)
+        if held is None:
+            held = [None, 0]
+            setattr(self._local, kind, held)
+        if held[1] == 0:
+            self._slots[kind].acquire()
+            with self._lock:
+                idle = self._idle[kind]
+                held[0] = idle.pop() if idle else None
+            if held[0] is None:
+                try:
+                    held[0] = self._open(kind)
+                except Exception:
+                    self._slots[kind].release()
+                    raise
+        held[1] += 1
+        try:
+            yield held[0]
+        finally:
+            held[1] -= 1
+            if held[1] == 0:
+                conn, held[0] = held[0], None
+                with self._lock:
+                    self._idle[kind].append(conn)
+                self._slots[kind].release()
+
+    def connection(self):
+        """Read-write connection bound to the calling thread for the block."""
+        return self._lend("writer")
+
+    def reader(self):
+        """Read-only connection bound to the calling thread for the block."""
+        return self._lend("reader")
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+            self._idle = {"writer": [], "reader": []}
@@ -1,35 +1,196 @@
-from datetime import datetime
+import os
 from .abc_models import BaseContent
+from .blob_store import BlobStore, CHUNK
+from .change_tracker import Trackable, tracker
+from .timestamps import now, format_ts, to_epoch, parse_deadline
+
+_set = object.__setattr__  # loader fast path: bypasses change tracking
+
+class StoredContent:
+    """Content kept in the blob store; the object only holds its hash and size.
+
+    Each object reads and puts through _blob_store: the store its content
+    was put in until a save writes it, then the store of that database.
+    """
+    __slots__ = ()
+    _blobs = BlobStore()  # where new content goes; the newest open database's store
+
+    def _store(self, digest_size):
+        digest, size = digest_size
+        if digest != self.content_hash:
+            self.content_hash = digest
+            self.content_size = size
+
+    def open_content(self):
+        """Yields the content as byte chunks."""
+        if self.content_hash is None:
+            return iter(())
+        return self._blob_store.open(self.content_hash)
+
+    def read_content(self):
+        return b"".join(self.open_content())
+
+    def verify(self):
+        return self.content_hash is None or self._blob_store.verify(self.content_hash)
+
+class LectureMaterial(Trackable, StoredContent, BaseContent):
+    __slots__ = ("file_path", "content_hash", "content_size", "_row_id", "_course", "_blob_store")
+    _tracked_fields = frozenset({"title", "description", "file_path", "content_hash", "content_size"})
 
-class LectureMaterial(BaseContent):
     def __init__(self, title, description, file_path):
         super().__init__(title, description)
+        self._blob_store = self._blobs
         self.file_path = file_path
+        self.content_hash = None
+        self.content_size = 0
+        self._row_id = None
+        self._course = None
+        if file_path and os.path.isfile(file_path):
+            self.load_file(file_path)
+
+    @classmethod
+    def restore(cls, row_id, title, description, file_path, content_hash=None, content_size=0, blobs=None):
+        m = cls.__new__(cls)
+        _set(m, "title", title); _set(m, "description", description); _set(m, "created_at", now())
+        _set(m, "file_path", file_path); _set(m, "content_hash", content_hash); _set(m, "content_size", content_size or 0)
+        _set(m, "_row_id", row_id); _set(m, "_course", None); _set(m, "_blob_store", blobs or cls._blobs)
+        return m
+
+    def load_file(self, path=None):
+        """Copies the file into the blob store; identical files are stored once."""
+        path = path or self.file_path
+        with open(path, "rb") as f:
+            self._store(self._blob_store.put_stream(iter(lambda: f.read(CHUNK), b"")))
+        self.file_path = path
+
+    def save_as(self, path):
+        with open(path, "wb") as f:
+            for chunk in self.open_content():
+                f.write(chunk)
 
     def get_info(self):
         return f"Material: {self.title} (File: {self.file_path})"
 
-class Assignment(BaseContent):
+class Assignment(Trackable, BaseContent):
+    __slots__ = ("deadline", "due_at", "deadline_stage", "max_marks", "__grades", "_row_id", "_course",
+                 "_grade_source", "_gradebook")
+    _tracked_fields = frozenset({"title", "description", "deadline", "due_at", "deadline_stage", "max_marks"})
+
     def __init__(self, title, description, deadline, max_marks):
         super().__init__(title, description)
+        self.deadline_stage = 0  # reminders already sent; see DeadlineScheduler
+        self.due_at = None       # set from the deadline below, and left None if it cannot be read
         self.deadline = deadline
         self.max_marks = max_marks
         self.__grades = {}
+        self._row_id = None
+        self._course = None
+        self._grade_source = None  # callable returning stored grades, set by lazy loading
+        self._gradebook = None     # course Gradebook mirroring these grades, if one is built
+
+    @classmethod
+    def restore(cls, row_id, title, description, deadline, max_marks, due_at=None, deadline_stage=0):
+        a = cls.__new__(cls)
+        _set(a, "title", title); _set(a, "description", description); _set(a, "created_at", now())
+        _set(a, "deadline", deadline); _set(a, "due_at", due_at); _set(a, "deadline_stage", deadline_stage or 0)
+        _set(a, "max_marks", max_marks); _set(a, "_Assignment__grades", {})
+        _set(a, "_row_id", row_id); _set(a, "_course", None); _set(a, "_grade_source", None)
+        _set(a, "_gradebook", None)
+        return a
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "deadline":
+            # A moved deadline starts its reminders over
+            due = parse_deadline(value)
+            if due != getattr(self, "due_at", None):
+                super().__setattr__("due_at", due)
+                super().__setattr__("deadline_stage", 0)
+                course = getattr(self, "_course", None)
+                if course is not None and course._deadlines is not None:
+                    course._deadlines.schedule(course, self)
 
     def get_info(self):
         return f"Assignment: {self.title} (Due: {self.deadline})"
 
+    def is_overdue(self, at=None):
+        return self.due_at is not None and (at or now()) > self.due_at
+
     def set_grade(self, student_user, score):
-        self.__grades[student_user] = score
+        self.grades()[student_user] = score
+        if self._gradebook is not None:
+            self._gradebook.record(self, student_user, score)
+        tracker.mark_added(self, "grades", student_user)
+
+    def remove_grade(self, student_user):
+        grades = self.grades()
+        if student_user not in grades:
+            return
+        del grades[student_user]
+        if self._gradebook is not None:
+            self._gradebook.forget(self, student_user)
+        tracker.mark_removed(self, "grades", student_user)
 
     def get_grade(self, student_user):
-        return self.__grades.get(student_user, "Pending")
+        return self.grades().get(student_user, "Pending")
+
+    def grades(self):
+        if self._grade_source is not None:
+            source, self._grade_source = self._grade_source, None
+            self.__grades.update(source(self))
+        return self.__grades
+
+class Submission(Trackable, StoredContent):
+    __slots__ = ("student", "course", "assignment", "content_hash", "content_size", "submitted_at", "is_graded", "_row_id",
+                 "_blob_store")
+    _tracked_fields = frozenset({"student", "course", "assignment", "content_hash", "content_size", "submitted_at", "is_graded"})
 
-class Submission:
     def __init__(self, student_obj, course_obj, assignment_obj, content):
-        self.student = student_obj
-        self.course = course_obj
-        self.assignment = assignment_obj
-        self.content = content
-        self.date = datetime.now().strftime("%Y-%m-%d %H:%M")
-        self.is_graded = False
+        # High-volume object: fill the slots directly, then record one insert
+        store = self._blobs
+        digest, size = store.put(content) if content is not None else (None, 0)
+        _set(self, "_blob_store", store)
+        _set(self, "student", student_obj); _set(self, "course", course_obj); _set(self, "assignment", assignment_obj)
+        _set(self, "content_hash", digest); _set(self, "content_size", size)
+        _set(self, "submitted_at", now()); _set(self, "is_graded", False); _set(self, "_row_id", None)
+        tracker.mark_dirty(self)
+
+    @classmethod
+    def restore(cls, row_id, student_obj, course_obj, assignment_obj, content_hash, content_size, submitted_at, is_graded,
+                blobs=None):
+        s = cls.__new__(cls)
+        _set(s, "_blob_store", blobs or cls._blobs)
+        _set(s, "student", student_obj); _set(s, "course", course_obj); _set(s, "assignment", assignment_obj)
+        _set(s, "content_hash", content_hash); _set(s, "content_size", content_size or 0)
+        _set(s, "submitted_at", submitted_at); _set(s, "is_graded", is_graded); _set(s, "_row_id", row_id)
+        return s
+
+    @property
+    def content(self):
+        # Read from the store on each use; it is never kept on the object
+        return self.read_content().decode("utf-8") if self.content_hash is not None else None
+
+    @content.setter
+    def content(self, value):
+        if value is None:
+            self._store((None, 0))
+        else:
+            self._store(self._blob_store.put(value))
+
+    def __setattr__(self, name, value):
+        if name == "is_graded" and bool(value) != bool(self.is_graded):
+            self.course._graded_changed(self, value)
+        super().__setattr__(name, value)
+
+    @property
+    def is_late(self):
+        due = self.assignment.due_at
+        return due is not None and self.submitted_at is not None and self.submitted_at > due
+
+    @property
+    def date(self):
+        return format_ts(self.submitted_at)
+
+    @date.setter
+    def date(self, value):
+        self.submitted_at = to_epoch(value)
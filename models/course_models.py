@@ -1,7 +1,20 @@
-from datetime import datetime
+from .change_tracker import Trackable, tracker
+
+class Course(Trackable):
+    _tracked_fields = frozenset({"cid", "title", "instructor"})
+    _tracked_lists = frozenset({"students", "materials", "assignments", "submissions", "announcements"})
+    _content_lists = frozenset({"materials", "assignments", "submissions"})
+    _content_source = None  # set when content is loaded lazily
+    _stats = None           # registry-wide totals, set while registered
+    _gradebook = None
+    _deadlines = None       # DeadlineScheduler told about new assignments, if one is running
 
-class Course:
     def __init__(self, cid, title, instructor):
+        # Lookup indexes kept in step with the lists below
+        self._enrolled = set()      # usernames
+        self._assignment_index = {} # title -> [Assignment]
+        self._submission_index = {} # (username, assignment title) -> [Submission]
+        self._counts = {"students": 0, "materials": 0, "submissions": 0, "ungraded": 0}
         self.cid = cid
         self.title = title
         self.instructor = instructor
@@ -14,11 +27,156 @@ class Course:
         self.reviews = []
 
     def add_student(self, student):
-        if student not in self.students:
+        if student.get_username() not in self._enrolled:
             self.students.append(student)
 
+    def remove_student(self, student):
+        if student.get_username() in self._enrolled:
+            self.students.remove(student)
+
+    def broadcast(self, sender, subject, body):
+        """Messages every enrolled student at once."""
+        return sender.broadcast(self.students, subject, body, course=self)
+
+    def announce(self, sender, subject, body=""):
+        """Posts an announcement and puts it in every enrolled student's feed."""
+        self.announcements.append(f"{subject}: {body}" if body else subject)
+        return sender.broadcast(self.students, subject, body, course=self, kind="announcement")
+
+    def is_enrolled(self, username):
+        return username in self._enrolled
+
+    def _ensure_content(self):
+        if self._content_source is not None:
+            self._content_source.ensure(self)
+
     def has_submitted(self, student_username, assignment_title):
-        for s in self.submissions:
-            if s.student.get_username() == student_username and s.assignment.title == assignment_title:
-                return True
-        return False
+        self._ensure_content()
+        return (student_username, assignment_title) in self._submission_index
+
+    def get_submission(self, student_username, assignment_title):
+        self._ensure_content()
+        found = self._submission_index.get((student_username, assignment_title))
+        return found[-1] if found else None
+
+    def get_assignment(self, title):
+        self._ensure_content()
+        found = self._assignment_index.get(title)
+        return found[0] if found else None
+
+    def late_submissions(self):
+        self._ensure_content()
+        return [s for s in self.submissions if s.is_late]
+
+    def gradebook(self):
+        """Columnar grade matrix for the course (needs numpy), built on first use."""
+        if self._gradebook is None:
+            from .gradebook import Gradebook
+            self._gradebook = Gradebook(self)
+        return self._gradebook
+
+    def _drop_gradebook(self):
+        if self._gradebook is not None:
+            self._gradebook.detach()
+            self._gradebook = None
+
+    # Counters: O(1) and valid even while lazy content is not loaded
+    def count(self, name):
+        return self._counts[name]
+
+    def _count(self, name, delta):
+        self._counts[name] += delta
+        if self._stats is not None:
+            self._stats.adjust(name, delta)
+
+    def _set_count(self, name, value):
+        if value != self._counts[name]:
+            self._count(name, value - self._counts[name])
+
+    def _content_resident(self):
+        return self._content_source is None or self._content_source.is_loaded(self)
+
+    def _graded_changed(self, submission, graded):
+        key = (submission.student.get_username(), submission.assignment.title)
+        if submission in self._submission_index.get(key, ()):
+            self._count("ungraded", -1 if graded else 1)
+
+    def _index_add(self, name, item):
+        if name == "students":
+            self._enrolled.add(item.get_username())
+            self._set_count("students", len(self._enrolled))
+        elif name == "materials":
+            self._count("materials", 1)
+        elif name == "assignments":
+            self._assignment_index.setdefault(item.title, []).append(item)
+            if self._deadlines is not None:
+                self._deadlines.schedule(self, item)
+        elif name == "submissions":
+            key = (item.student.get_username(), item.assignment.title)
+            self._submission_index.setdefault(key, []).append(item)
+            self._count("submissions", 1)
+            if not item.is_graded:
+                self._count("ungraded", 1)
+
+    def _index_remove(self, name, item):
+        if name == "students":
+            if item not in self.students:
+                self._enrolled.discard(item.get_username())
+                self._set_count("students", len(self._enrolled))
+        elif name == "materials":
+            self._count("materials", -1)
+        elif name in ("assignments", "submissions"):
+            index = self._assignment_index if name == "assignments" else self._submission_index
+            key = item.title if name == "assignments" else (item.student.get_username(), item.assignment.title)
+            bucket = index.get(key, [])
+            if item in bucket:
+                bucket.remove(item)
+                if name == "submissions":
+                    self._count("submissions", -1)
+                    if not item.is_graded:
+                        self._count("ungraded", -1)
+            if not bucket:
+                index.pop(key, None)
+
+    def _child_added(self, name, item):
+        self._index_add(name, item)
+        if name in ("students", "assignments"):
+            self._drop_gradebook()
+        if name in self._content_lists:
+            if name != "submissions":
+                item._course = self
+            tracker.mark_attached(item)
+        else:
+            super()._child_added(name, item)
+
+    def _child_removed(self, name, item):
+        self._index_remove(name, item)
+        if name in ("students", "assignments"):
+            self._drop_gradebook()
+        if name in self._content_lists:
+            tracker.mark_deleted(item)
+        else:
+            super()._child_removed(name, item)
+
+    def _collection_reset(self, name):
+        if name in ("students", "assignments"):
+            self._drop_gradebook()
+        if name == "students":
+            self._enrolled = {s.get_username() for s in self.students}
+            self._set_count("students", len(self._enrolled))
+        elif name == "materials" and self._content_resident():
+            self._set_count("materials", len(self.materials))
+        elif name == "assignments":
+            self._assignment_index = {}
+            for a in self.assignments:
+                self._index_add(name, a)
+        elif name == "submissions":
+            self._submission_index = {}
+            for s in self.submissions:
+                key = (s.student.get_username(), s.assignment.title)
+                self._submission_index.setdefault(key, []).append(s)
+            # An evicted course keeps the counts it had while loaded
+            if self._content_resident():
+                self._set_count("submissions", len(self.submissions))
+                self._set_count("ungraded", sum(1 for s in self.submissions if not s.is_graded))
+        super()._collection_reset(name)
@@ -1,331 +1,913 @@
+import base64
+import os
 import sqlite3
 import json
-from .user_models import Admin, Instructor, Student, PrivateMessage
+import threading
+from .user_models import User, Admin, Instructor, Student, PrivateMessage, Broadcast, DeliveredMessage
 from .course_models import Course
-from .content_models import Assignment, LectureMaterial, Submission
+from .content_models import Assignment, LectureMaterial, Submission, StoredContent
+from .blob_store import BlobStore
+from .change_tracker import tracker
+from .connection_pool import ConnectionPool
+from .migrations import MIGRATIONS, migrate, schema_version, scope_token, index_submission
+from .registry import Registry
+from .lazy_loading import CourseContentCache
+from .write_behind import WriteBehindWriter
+from .audit_log import AuditLog, LogEntry
+from .timestamps import now, format_ts
+from .instrumentation import metrics
 
 class DatabaseManager:
     DB_NAME = "lms_data.db"
+    LOG_CAPACITY = 1000         # audit entries kept in memory
+    LOG_RETENTION_DAYS = None   # None keeps the full history
+    LOG_MAX_ROWS = None
 
     def __init__(self):
-        self.conn = None
+        self.pool = ConnectionPool(self.DB_NAME)
+        self.registry = None
+        self.content_cache = None
+        self.writer = None
+        self._write_lock = threading.RLock()
+        self._deleting = {}
+        self._written = set()  # ids of objects already upserted in the current save
+        self._blobs_written = []
+        self._saved_logs = 0
+        self._saved_course_seq = None
+        self._versions = {}  # table -> number of committed writes this session
+        self.blobs = BlobStore(self)
+        StoredContent._blobs = self.blobs
         self.create_tables()
 
-    def connect(self):
-        self.conn = sqlite3.connect(self.DB_NAME)
-        self.conn.row_factory = sqlite3.Row
-
     def close(self):
-        if self.conn:
-            self.conn.close()
+        self.pool.close()
 
     def create_tables(self):
-        self.connect()
-        cursor = self.conn.cursor()
-        
-        # Enable foreign keys
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        with self.pool.connection() as conn:
+            migrate(conn)
 
-        # Users
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                password TEXT,
-                email TEXT,
-                role TEXT
-            )
-        """)
-
-        # Courses
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                cid TEXT PRIMARY KEY,
-                title TEXT,
-                instructor_username TEXT,
-                FOREIGN KEY(instructor_username) REFERENCES users(username)
-            )
-        """)
-
-        # Enrollments
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS enrollments (
-                student_username TEXT,
-                course_cid TEXT,
-                FOREIGN KEY(student_username) REFERENCES users(username),
-                FOREIGN KEY(course_cid) REFERENCES courses(cid)
-            )
-        """)
-
-        # Assignments
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS assignments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_cid TEXT,
-                title TEXT,
-                description TEXT,
-                deadline TEXT,
-                max_marks INTEGER,
-                FOREIGN KEY(course_cid) REFERENCES courses(cid)
-            )
-        """)
-
-        # Assignment Grades
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS assignment_grades (
-                assignment_id INTEGER,
-                student_username TEXT,
-                score INTEGER,
-                FOREIGN KEY(assignment_id) REFERENCES assignments(id),
-                FOREIGN KEY(student_username) REFERENCES users(username)
-            )
-        """)
-
-        # Materials
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS materials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_cid TEXT,
-                title TEXT,
-                description TEXT,
-                file_path TEXT,
-                FOREIGN KEY(course_cid) REFERENCES courses(cid)
-            )
-        """)
-
-
-
-        # Submissions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS submissions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_cid TEXT,
-                assignment_title TEXT,
-                student_username TEXT,
-                content TEXT,
-                date TEXT,
-                is_graded INTEGER,
-                FOREIGN KEY(course_cid) REFERENCES courses(cid),
-                FOREIGN KEY(student_username) REFERENCES users(username)
-            )
-        """)
-
-
-
-        # Messages
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender TEXT,
-                recipient TEXT,
-                subject TEXT,
-                body TEXT,
-                timestamp TEXT,
-                is_read INTEGER,
-                FOREIGN KEY(recipient) REFERENCES users(username)
-            )
-        """)
-
-        # Notifications
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                message TEXT,
-                FOREIGN KEY(username) REFERENCES users(username)
-            )
-        """)
-
-        # Logs
+    @metrics.timed("save_full_state")
+    def save_full_state(self, users, courses, logs):
+        changes = self.collect_changes(logs)
+        if self.writer is not None:
+            self.writer.submit(changes)
+        else:
+            self.write_changes(changes)
+
+    def collect_changes(self, logs):
+        """Takes everything changed since the last save; cheap enough for the GUI thread."""
+        changes = tracker.drain()
+        if isinstance(logs, AuditLog):
+            changes.logs = logs.take_unsaved()
+        else:
+            changes.logs = [LogEntry(now(), "INFO", None, str(l)) for l in logs[self._saved_logs:]]
+            self._saved_logs = len(logs)
+        if self.registry is not None and self.registry.course_id_counter != self._saved_course_seq:
+            changes.course_seq = self._saved_course_seq = self.registry.course_id_counter
+        return changes
+
+    @metrics.timed("write_changes")
+    def write_changes(self, changes):
+        with self._write_lock, self.pool.connection() as conn, conn:
+            cursor = conn.cursor()
+            self._deleting = changes.deleted
+            self._blobs_written = written = []  # (store holding the content, digest, object)
+            try:
+                for obj in changes.deleted.values():
+                    self._delete_row(cursor, obj)
+
+                for obj in sorted(changes.dirty.values(), key=self._save_rank):
+                    self._upsert_row(cursor, obj)
+                    self._written.add(id(obj))
+
+                for owner, name, added, rewrite, removed in changes.collections.values():
+                    if name == "grades" and self._detached(owner._course):
+                        continue
+                    self._save_collection(cursor, owner, name, added, rewrite, removed)
+
+                # Logs are append-only
+                cursor.executemany("INSERT INTO logs (ts, level, actor, message) VALUES (?, ?, ?, ?)", changes.logs)
+
+                if changes.course_seq is not None:
+                    cursor.execute("""
+                        INSERT INTO sequences (name, value) VALUES ('course_id', ?)
+                        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+                    """, (changes.course_seq,))
+            finally:
+                self._deleting = {}
+                self._written = set()
+                self._blobs_written = []
+        # Blobs leave memory only once the rows that use them are committed; from then
+        # on the objects read their content from this database
+        for store, digest, obj in written:
+            obj._blob_store = self.blobs
+            store.saved((digest,))
+        self.bump_versions(self._tables_touched(changes))
+
+    def table_versions(self, tables):
+        """Version stamp for tables; it changes whenever any of them is written."""
+        with self._write_lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def bump_versions(self, tables):
+        with self._write_lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    _CASCADES = {
+        "users": ("users", "notifications", "messages", "deliveries", "enrollments", "assignment_grades", "submissions"),
+        "courses": ("courses", "assignments", "materials", "submissions", "enrollments", "announcements",
+                    "assignment_grades", "broadcasts"),
+        "assignments": ("assignments", "assignment_grades"),
+        "messages": ("messages", "deliveries"),
+        "broadcasts": ("broadcasts", "deliveries", "notifications"),
+    }
+    _COLLECTION_TABLES = {"students": "enrollments", "grades": "assignment_grades", "inbox": "messages"}
+
+    def _tables_touched(self, changes):
+        tables = set()
+        for obj in changes.deleted.values():
+            table = self._row_table(obj)
+            tables.update(self._CASCADES.get(table, (table,)))
+        for obj in changes.dirty.values():
+            tables.add(self._row_table(obj))
+        for owner, name, added, rewrite, removed in changes.collections.values():
+            table = self._COLLECTION_TABLES.get(name, name)
+            tables.update(self._CASCADES.get(table, (table,)) if rewrite else (table,))
+        if changes.logs:
+            tables.add("logs")
+        if changes.course_seq is not None:
+            tables.add("sequences")
+        return tables
+
+    def _row_table(self, obj):
+        if isinstance(obj, User): return "users"
+        if isinstance(obj, Course): return "courses"
+        if isinstance(obj, Broadcast): return "broadcasts"
+        if isinstance(obj, DeliveredMessage): return "deliveries"
+        return self._table_for(obj)
+
+    def start_write_behind(self, delay=0.05, on_error=None):
+        """Moves saves onto a background thread; save_full_state then returns at once.
+
+        on_error(changes, exc) hears about change sets the writer gave up on.
+        """
+        if self.writer is None:
+            self.writer = WriteBehindWriter(self, delay, on_error)
+            self.writer.start()
+        return self.writer
+
+    def flush(self, timeout=None):
+        """Blocks until every queued save is durable. Returns False on timeout or a failed save."""
+        return self.writer.flush(timeout) if self.writer is not None else True
+
+    def saving(self):
+        """True while a queued save is not yet durable; never blocks."""
+        return self.writer is not None and bool(self.writer.queued())
+
+    _SAVE_ORDER = (User, Course, Broadcast, Assignment, LectureMaterial, Submission, PrivateMessage)
+
+    def _save_rank(self, obj):
+        for rank, cls in enumerate(self._SAVE_ORDER):
+            if isinstance(obj, cls):
+                return rank
+        return len(self._SAVE_ORDER)
+
+    def _upsert_row(self, cursor, obj):
+        if isinstance(obj, User):
+            cursor.execute("""
+                INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET password = excluded.password,
+                    email = excluded.email, role = excluded.role
+            """, (obj.get_username(), obj._User__password, obj.get_email(), obj.get_role()))
+        elif isinstance(obj, Course):
+            cursor.execute("""
+                INSERT INTO courses (cid, title, instructor_username) VALUES (?, ?, ?)
+                ON CONFLICT(cid) DO UPDATE SET title = excluded.title,
+                    instructor_username = excluded.instructor_username
+            """, (obj.cid, obj.title, obj.instructor.get_username()))
+        elif isinstance(obj, Assignment):
+            if self._detached(obj._course):
+                return
+            obj._row_id = self._upsert_by_id(cursor, "assignments",
+                ("course_cid", "title", "description", "deadline", "max_marks", "due_at", "deadline_stage"),
+                obj._row_id, (obj._course.cid, obj.title, obj.description, obj.deadline, obj.max_marks,
+                              obj.due_at, obj.deadline_stage))
+        elif isinstance(obj, LectureMaterial):
+            if self._detached(obj._course):
+                return
+            self._write_blob(cursor, obj)
+            obj._row_id = self._upsert_by_id(cursor, "materials",
+                ("course_cid", "title", "description", "file_path", "content_hash", "content_size"),
+                obj._row_id, (obj._course.cid, obj.title, obj.description, obj.file_path,
+                              obj.content_hash, obj.content_size))
+        elif isinstance(obj, Submission):
+            if self._detached(obj.course) or self._detached(obj.student):
+                return
+            entry = (obj.course.cid, obj.assignment.title, obj.student.get_username(), obj.content_hash)
+            stored = None
+            if obj._row_id is not None:
+                stored = cursor.execute("""
+                    SELECT course_cid, assignment_title, student_username, content_hash FROM submissions WHERE id = ?
+                """, (obj._row_id,)).fetchone()
+            self._write_blob(cursor, obj)
+            obj._row_id = self._upsert_by_id(cursor, "submissions",
+                ("course_cid", "assignment_title", "student_username", "content_hash", "content_size",
+                 "submitted_at", "is_graded"),
+                obj._row_id, (*entry[:3], obj.content_hash, obj.content_size,
+                              obj.submitted_at, 1 if obj.is_graded else 0))
+            # Grading leaves the search index alone; new or changed text is re-indexed
+            if stored is None or tuple(stored) != entry:
+                text = self.blobs.read(obj.content_hash, cursor.connection) if obj.content_hash else b""
+                index_submission(cursor, obj._row_id, *entry[:3], text.decode("utf-8", "replace"),
+                                 replace=stored is not None)
+        elif isinstance(obj, Broadcast):
+            if obj._row_id is None:
+                self._insert_broadcast(cursor, obj)
+        elif isinstance(obj, DeliveredMessage):
+            if obj._broadcast._row_id is not None:
+                cursor.execute("UPDATE deliveries SET is_read = ? WHERE broadcast_id = ? AND recipient = ?",
+                               (1 if obj.is_read else 0, obj._broadcast._row_id, obj.recipient))
+        elif isinstance(obj, PrivateMessage):
+            if obj.recipient is None or self.registry and self.registry.get_user(obj.recipient) is None:
+                return
+            obj._row_id = self._upsert_by_id(cursor, "messages",
+                ("sender", "recipient", "subject", "body", "sent_at", "is_read"),
+                obj._row_id, (obj.sender, obj.recipient, obj.subject, obj.body,
+                              obj.sent_at, 1 if obj.is_read else 0))
+
+    def _insert_broadcast(self, cursor, b):
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message TEXT
-            )
-        """)
-
-        # Announcements
+            INSERT INTO broadcasts (sender, course_cid, kind, subject, body, sent_at) VALUES (?, ?, ?, ?, ?, ?)
+        """, (b.sender, None if self._detached(b.course) else getattr(b.course, "cid", None),
+              b.kind, b.subject, b.body, b.sent_at))
+        b._row_id = cursor.lastrowid
+        known = self.registry.get_user if self.registry is not None else lambda name: True
+        cursor.executemany("INSERT OR IGNORE INTO deliveries (broadcast_id, recipient) VALUES (?, ?)",
+                           [(b._row_id, name) for name in b.recipients if known(name)])
+        # Feed entries come straight from the delivery rows
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS announcements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_cid TEXT,
-                message TEXT,
-                FOREIGN KEY(course_cid) REFERENCES courses(cid)
-            )
-        """)
-
-        self.conn.commit()
-        self.close()
-
-    def save_full_state(self, users, courses, logs):
-        self.connect()
-        cursor = self.conn.cursor()
-        
-        # Clear all tables
-        tables = ["users", "courses", "enrollments", "assignments", "assignment_grades",
-                  "materials", "quizzes", "quiz_attempts", "submissions", "messages", 
-                  "notifications", "logs", "announcements"]
-        for t in tables:
-            cursor.execute(f"DELETE FROM {t}")
-        
-        # Save Users
-        for u in users:
-            role = u.get_role()
-            cursor.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
-                           (u.get_username(), u._User__password, u.get_email(), role))
-            
-            # Save Notifications
-            for n in u.notifications:
-                cursor.execute("INSERT INTO notifications (username, message) VALUES (?, ?)", (u.get_username(), n))
-            
-
-
-            # Save Inbox
-            for m in u.inbox:
-                cursor.execute("""
-                    INSERT INTO messages (sender, recipient, subject, body, timestamp, is_read) 
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (m.sender, u.get_username(), m.subject, m.body, m.timestamp, 1 if m.is_read else 0))
-
-        # Save Courses
-        for c in courses:
-            cursor.execute("INSERT INTO courses (cid, title, instructor_username) VALUES (?, ?, ?)",
-                           (c.cid, c.title, c.instructor.get_username()))
-            
-            # Enrollments
-            for s in c.students:
-                cursor.execute("INSERT INTO enrollments (student_username, course_cid) VALUES (?, ?)",
-                               (s.get_username(), c.cid))
-            
-            # Announcements
-            for a in c.announcements:
-                 cursor.execute("INSERT INTO announcements (course_cid, message) VALUES (?, ?)", (c.cid, a))
-            
-            # Assignments
-            for a in c.assignments:
+            INSERT INTO notifications (username, message)
+            SELECT recipient, ? FROM deliveries WHERE broadcast_id = ?
+        """, (f"[{format_ts(b.sent_at, '%H:%M')}] {b.note()}", b._row_id))
+
+    def _write_blob(self, cursor, obj):
+        # New content waits in the store it was put in, which may belong to another open database
+        if obj.content_hash is not None:
+            obj._blob_store.write(cursor, obj.content_hash)
+            self._blobs_written.append((obj._blob_store, obj.content_hash, obj))
+
+    def _detached(self, owner):
+        # Rows whose owner is gone or is being deleted in this save are skipped
+        return owner is None or id(owner) in self._deleting
+
+    def _upsert_by_id(self, cursor, table, columns, row_id, values):
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+        cursor.execute(f"""
+            INSERT INTO {table} (id, {", ".join(columns)}) VALUES (?{", ?" * len(columns)})
+            ON CONFLICT(id) DO UPDATE SET {updates}
+        """, (row_id, *values))
+        return row_id if row_id is not None else cursor.lastrowid
+
+    def _delete_row(self, cursor, obj):
+        if isinstance(obj, User):
+            name = obj.get_username()
+            for table, column in (("notifications", "username"), ("messages", "recipient"), ("deliveries", "recipient"),
+                                  ("enrollments", "student_username"), ("assignment_grades", "student_username"),
+                                  ("submissions", "student_username"), ("users", "username")):
+                cursor.execute(f"DELETE FROM {table} WHERE {column} = ?", (name,))
+        elif isinstance(obj, Course):
+            cursor.execute("""
+                DELETE FROM assignment_grades
+                WHERE assignment_id IN (SELECT id FROM assignments WHERE course_cid = ?)
+            """, (obj.cid,))
+            for table in ("assignments", "materials", "submissions", "enrollments", "announcements"):
+                cursor.execute(f"DELETE FROM {table} WHERE course_cid = ?", (obj.cid,))
+            cursor.execute("DELETE FROM courses WHERE cid = ?", (obj.cid,))
+        elif isinstance(obj, DeliveredMessage):
+            if obj._broadcast._row_id is not None:
+                cursor.execute("DELETE FROM deliveries WHERE broadcast_id = ? AND recipient = ?",
+                               (obj._broadcast._row_id, obj.recipient))
+        elif getattr(obj, "_row_id", None) is not None:
+            if isinstance(obj, Assignment):
+                cursor.execute("DELETE FROM assignment_grades WHERE assignment_id = ?", (obj._row_id,))
+            cursor.execute(f"DELETE FROM {self._table_for(obj)} WHERE id = ?", (obj._row_id,))
+            obj._row_id = None
+
+    def _table_for(self, obj):
+        if isinstance(obj, Assignment): return "assignments"
+        if isinstance(obj, LectureMaterial): return "materials"
+        if isinstance(obj, Submission): return "submissions"
+        return "messages"
+
+    def _save_collection(self, cursor, owner, name, added, rewrite, removed=()):
+        if isinstance(owner, Course) and name == "students":
+            if rewrite:
+                cursor.execute("DELETE FROM enrollments WHERE course_cid = ?", (owner.cid,))
+                added = owner.students
+            cursor.executemany("INSERT OR IGNORE INTO enrollments (student_username, course_cid) VALUES (?, ?)",
+                               [(s.get_username(), owner.cid) for s in added])
+        elif isinstance(owner, Course) and name == "announcements":
+            if rewrite:
+                cursor.execute("DELETE FROM announcements WHERE course_cid = ?", (owner.cid,))
+                added = owner.announcements
+            cursor.executemany("INSERT INTO announcements (course_cid, message) VALUES (?, ?)",
+                               [(owner.cid, a) for a in added])
+        elif isinstance(owner, User) and name == "notifications":
+            if rewrite:
+                cursor.execute("DELETE FROM notifications WHERE username = ?", (owner.get_username(),))
+                added = owner.notifications
+            cursor.executemany("INSERT INTO notifications (username, message) VALUES (?, ?)",
+                               [(owner.get_username(), n) for n in added])
+        elif isinstance(owner, Assignment) and name == "grades":
+            if owner._row_id is None:
+                return
+            # The dict as it is now decides: a key set then removed since the last save is deleted
+            grades = owner.grades()
+            touched = set(added) | set(removed)
+            cursor.executemany("""
+                INSERT INTO assignment_grades (assignment_id, student_username, score) VALUES (?, ?, ?)
+                ON CONFLICT(assignment_id, student_username) DO UPDATE SET score = excluded.score
+            """, [(owner._row_id, k, grades[k]) for k in touched if k in grades])
+            cursor.executemany("DELETE FROM assignment_grades WHERE assignment_id = ? AND student_username = ?",
+                               [(owner._row_id, k) for k in touched if k not in grades])
+        elif rewrite and (isinstance(owner, Course) and name in Course._content_lists
+                          or isinstance(owner, User) and name == "inbox"):
+            # Arbitrary list surgery: drop rows that left the list, re-save the rest
+            items = getattr(owner, name)
+            if isinstance(owner, User):
+                table, column, key = "messages", "recipient", owner.get_username()
+            else:
+                table, column, key = name, "course_cid", owner.cid
+            kept = {i._row_id for i in items if not isinstance(i, DeliveredMessage)}
+            cursor.execute(f"SELECT id FROM {table} WHERE {column} = ?", (key,))
+            stale = [(r[0],) for r in cursor.fetchall() if r[0] not in kept]
+            if table == "messages":
+                delivered = {i._broadcast._row_id for i in items if isinstance(i, DeliveredMessage)}
                 cursor.execute("""
-                    INSERT INTO assignments (course_cid, title, description, deadline, max_marks) 
-                    VALUES (?, ?, ?, ?, ?)
-                """, (c.cid, a.title, a.description, a.deadline, a.max_marks))
-                params_id = cursor.lastrowid
-                
-                # Grades
-                for stud_user, score in a._Assignment__grades.items():
-                     cursor.execute("INSERT INTO assignment_grades (assignment_id, student_username, score) VALUES (?, ?, ?)",
-                                    (params_id, stud_user, score))
-            
-            # Materials
-            for m in c.materials:
-                cursor.execute("""
-                    INSERT INTO materials (course_cid, title, description, file_path) 
-                    VALUES (?, ?, ?, ?)
-                """, (c.cid, m.title, m.description, m.file_path))
-                
-
-                                   
-            # Submissions 
-            for sub in c.submissions:
-                 cursor.execute("""
-                    INSERT INTO submissions (course_cid, assignment_title, student_username, content, date, is_graded)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                 """, (c.cid, sub.assignment.title, sub.student.get_username(), sub.content, sub.date, 1 if sub.is_graded else 0))
-
-        # Save Logs
-        for l in logs:
-            cursor.execute("INSERT INTO logs (message) VALUES (?)", (l,))
-
-        self.conn.commit()
-        self.close()
-
-    def load_full_state(self):
-        self.connect()
-        cursor = self.conn.cursor()
-        
-        users_map = {} # username -> object
-        courses = []
-        logs = []
-
-        # Load Users
-        cursor.execute("SELECT * FROM users")
-        for row in cursor.fetchall():
-            u = None
-            if row['role'] == 'Admin':
-                u = Admin(row['username'], row['password'], row['email'])
-            elif row['role'] == 'Instructor':
-                u = Instructor(row['username'], row['password'], row['email'])
-            elif row['role'] == 'Student':
-                u = Student(row['username'], row['password'], row['email'])
-            
-            users_map[row['username']] = u
-            
-            # Load Notifications
-            cursor.execute("SELECT message FROM notifications WHERE username = ?", (row['username'],))
-            u.notifications = [r['message'] for r in cursor.fetchall()]
-            
-
-
-            # Load Inbox
-            cursor.execute("SELECT * FROM messages WHERE recipient = ?", (row['username'],))
-            for m_row in cursor.fetchall():
-                msg = PrivateMessage(m_row['sender'], m_row['subject'], m_row['body'])
-                msg.timestamp = m_row['timestamp']
-                msg.is_read = bool(m_row['is_read'])
-                u.inbox.append(msg)
-
-        # Load Courses
-        cursor.execute("SELECT * FROM courses")
-        for c_row in cursor.fetchall():
-            inst = users_map.get(c_row['instructor_username'])
-            course = Course(c_row['cid'], c_row['title'], inst)
-            if inst and isinstance(inst, Instructor):
-                inst.assigned_courses.append(course)
-            
-            courses.append(course)
-            
-            # Enrollments
-            cursor.execute("SELECT student_username FROM enrollments WHERE course_cid = ?", (c_row['cid'],))
-            for e_row in cursor.fetchall():
-                s = users_map.get(e_row['student_username'])
-                if s and isinstance(s, Student):
-                    course.add_student(s)
-                    s.enrolled_courses.append(course)
-            
-            # Announcements
-            cursor.execute("SELECT message FROM announcements WHERE course_cid = ?", (c_row['cid'],))
-            course.announcements = [r['message'] for r in cursor.fetchall()]
-
-            # Materials
-            cursor.execute("SELECT * FROM materials WHERE course_cid = ?", (c_row['cid'],))
-            for m_row in cursor.fetchall():
-                course.materials.append(LectureMaterial(m_row['title'], m_row['description'], m_row['file_path']))
-
-            # Assignments
-            cursor.execute("SELECT * FROM assignments WHERE course_cid = ?", (c_row['cid'],))
+                    SELECT d.broadcast_id FROM deliveries d JOIN broadcasts b ON b.id = d.broadcast_id
+                    WHERE d.recipient = ? AND b.kind = 'message'
+                """, (key,))
+                cursor.executemany("DELETE FROM deliveries WHERE broadcast_id = ? AND recipient = ?",
+                                   [(r[0], key) for r in cursor.fetchall() if r[0] not in delivered])
+            if table == "assignments":
+                cursor.executemany("DELETE FROM assignment_grades WHERE assignment_id = ?", stale)
+            cursor.executemany(f"DELETE FROM {table} WHERE id = ?", stale)
+            for i in sorted(items, key=self._save_rank):
+                if id(i) not in self._written:
+                    self._upsert_row(cursor, i)
+
+    def _stream(self, cursor, sql, size=2000):
+        cursor.execute(sql)
+        rows = cursor.fetchmany(size)
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(size)
+
+    @metrics.timed("load_full_state")
+    def load_full_state(self, lazy=False, max_loaded_courses=None):
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+
+            users_map = {} # username -> object
+            courses_map = {} # cid -> object
+            roles = {"Admin": Admin, "Instructor": Instructor, "Student": Student}
+
+            # Each table is read once; rows are grouped onto their owners by key
+            with tracker.paused():
+                # Load Users
+                for row in self._stream(cursor, "SELECT * FROM users"):
+                    cls = roles.get(row['role'])
+                    if cls:
+                        users_map[row['username']] = cls(row['username'], row['password'], row['email'])
+
+                # Load Notifications
+                notifications = {}
+                for r in self._stream(cursor, "SELECT username, message FROM notifications ORDER BY id"):
+                    notifications.setdefault(r['username'], []).append(r['message'])
+                for username, items in notifications.items():
+                    if username in users_map:
+                        users_map[username].notifications = items
+
+                # Load Inbox
+                for m_row in self._stream(cursor, "SELECT * FROM messages ORDER BY id"):
+                    u = users_map.get(m_row['recipient'])
+                    if u:
+                        u.inbox.append(PrivateMessage.restore(
+                            m_row['id'], m_row['sender'], m_row['recipient'], m_row['subject'], m_row['body'],
+                            m_row['sent_at'] or 0, bool(m_row['is_read'])))
+
+                # Broadcast deliveries share one Broadcast per message
+                broadcasts, delivered = {}, set()
+                for d_row in self._stream(cursor, """
+                        SELECT b.id, b.sender, b.subject, b.body, b.sent_at, d.recipient, d.is_read
+                        FROM deliveries d JOIN broadcasts b ON b.id = d.broadcast_id
+                        WHERE b.kind = 'message' ORDER BY d.broadcast_id"""):
+                    u = users_map.get(d_row['recipient'])
+                    if u:
+                        b = broadcasts.get(d_row['id'])
+                        if b is None:
+                            b = broadcasts[d_row['id']] = Broadcast.restore(
+                                d_row['id'], d_row['sender'], d_row['subject'], d_row['body'], d_row['sent_at'])
+                        u.inbox.append(DeliveredMessage.deliver(b, u.get_username(), bool(d_row['is_read'])))
+                        delivered.add(u)
+                for u in delivered:
+                    u.inbox.sort(key=lambda m: m.sent_at)
+
+                # Load Courses
+                for c_row in self._stream(cursor, "SELECT * FROM courses ORDER BY rowid"):
+                    inst = users_map.get(c_row['instructor_username'])
+                    course = Course(c_row['cid'], c_row['title'], inst)
+                    if inst and isinstance(inst, Instructor):
+                        inst.assigned_courses.append(course)
+                    courses_map[c_row['cid']] = course
+
+                # Enrollments
+                enrollments = {}
+                for e_row in self._stream(cursor, "SELECT student_username, course_cid FROM enrollments ORDER BY rowid"):
+                    enrollments.setdefault(e_row['course_cid'], []).append(e_row['student_username'])
+                for cid, course in courses_map.items():
+                    for username in enrollments.get(cid, ()):
+                        s = users_map.get(username)
+                        if s and isinstance(s, Student):
+                            course.add_student(s)
+                            s.enrolled_courses.append(course)
+
+                if lazy:
+                    # Course content is fetched per course on first use
+                    self.content_cache = CourseContentCache(self, max_loaded_courses)
+                    for course in courses_map.values():
+                        self.content_cache.attach(course)
+                    # Counters are seeded without loading any content
+                    for cid, counts in self.course_counts(cursor).items():
+                        course = courses_map.get(cid)
+                        if course:
+                            for name, value in counts.items():
+                                course._set_count(name, value)
+                else:
+                    # Announcements
+                    announcements = {}
+                    for r in self._stream(cursor, "SELECT course_cid, message FROM announcements ORDER BY id"):
+                        announcements.setdefault(r['course_cid'], []).append(r['message'])
+                    for cid, items in announcements.items():
+                        if cid in courses_map:
+                            courses_map[cid].announcements = items
+
+                    # Materials
+                    for m_row in self._stream(cursor, "SELECT * FROM materials ORDER BY id"):
+                        course = courses_map.get(m_row['course_cid'])
+                        if course:
+                            course.materials.append(self._material_from_row(m_row))
+
+                    # Assignments
+                    assignments = {} # id -> object
+                    by_title = {} # (cid, title) -> first assignment with that title
+                    for a_row in self._stream(cursor, "SELECT * FROM assignments ORDER BY id"):
+                        course = courses_map.get(a_row['course_cid'])
+                        if course:
+                            assign = self._assignment_from_row(a_row)
+                            course.assignments.append(assign)
+                            assignments[a_row['id']] = assign
+                            by_title.setdefault((course.cid, assign.title), assign)
+
+                    # Grades
+                    for g_row in self._stream(cursor, "SELECT * FROM assignment_grades ORDER BY rowid"):
+                        assign = assignments.get(g_row['assignment_id'])
+                        if assign:
+                            assign.set_grade(g_row['student_username'], g_row['score'])
+
+                    # Submissions
+                    for s_row in self._stream(cursor, "SELECT * FROM submissions ORDER BY id"):
+                        course = courses_map.get(s_row['course_cid'])
+                        student_obj = users_map.get(s_row['student_username'])
+                        assign_obj = by_title.get((s_row['course_cid'], s_row['assignment_title']))
+                        if course and student_obj and assign_obj:
+                            course.submissions.append(self._submission_from_row(s_row, student_obj, course, assign_obj))
+
+                # Load Logs (only the newest stay in memory)
+                logs = AuditLog(self, self.LOG_CAPACITY, self.LOG_RETENTION_DAYS, self.LOG_MAX_ROWS)
+                cursor.execute("SELECT ts, level, actor, message FROM logs ORDER BY id DESC LIMIT ?", (self.LOG_CAPACITY,))
+                logs.restore(AuditLog.from_row(r) for r in reversed(cursor.fetchall()))
+
+            cursor.execute("SELECT value FROM sequences WHERE name = 'course_id'")
+            seq = cursor.fetchone()
+            self._saved_course_seq = seq['value'] if seq else None
+
+        self.registry = Registry(users_map.values(), courses_map.values(),
+                                 self._saved_course_seq or Registry.FIRST_COURSE_ID)
+        self.registry.db = self
+        logs.compact()
+        self.collect_blobs()
+        return self.registry.users, self.registry.courses, logs
+
+    def course_counts(self, cursor=None):
+        """cid -> stored materials, submissions and ungraded submissions, from grouped queries."""
+        if cursor is None:
+            with self.pool.reader() as conn:
+                return self.course_counts(conn.cursor())
+        counts = {}
+        cursor.execute("SELECT course_cid, COUNT(*) FROM materials GROUP BY course_cid")
+        for cid, n in cursor.fetchall():
+            counts.setdefault(cid, {"materials": 0, "submissions": 0, "ungraded": 0})["materials"] = n
+        cursor.execute("SELECT course_cid, COUNT(*), SUM(is_graded = 0) FROM submissions GROUP BY course_cid")
+        for cid, n, ungraded in cursor.fetchall():
+            entry = counts.setdefault(cid, {"materials": 0, "submissions": 0, "ungraded": 0})
+            entry["submissions"], entry["ungraded"] = n, ungraded
+        return counts
+
+    # Deadlines, answered from the due_at index without loading any course
+    def open_deadlines(self, max_stage):
+        """(course cid, title, due_at, stage) of every deadline still owed a reminder or closing."""
+        with self.pool.reader() as conn:
+            return [tuple(r) for r in conn.execute("""
+                SELECT course_cid, title, due_at, deadline_stage FROM assignments
+                WHERE due_at IS NOT NULL AND deadline_stage <= ? ORDER BY due_at
+            """, (max_stage,))]
+
+    def upcoming_deadlines(self, start, end, student=None):
+        """Assignments due in [start, end), optionally only in a student's courses."""
+        sql = """
+            SELECT a.course_cid, c.title AS course_title, a.title, a.due_at FROM assignments a
+            JOIN courses c ON c.cid = a.course_cid
+            WHERE a.due_at >= ? AND a.due_at < ?"""
+        params = [start, end]
+        if student is not None:
+            sql += " AND a.course_cid IN (SELECT course_cid FROM enrollments WHERE student_username = ?)"
+            params.append(student)
+        with self.pool.reader() as conn:
+            return conn.execute(sql + " ORDER BY a.due_at, a.id", params).fetchall()
+
+    def late_submissions(self, course_cid=None):
+        """Submissions stored after their assignment's deadline."""
+        sql = """
+            SELECT s.course_cid, s.assignment_title, s.student_username, s.submitted_at, a.due_at
+            FROM submissions s JOIN assignments a
+              ON a.id = (SELECT MIN(id) FROM assignments WHERE course_cid = s.course_cid AND title = s.assignment_title)
+            WHERE s.submitted_at > a.due_at"""
+        params = []
+        if course_cid is not None:
+            sql += " AND s.course_cid = ?"
+            params.append(course_cid)
+        with self.pool.reader() as conn:
+            return conn.execute(sql + " ORDER BY s.course_cid, s.submitted_at", params).fetchall()
+
+    def _material_from_row(self, row):
+        return LectureMaterial.restore(row['id'], row['title'], row['description'], row['file_path'],
+                                       row['content_hash'], row['content_size'], self.blobs)
+
+    def _assignment_from_row(self, row):
+        return Assignment.restore(row['id'], row['title'], row['description'], row['deadline'], row['max_marks'],
+                                  row['due_at'], row['deadline_stage'])
+
+    def _submission_from_row(self, row, student, course, assignment):
+        return Submission.restore(row['id'], student, course, assignment, row['content_hash'], row['content_size'],
+                                  row['submitted_at'] or 0, bool(row['is_graded']), self.blobs)
+
+    def _load_course_content(self, course, grades=False):
+        # Only builds objects, without tracking them, so it may run off the models' thread;
+        # with grades the assignments come with their grades instead of fetching them on first use
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT message FROM announcements WHERE course_cid = ? ORDER BY id", (course.cid,))
+            announcements = [r['message'] for r in cursor.fetchall()]
+
+            cursor.execute("SELECT * FROM materials WHERE course_cid = ? ORDER BY id", (course.cid,))
+            materials = [self._material_from_row(r) for r in cursor.fetchall()]
+
+            assignments, by_title = [], {}
+            cursor.execute("SELECT * FROM assignments WHERE course_cid = ? ORDER BY id", (course.cid,))
             for a_row in cursor.fetchall():
-                assign = Assignment(a_row['title'], a_row['description'], a_row['deadline'], a_row['max_marks'])
-                # Grades
-                cursor.execute("SELECT * FROM assignment_grades WHERE assignment_id = ?", (a_row['id'],))
-                for g_row in cursor.fetchall():
-                    assign.set_grade(g_row['student_username'], g_row['score'])
-                course.assignments.append(assign)
-
-
-            
-            # Submissions
-            cursor.execute("SELECT * FROM submissions WHERE course_cid = ?", (c_row['cid'],))
+                assign = self._assignment_from_row(a_row)
+                if not grades:
+                    assign._grade_source = self._load_grades
+                assignments.append(assign)
+                by_title.setdefault(assign.title, assign)
+            if grades:
+                by_id = {a._row_id: a for a in assignments}
+                cursor.execute("""
+                    SELECT g.assignment_id, g.student_username, g.score FROM assignment_grades g
+                    JOIN assignments a ON a.id = g.assignment_id WHERE a.course_cid = ? ORDER BY g.rowid
+                """, (course.cid,))
+                for assignment_id, student, score in cursor.fetchall():
+                    by_id[assignment_id].grades()[student] = score
+
+            submissions = []
+            cursor.execute("SELECT * FROM submissions WHERE course_cid = ? ORDER BY id", (course.cid,))
             for s_row in cursor.fetchall():
-                student_obj = users_map.get(s_row['student_username'])
-                # Need to find assignment object reference
-                assign_obj = next((a for a in course.assignments if a.title == s_row['assignment_title']), None)
-                
+                student_obj = self.registry.get_user(s_row['student_username'])
+                assign_obj = by_title.get(s_row['assignment_title'])
                 if student_obj and assign_obj:
-                    sub = Submission(student_obj, course, assign_obj, s_row['content'])
-                    sub.date = s_row['date']
-                    sub.is_graded = bool(s_row['is_graded'])
-                    course.submissions.append(sub)
-
-        # Load Logs
-        cursor.execute("SELECT message FROM logs")
-        logs = [r['message'] for r in cursor.fetchall()]
-
-        self.close()
-        return list(users_map.values()), courses, logs
+                    submissions.append(self._submission_from_row(s_row, student_obj, course, assign_obj))
+
+        return {"announcements": announcements, "materials": materials,
+                "assignments": assignments, "submissions": submissions}
+
+    def _load_grades(self, assignment):
+        if assignment._row_id is None:
+            return {}
+        with self.pool.reader() as conn:
+            rows = conn.execute("SELECT student_username, score FROM assignment_grades WHERE assignment_id = ? ORDER BY rowid",
+                                (assignment._row_id,))
+            return {r['student_username']: r['score'] for r in rows}
+
+    # Paged queries for list views. Pages are keyset-based: `after` is the
+    # sort key of the last row already shown, never an OFFSET.
+    USER_SORTS = {"username": ("username",), "role": ("role", "username")}
+    COURSE_SORTS = {"cid": ("cid",), "title": ("title", "cid"), "instructor": ("instructor_username", "cid")}
+
+    def _keyset_page(self, select, keys, where, params, after, limit, descending=False):
+        where, params = list(where), list(params)
+        if after is not None:
+            where.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})")
+            params.extend(after)
+        order = ", ".join(k + (" DESC" if descending else "") for k in keys)
+        sql = f"{select} {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} LIMIT ?"
+        with self.pool.reader() as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        return rows, (tuple(rows[-1][k] for k in keys) if rows else after)
+
+    def page_users(self, after=None, limit=100, sort="username", role=None, course=None, search=None):
+        where, params = [], []
+        if role:
+            where.append("role = ?"); params.append(role)
+        if course:
+            where.append("username IN (SELECT student_username FROM enrollments WHERE course_cid = ?)"); params.append(course)
+        if search:
+            where.append("username LIKE ?"); params.append(f"%{search}%")
+        return self._keyset_page("SELECT username, role, email FROM users",
+                                 self.USER_SORTS[sort], where, params, after, limit)
+
+    def page_courses(self, after=None, limit=100, sort="cid", instructor=None, search=None):
+        where, params = [], []
+        if instructor:
+            where.append("instructor_username = ?"); params.append(instructor)
+        if search:
+            where.append("title LIKE ?"); params.append(f"%{search}%")
+        return self._keyset_page("SELECT cid, title, instructor_username FROM courses",
+                                 self.COURSE_SORTS[sort], where, params, after, limit)
+
+    def page_course_stats(self, after=None, limit=100, sort="title"):
+        return self._keyset_page("""
+            SELECT cid, title, instructor_username,
+                (SELECT COUNT(*) FROM enrollments e WHERE e.course_cid = courses.cid) AS students,
+                (SELECT COUNT(*) FROM submissions s WHERE s.course_cid = courses.cid) AS submissions,
+                (SELECT COUNT(*) FROM materials m WHERE m.course_cid = courses.cid) AS materials
+            FROM courses""", self.COURSE_SORTS[sort], [], [], after, limit)
+
+    def page_inbox(self, recipient, after=None, limit=100):
+        # Direct messages and broadcast deliveries, newest first; key is unique across both
+        return self._keyset_page("""
+            SELECT * FROM (
+                SELECT 'm' || id AS key, sender, subject, body, sent_at, is_read FROM messages WHERE recipient = ?
+                UNION ALL
+                SELECT 'b' || b.id, b.sender, b.subject, b.body, b.sent_at, d.is_read
+                FROM deliveries d JOIN broadcasts b ON b.id = d.broadcast_id
+                WHERE d.recipient = ? AND b.kind = 'message')""",
+            ("sent_at", "key"), [], [recipient, recipient], after, limit, descending=True)
+
+    def page_logs(self, after=None, limit=200, start=None, end=None, actor=None, level=None):
+        where, params = [], []
+        if start is not None:
+            where.append("ts >= ?"); params.append(start)
+        if end is not None:
+            where.append("ts < ?"); params.append(end)
+        if actor:
+            where.append("actor = ?"); params.append(actor)
+        if level:
+            where.append("level = ?"); params.append(level)
+        return self._keyset_page("SELECT id, ts, level, actor, message FROM logs",
+                                 ("ts", "id"), where, params, after, limit, descending=True)
+
+    def compact_logs(self, before=None, max_rows=None):
+        """Deletes log entries older than `before` and beyond the newest `max_rows`."""
+        with self._write_lock, self.pool.connection() as conn, conn:
+            removed = 0
+            if before is not None:
+                removed += conn.execute("DELETE FROM logs WHERE ts < ?", (before,)).rowcount
+            if max_rows is not None:
+                removed += conn.execute("""
+                    DELETE FROM logs WHERE id <= (SELECT id FROM logs ORDER BY id DESC LIMIT 1 OFFSET ?)
+                """, (max_rows,)).rowcount
+        self.bump_versions(("logs",))
+        return removed
+
+    def stream_query(self, sql, params=(), size=2000):
+        """Yields rows of a read-only query without materialising the result."""
+        with self.pool.reader() as conn:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchmany(size)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(size)
+
+    # Full-text search. Results are limited to what `user` may see: content
+    # of their own courses (every course for admins), submissions they wrote
+    # or grade, and messages they sent or received.
+    def search(self, text, user, course_cid=None, limit=20, offset=0):
+        query = self._fts_query(text)
+        if not query:
+            return []
+        name, role = user.get_username(), user.get_role()
+        with self.pool.reader() as conn:
+            scope = [scope_token("u", name)]
+            scope += [scope_token("b", r[0]) for r in
+                      conn.execute("SELECT broadcast_id FROM deliveries WHERE recipient = ?", (name,))]
+            if role == "Admin":
+                scope.append("staff")
+            elif role == "Instructor":
+                for (cid,) in conn.execute("SELECT cid FROM courses WHERE instructor_username = ?", (name,)):
+                    scope += [scope_token("c", cid), scope_token("s", cid)]
+            else:
+                scope += [scope_token("c", r[0]) for r in
+                          conn.execute("SELECT course_cid FROM enrollments WHERE student_username = ?", (name,))]
+            match = f"{{title body}} : ({query}) AND scope : ({' OR '.join(scope)})"
+            if course_cid is not None:
+                match += f" AND scope : ({scope_token('c', course_cid)} OR {scope_token('s', course_cid)})"
+            return conn.execute("""
+                SELECT kind, ref, course_cid, author,
+                    highlight(search_index, 0, '[', ']') AS title,
+                    snippet(search_index, 1, '[', ']', '...', 12) AS snippet,
+                    bm25(search_index, 4.0, 1.0, 0.0) AS score
+                FROM search_index WHERE search_index MATCH ?
+                ORDER BY score LIMIT ? OFFSET ?
+            """, (match, limit, offset)).fetchall()
+
+    @staticmethod
+    def _fts_query(text):
+        # Every word must match; the last one may still be being typed
+        words = [w.replace('"', "") for w in text.split()]
+        words = [w for w in words if w]
+        if not words:
+            return ""
+        return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+    def optimize_search(self):
+        """Merges index segments; worth running after a bulk import."""
+        with self._write_lock, self.pool.connection() as conn, conn:
+            conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+    def collect_blobs(self):
+        """Deletes stored content that no submission or material uses any more."""
+        with self._write_lock, self.pool.connection() as conn, conn:
+            removed = self.blobs.collect_garbage(conn.cursor())
+        if removed:
+            self.bump_versions(("blobs",))
+        return removed
+
+    # Backups. Snapshots copy pages with the backup API while the app keeps
+    # running; exports write one JSON Lines file per table.
+    def snapshot(self, path, pages=256, progress=None, pause=0.0):
+        """Copies the live database to path; progress(status, remaining, total) is called per step."""
+        self.flush()
+        tmp = f"{path}.part"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        dest = sqlite3.connect(tmp)
+        try:
+            with self.pool.reader() as src:
+                src.backup(dest, pages=pages, progress=progress, sleep=pause)
+            # A standalone file must not depend on a -wal next to it
+            dest.execute("PRAGMA journal_mode = DELETE")
+            self._check_integrity(dest)
+        finally:
+            dest.close()
+        os.replace(tmp, path)
+        return path
+
+    def restore(self, path, progress=None):
+        """Replaces the database contents with a snapshot. Reload state afterwards."""
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            self._check_integrity(src)
+            if schema_version(src) > max(v for v, _ in MIGRATIONS):
+                raise sqlite3.DatabaseError(f"{path} was written by a newer version of the app")
+            self.flush()
+            with self._write_lock, self.pool.connection() as conn:
+                src.backup(conn, progress=progress)
+                migrate(conn)
+        finally:
+            src.close()
+        self.bump_versions(self._tables())
+
+    def export_jsonl(self, directory, tables=None, progress=None, size=2000):
+        """Streams every table to <directory>/<table>.jsonl from one consistent read."""
+        os.makedirs(directory, exist_ok=True)
+        self.flush()
+        counts = {}
+        with self.pool.reader() as conn:
+            conn.execute("BEGIN")
+            try:
+                for table in tables or self._tables(conn):
+                    cursor = conn.execute(f"SELECT * FROM {table}")
+                    columns = [d[0] for d in cursor.description]
+                    n = 0
+                    with open(os.path.join(directory, f"{table}.jsonl"), "w", encoding="utf-8") as f:
+                        rows = cursor.fetchmany(size)
+                        while rows:
+                            f.writelines(json.dumps(dict(zip(columns, r)), default=self._to_json) + "\n" for r in rows)
+                            n += len(rows)
+                            if progress:
+                                progress(table, n)
+                            rows = cursor.fetchmany(size)
+                    counts[table] = n
+                version = schema_version(conn)
+            finally:
+                conn.execute("COMMIT")
+        with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"schema_version": version, "tables": counts}, f, indent=2)
+        return counts
+
+    def import_jsonl(self, directory, progress=None, size=2000, strict=True):
+        """Loads an export into this database in one transaction; existing rows are replaced.
+
+        Rows whose foreign keys point nowhere abort the import unless strict is False.
+        """
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.flush()
+        with self._write_lock, self.pool.connection() as conn:
+            if manifest["schema_version"] != schema_version(conn):
+                raise ValueError(f"export is schema version {manifest['schema_version']}, "
+                                 f"database is {schema_version(conn)}")
+            # Tables arrive in any order; keys are checked once everything is in
+            conn.execute("PRAGMA foreign_keys = OFF")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in manifest["tables"]:
+                    conn.execute(f"DELETE FROM {table}")
+                for table in manifest["tables"]:
+                    self._import_table(conn, table, os.path.join(directory, f"{table}.jsonl"), progress, size)
+                if "submissions" in manifest["tables"]:
+                    self._index_submissions(conn)
+                broken = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if broken and strict:
+                    raise sqlite3.IntegrityError(f"{len(broken)} rows reference missing keys, first in {broken[0][0]}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.execute("PRAGMA foreign_keys = ON")
+        self.bump_versions(manifest["tables"])
+        return manifest["tables"]
+
+    def _index_submissions(self, conn):
+        # No trigger indexes submissions; their text is in the blob store
+        rows = conn.execute("""
+            SELECT id, course_cid, assignment_title, student_username, content_hash FROM submissions
+        """).fetchall()
+        cursor = conn.cursor()
+        for row_id, cid, title, student, digest in rows:
+            text = self.blobs.read(digest, conn) if digest else b""
+            index_submission(cursor, row_id, cid, title, student, text.decode("utf-8", "replace"), replace=False)
+
+    def _import_table(self, conn, table, path, progress, size):
+        with open(path, encoding="utf-8") as f:
+            first = f.readline()
+            if not first.strip():
+                return
+            columns = list(json.loads(first))
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            n, chunk = 0, [first]
+            for line in f:
+                chunk.append(line)
+                if len(chunk) >= size:
+                    n += self._insert_lines(conn, sql, columns, chunk)
+                    chunk = []
+                    if progress:
+                        progress(table, n)
+            n += self._insert_lines(conn, sql, columns, chunk)
+            if progress:
+                progress(table, n)
+
+    def _insert_lines(self, conn, sql, columns, lines):
+        rows = [json.loads(line, object_hook=self._from_json) for line in lines if line.strip()]
+        conn.executemany(sql, [tuple(r[c] for c in columns) for r in rows])
+        return len(rows)
+
+    # BLOB columns travel as {"$base64": "..."}
+    @staticmethod
+    def _to_json(value):
+        if isinstance(value, bytes):
+            return {"$base64": base64.b64encode(value).decode("ascii")}
+        raise TypeError(f"cannot export {type(value).__name__}")
+
+    @staticmethod
+    def _from_json(obj):
+        if len(obj) == 1 and "$base64" in obj:
+            return base64.b64decode(obj["$base64"])
+        return obj
+
+    def _tables(self, conn=None):
+        if conn is None:
+            with self.pool.reader() as conn:
+                return self._tables(conn)
+        rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid").fetchall()
+        # Virtual tables (and their shadow tables) are rebuilt by triggers, not copied
+        virtual = [name for name, sql in rows if sql.upper().startswith("CREATE VIRTUAL")]
+        return [name for name, _ in rows if not any(name == v or name.startswith(v + "_") for v in virtual)]
+
+    def _check_integrity(self, conn):
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            raise sqlite3.DatabaseError(f"integrity check failed: {result}")
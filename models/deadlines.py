@@ -0,0 +1,107 @@
+import heapq
+import itertools
+from .course_models import Course
+from .timestamps import now, format_ts
+
+HOUR = 60 * 60
+
+
+class DeadlineScheduler:
+    """Sends deadline reminders and closes assignments as they fall due.
+
+    Every pending event sits in a heap ordered by when it fires, so a tick
+    only pops what is due: O(log n) per event and nothing for the rest.
+    Entries whose assignment was moved, removed or already handled are
+    dropped when they surface instead of being searched for.
+
+    An assignment's deadline_stage counts the events already handled:
+    one per entry of REMINDERS, then the closing notice to the instructor.
+    It is saved with the assignment, so a restart never repeats a reminder.
+    """
+
+    REMINDERS = (24 * HOUR, HOUR)  # seconds before the deadline
+
+    def __init__(self, registry, reminders=None):
+        self.registry = registry
+        self.reminders = tuple(sorted(reminders or self.REMINDERS, reverse=True))
+        self._heap = []              # (fires at, seq, cid, title, due_at, stage)
+        self._seq = itertools.count()
+        self._scheduled = {}         # (cid, title) -> due_at already in the heap
+
+    @property
+    def closing_stage(self):
+        return len(self.reminders)
+
+    def start(self, at=None):
+        """Fills the heap from the due_at index; new and moved deadlines are then pushed as they happen."""
+        at = now() if at is None else at
+        for cid, title, due_at, stage in self.registry.db.open_deadlines(self.closing_stage):
+            self._push(cid, title, due_at, stage, at)
+        Course._deadlines = self
+        return self
+
+    def stop(self):
+        if Course._deadlines is self:
+            Course._deadlines = None
+
+    def schedule(self, course, assignment, at=None):
+        if assignment.due_at is not None and assignment.deadline_stage <= self.closing_stage:
+            self._push(course.cid, assignment.title, assignment.due_at, assignment.deadline_stage,
+                       now() if at is None else at)
+
+    def _push(self, cid, title, due_at, stage, at):
+        if self._scheduled.get((cid, title)) == due_at:
+            return
+        self._scheduled[(cid, title)] = due_at
+        for i in range(stage, self.closing_stage):
+            fires = due_at - self.reminders[i]
+            # Reminders missed while the app was closed collapse into the latest one
+            later = due_at - self.reminders[i + 1] if i + 1 < self.closing_stage else due_at
+            if later > at:
+                heapq.heappush(self._heap, (fires, next(self._seq), cid, title, due_at, i))
+        heapq.heappush(self._heap, (due_at, next(self._seq), cid, title, due_at, self.closing_stage))
+
+    def __len__(self):
+        return len(self._heap)
+
+    def next_due(self):
+        """When the next event fires, or None."""
+        return self._heap[0][0] if self._heap else None
+
+    def tick(self, at=None):
+        """Handles every event due by `at`; returns (kind, course, assignment) for each one acted on."""
+        at = now() if at is None else at
+        fired = []
+        while self._heap and self._heap[0][0] <= at:
+            _, _, cid, title, due_at, stage = heapq.heappop(self._heap)
+            course = self.registry.get_course(cid)
+            assignment = course.get_assignment(title) if course is not None else None
+            if assignment is None or assignment.due_at != due_at or assignment.deadline_stage > stage:
+                continue  # stale entry
+            if stage == self.closing_stage:
+                self._close(course, assignment)
+                fired.append(("closed", course, assignment))
+                self._scheduled.pop((cid, title), None)
+            elif due_at > at:
+                self._remind(course, assignment)
+                fired.append(("reminder", course, assignment))
+            assignment.deadline_stage = stage + 1
+        return fired
+
+    def missing(self, course, assignment):
+        """Enrolled students with nothing submitted for the assignment."""
+        return [s for s in course.students if not course.has_submitted(s.get_username(), assignment.title)]
+
+    def _remind(self, course, assignment):
+        students = self.missing(course, assignment)
+        if students and course.instructor is not None:
+            # One broadcast: a single batched write however many students it reaches
+            course.instructor.broadcast(students, f"{assignment.title} is due {format_ts(assignment.due_at)}",
+                                        "You have not submitted this assignment yet.", course=course, kind="reminder")
+
+    def _close(self, course, assignment):
+        if course.instructor is not None:
+            missing = len(self.missing(course, assignment))
+            course.instructor.add_notification(
+                f"{assignment.title} in {course.title} is past due: "
+                f"{len(course.students) - missing} of {len(course.students)} submitted")
@@ -0,0 +1,210 @@
+import csv
+import warnings
+
+try:
+    import numpy as np
+except ImportError:  # the gradebook is optional; everything else runs without numpy
+    np = None
+
+
+class Gradebook:
+    """Columnar view of one course's grades.
+
+    scores is a students x assignments float matrix and mask marks the
+    cells that hold a grade. Assignment.set_grade keeps both current, and
+    changes to the course's students or assignments rebuild the book on
+    next use.
+    """
+
+    def __init__(self, course):
+        if np is None:
+            raise ImportError("the gradebook needs numpy: pip install numpy")
+        self.course = course
+        self.assignments = list(course.assignments)
+        self.students = [s.get_username() for s in course.students]
+        self._rows = {name: i for i, name in enumerate(self.students)}
+        self._cols = {id(a): j for j, a in enumerate(self.assignments)}
+        self.max_marks = np.array([a.max_marks or 0 for a in self.assignments], dtype=float)
+
+        graded = [(j, a.grades()) for j, a in enumerate(self.assignments)]
+        for _, grades in graded:
+            for name in grades:
+                if name not in self._rows:
+                    self._rows[name] = len(self.students)
+                    self.students.append(name)
+
+        self._scores = np.zeros((max(len(self.students), 1), len(self.assignments)))
+        self._mask = np.zeros(self._scores.shape, dtype=bool)
+        for j, grades in graded:
+            if grades:
+                rows = [self._rows[name] for name in grades]
+                self._scores[rows, j] = [self._number(v) for v in grades.values()]
+                self._mask[rows, j] = True
+        for a in self.assignments:
+            a._gradebook = self
+
+    @property
+    def scores(self):
+        return self._scores[:len(self.students)]
+
+    @property
+    def mask(self):
+        return self._mask[:len(self.students)]
+
+    @staticmethod
+    def _number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    # Kept in step by Assignment
+    def record(self, assignment, student, score):
+        j = self._cols.get(id(assignment))
+        if j is None:
+            return
+        i = self._rows.get(student)
+        if i is None:
+            i = self._add_row(student)
+        self._scores[i, j] = self._number(score)
+        self._mask[i, j] = True
+
+    def forget(self, assignment, student):
+        j, i = self._cols.get(id(assignment)), self._rows.get(student)
+        if j is not None and i is not None:
+            self._mask[i, j] = False
+            self._scores[i, j] = 0.0
+
+    def detach(self):
+        for a in self.assignments:
+            if a._gradebook is self:
+                a._gradebook = None
+
+    def _add_row(self, student):
+        i = len(self.students)
+        if i == self._scores.shape[0]:
+            # Grow geometrically so bulk imports stay linear
+            grow = max(i, 16)
+            self._scores = np.vstack([self._scores, np.zeros((grow, self._scores.shape[1]))])
+            self._mask = np.vstack([self._mask, np.zeros((grow, self._mask.shape[1]), dtype=bool)])
+        self._rows[student] = i
+        self.students.append(student)
+        return i
+
+    def _column(self, assignment):
+        if isinstance(assignment, str):
+            assignment = self.course.get_assignment(assignment)
+        j = self._cols.get(id(assignment))
+        if j is None:
+            raise KeyError(f"{getattr(assignment, 'title', assignment)!r} is not in this gradebook")
+        return j
+
+    # Statistics
+    def percentages(self):
+        """Scores as a percentage of max marks, NaN where ungraded."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = self.scores * 100.0 / self.max_marks
+        return np.where(self.mask & (self.max_marks > 0), pct, np.nan)
+
+    def assignment_stats(self, percent=False):
+        """Per-assignment count, mean, median, std, min and max (raw marks unless percent)."""
+        values = self.percentages() if percent else np.where(self.mask, self.scores, np.nan)
+        if not values.shape[0]:
+            values = np.full((1, len(self.assignments)), np.nan)
+        with warnings.catch_warnings():
+            # Columns with no grades at all come out as NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            stats = {
+                "count": np.sum(~np.isnan(values), axis=0),
+                "mean": np.nanmean(values, axis=0),
+                "median": np.nanmedian(values, axis=0),
+                "std": np.nanstd(values, axis=0),
+                "min": np.nanmin(values, axis=0),
+                "max": np.nanmax(values, axis=0),
+            }
+        return {a.title: {k: v[j].item() for k, v in stats.items()} for j, a in enumerate(self.assignments)}
+
+    def percentiles(self, q=(25, 50, 75), assignment=None):
+        values = self.percentages()
+        if assignment is not None:
+            values = values[:, self._column(assignment)]
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {p: None for p in q}
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def histogram(self, assignment=None, bins=10):
+        """Counts of percentage scores in equal-width bins over 0-100."""
+        values = self.percentages()
+        if assignment is not None:
+            values = values[:, self._column(assignment)]
+        values = values[~np.isnan(values)]
+        counts, edges = np.histogram(np.clip(values, 0, 100), bins=bins, range=(0, 100))
+        return counts.tolist(), edges.tolist()
+
+    def weighted_totals(self, weights=None, missing="skip"):
+        """Weighted percentage per student.
+
+        weights maps assignment title to weight and defaults to max marks.
+        Missing grades are left out of the student's total ("skip") or
+        count as zero ("zero"). A student with nothing graded totals 0.
+        """
+        return dict(zip(self.students, self._weighted(weights, missing).tolist()))
+
+    def _weighted(self, weights, missing="skip"):
+        if weights is None:
+            w = self.max_marks.copy()
+        else:
+            w = np.array([float(weights.get(a.title, 0)) for a in self.assignments])
+        pct = self.percentages()
+        present = ~np.isnan(pct)
+        if missing == "zero":
+            present = np.ones_like(present)
+            pct = np.nan_to_num(pct)
+        weight = np.where(present, w, 0.0)
+        total = weight.sum(axis=1)
+        earned = np.nansum(np.where(present, pct, 0.0) * weight, axis=1)
+        return np.divide(earned, total, out=np.zeros_like(earned), where=total > 0)
+
+    def at_risk(self, threshold=50.0, max_missing=None, weights=None):
+        """Students whose weighted total is under threshold or who miss too many grades."""
+        risky = self._weighted(weights) < threshold
+        if max_missing is not None:
+            risky |= (~self.mask).sum(axis=1) > max_missing
+        return [self.students[i] for i in np.flatnonzero(risky)]
+
+    # Import / export
+    def import_grades(self, rows):
+        """Sets grades from (username, assignment title, score) rows; returns rows applied."""
+        titles = {}
+        for a in self.assignments:
+            titles.setdefault(a.title, a)
+        applied = 0
+        for username, title, score in rows:
+            assignment = titles.get(title)
+            if assignment is None:
+                raise KeyError(f"no assignment titled {title!r}")
+            assignment.set_grade(username, score)
+            applied += 1
+        return applied
+
+    def import_csv(self, path):
+        """Reads a wide CSV: a username column, then one column per assignment title."""
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            titles = next(reader)[1:]
+            return self.import_grades((row[0], title, self._cell(float(value)))
+                                      for row in reader for title, value in zip(titles, row[1:]) if value != "")
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["username"] + [a.title for a in self.assignments])
+            scores, mask = self.scores, self.mask
+            for i, name in enumerate(self.students):
+                writer.writerow([name] + [self._cell(scores[i, j]) if mask[i, j] else ""
+                                          for j in range(len(self.assignments))])
+
+    @staticmethod
+    def _cell(value):
+        return int(value) if float(value).is_integer() else float(value)
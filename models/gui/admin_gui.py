@@ -1,24 +1,42 @@
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
+from tkinter import messagebox, ttk, simpledialog, filedialog
 from .base_window import BaseWindow
 from color import MAROON, BROWN, GREEN, RED, FONT
 from models.course_models import Course
-from models.report_models import UserReport, CourseReport
+from models.timestamps import format_ts, to_epoch, DAY
+from .paged_list import PagedTreeview
+from models.report_models import UserReport, CourseReport, InstructorLoadReport
+from models.deadlines import DeadlineScheduler
+from models.instrumentation import metrics
+from models.archive import TermArchive
 
 
 class AdminDashboard(BaseWindow):
     def __init__(self, user, lms):
         self.user, self.lms = user, lms
+        self.registry = lms.users.registry
+        self.db = self.registry.db
+        self.db.start_write_behind()
+        self.deadlines = DeadlineScheduler(self.registry).start()
         self.win = tk.Tk()
         self.win = tk.Tk()
         self.win.title("Admin Only")
         self.maximize_window(self.win)
         self.setup_ui()
         self.win.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.tick_deadlines()
         self.win.mainloop()
 
+    def tick_deadlines(self):
+        if self.deadlines.tick():
+            self.lms.save_to_file()
+        self.win.after(60 * 1000, self.tick_deadlines)
+
     def on_close(self):
+        self.deadlines.stop()
         self.lms.save_to_file()
+        if not self.db.flush(timeout=30):
+            messagebox.showwarning("Saving", "Some changes could not be written to the database yet.")
         self.win.destroy()
 
     def setup_ui(self):
@@ -32,7 +50,10 @@ class AdminDashboard(BaseWindow):
             ("Manage Courses", self.show_courses),
             ("Security Logs", self.show_logs),
             ("Course Statistics", self.show_stats),
-            ("Reports Center", self.show_reports_center)
+            ("Reports Center", self.show_reports_center),
+            ("Search", self.show_search),
+            ("Archives", self.show_archives),
+            ("Performance", self.show_performance)
         ]
 
         for text, cmd in menu:
@@ -43,6 +64,7 @@ class AdminDashboard(BaseWindow):
         self.main_work.pack(side="right", fill="both", expand=True)
         self.show_overview()
 
+    @metrics.timed("render.overview")
     def show_overview(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="System Statistics", font=("Arial", 26, "bold"), bg="#ecf0f1").pack(anchor="w")
@@ -50,10 +72,12 @@ class AdminDashboard(BaseWindow):
         stats_f = tk.Frame(self.main_work, bg="#ecf0f1")
         stats_f.pack(fill="x", pady=30)
 
+        stats = self.registry.stats
         data = [
-            ("Total Users", len(self.lms.users)),
-            ("Active Courses", len(self.lms.courses)),
-            ("Students", len([u for u in self.lms.users if u.get_role()=="Student"]))
+            ("Total Users", stats.user_count()),
+            ("Active Courses", stats.course_count()),
+            ("Students", stats.user_count("Student")),
+            ("Ungraded Work", stats.total("ungraded"))
         ]
         for label, val in data:
             box = tk.Frame(stats_f, bg="white", width=200, height=120, relief="flat", padx=20, pady=20)
@@ -62,36 +86,85 @@ class AdminDashboard(BaseWindow):
             tk.Label(box, text=val, font=("Arial", 24, "bold"), bg="white", fg=MAROON).pack()
             tk.Label(box, text=label, font=("Arial", 12), bg="white").pack()
 
+    @metrics.timed("render.users")
     def show_users(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="User Management", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=(0,20))
 
-        for u in self.lms.users:
-            row = tk.Frame(self.main_work, bg="white", pady=10, padx=10)
-            row.pack(fill="x", pady=2)
-            tk.Label(row, text=f"{u.get_username()} ({u.get_role()}) - {u.get_email()}", bg="white").pack(side="left")
-            if u.get_role() != "Admin":
-                tk.Button(row, text="Remove", bg=RED, fg="white", command=lambda x=u: self.delete_user(x)).pack(side="right")
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        tk.Label(bar, text="Role:", bg="#ecf0f1").pack(side="left")
+        role_cb = ttk.Combobox(bar, values=["All", "Admin", "Instructor", "Student"], width=10, state="readonly")
+        role_cb.set("All"); role_cb.pack(side="left", padx=5)
+        tk.Label(bar, text="Course ID:", bg="#ecf0f1").pack(side="left")
+        course_ent = tk.Entry(bar, width=8); course_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Search:", bg="#ecf0f1").pack(side="left")
+        search_ent = tk.Entry(bar, width=15); search_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Sort:", bg="#ecf0f1").pack(side="left")
+        sort_cb = ttk.Combobox(bar, values=list(self.db.USER_SORTS), width=10, state="readonly")
+        sort_cb.set("username"); sort_cb.pack(side="left", padx=5)
+
+        def fetch(after, limit):
+            role = role_cb.get()
+            return self.db.page_users(after, limit, sort=sort_cb.get(), role=None if role == "All" else role,
+                                      course=course_ent.get().strip() or None, search=search_ent.get().strip() or None)
+
+        users = PagedTreeview(self.main_work, [("username", "Username", 200), ("role", "Role", 120), ("email", "Email", 280)], fetch,
+                              busy=self.db.saving)
+        tk.Button(bar, text="Apply", command=users.reload).pack(side="left", padx=5)
+
+        def remove():
+            row = users.selected()
+            u = self.registry.get_user(row["username"]) if row else None
+            if u and u.get_role() != "Admin":
+                self.delete_user(u)
+
+        tk.Button(bar, text="Remove Selected", bg=RED, fg="white", command=remove).pack(side="right")
+        users.pack(fill="both", expand=True)
 
     def delete_user(self, user):
         if messagebox.askyesno("Confirm", f"Delete {user.get_username()}?"):
-            self.lms.users.remove(user)
+            try:
+                self.registry.remove_user(user)
+            except ValueError as e:
+                return messagebox.showerror("Error", str(e))
             self.lms.save_to_file()
             self.show_users()
 
+    @metrics.timed("render.courses")
     def show_courses(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="Course Management", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=10)
         tk.Button(self.main_work, text="+ Create New Course", bg=GREEN, fg="white", command=self.create_course_ui).pack(anchor="w", pady=10)
 
-        for c in self.lms.courses:
-            f = tk.Frame(self.main_work, bg="white", pady=10, padx=10); f.pack(fill="x", pady=2)
-            tk.Label(f, text=f"{c.cid}: {c.title} (Instructor: {c.instructor.get_username()})", bg="white").pack(side="left")
-            tk.Button(f, text="Delete", bg=RED, fg="white", command=lambda x=c: self.delete_course(x)).pack(side="right")
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        tk.Label(bar, text="Instructor:", bg="#ecf0f1").pack(side="left")
+        inst_ent = tk.Entry(bar, width=15); inst_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Title:", bg="#ecf0f1").pack(side="left")
+        search_ent = tk.Entry(bar, width=15); search_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Sort:", bg="#ecf0f1").pack(side="left")
+        sort_cb = ttk.Combobox(bar, values=list(self.db.COURSE_SORTS), width=10, state="readonly")
+        sort_cb.set("cid"); sort_cb.pack(side="left", padx=5)
+
+        def fetch(after, limit):
+            return self.db.page_courses(after, limit, sort=sort_cb.get(), instructor=inst_ent.get().strip() or None,
+                                        search=search_ent.get().strip() or None)
+
+        courses = PagedTreeview(self.main_work, [("cid", "ID", 80), ("title", "Title", 300), ("instructor_username", "Instructor", 200)], fetch,
+                                busy=self.db.saving)
+        tk.Button(bar, text="Apply", command=courses.reload).pack(side="left", padx=5)
+
+        def remove():
+            row = courses.selected()
+            c = self.registry.get_course(str(row["cid"])) if row else None
+            if c:
+                self.delete_course(c)
+
+        tk.Button(bar, text="Delete Selected", bg=RED, fg="white", command=remove).pack(side="right")
+        courses.pack(fill="both", expand=True)
 
     def delete_course(self, course):
         if messagebox.askyesno("Confirm", f"Delete {course.title}?"):
-            self.lms.courses.remove(course)
+            self.registry.remove_course(course)
             self.lms.save_to_file()
             self.show_courses()
 
@@ -101,30 +174,30 @@ class AdminDashboard(BaseWindow):
         t_ent = tk.Entry(pop); t_ent.pack()
 
         tk.Label(pop, text="Select Instructor:").pack(pady=5)
-        pros = [u.get_username() for u in self.lms.users if u.get_role()=="Instructor"]
+        pros = [u.get_username() for u in self.registry.users_by_role("Instructor")]
         cb = ttk.Combobox(pop, values=pros); cb.pack()
 
         def save():
             if not t_ent.get() or not cb.get(): return
-            inst = next(u for u in self.lms.users if u.get_username() == cb.get())
-            new_c = Course(str(100+len(self.lms.courses)), t_ent.get(), inst)
-            self.lms.courses.append(new_c)
-            inst.assigned_courses.append(new_c)
+            inst = self.registry.get_user(cb.get())
+            if inst is None: return
+            new_c = Course(self.registry.next_course_id(), t_ent.get(), inst)
+            self.registry.add_course(new_c)
             self.lms.save_to_file()
             pop.destroy(); self.show_courses()
 
         tk.Button(pop, text="Create", bg=GREEN, fg="white", command=save).pack(pady=20)
 
+    @metrics.timed("render.stats")
     def show_stats(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="Global Course Analytics", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=20)
 
-        for c in self.lms.courses:
-            row = tk.Frame(self.main_work, bg="white", pady=15, padx=15)
-            row.pack(fill="x", pady=5)
-            txt = f"Course: {c.title} | Students: {len(c.students)} | Submissions: {len(c.submissions)} | Materials: {len(c.materials)}"
-            tk.Label(row, text=txt, font=FONT, bg="white").pack(side="left")
+        PagedTreeview(self.main_work, [("title", "Course", 300), ("students", "Students", 100),
+                                       ("submissions", "Submissions", 100), ("materials", "Materials", 100)],
+                      self.db.page_course_stats, busy=self.db.saving).pack(fill="both", expand=True)
 
+    @metrics.timed("render.reports_center")
     def show_reports_center(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="Management Reports", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=20)
@@ -135,23 +208,96 @@ class AdminDashboard(BaseWindow):
         display = tk.Text(self.main_work, font=("Consolas", 11), bg="white", height=20)
         display.pack(fill="both", expand=True)
 
+        current = {}
+
         def run(rep_obj):
             display.delete("1.0", tk.END)
             display.insert(tk.END, rep_obj.generate(self.lms))
+            current["report"] = rep_obj
             self.lms.log_event(f"Admin generated {rep_obj.__class__.__name__}")
 
+        def export():
+            rep_obj = current.get("report")
+            if rep_obj is None:
+                return messagebox.showinfo("Export", "Generate a report first.")
+            path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                filetypes=[("CSV", "*.csv"), ("Text", "*.txt")])
+            if path:
+                rep_obj.export(self.lms, path)
+                self.lms.log_event(f"Admin exported {rep_obj.__class__.__name__}")
+
         tk.Button(btn_bar, text="User Audit", command=lambda: run(UserReport())).pack(side="left", padx=5)
+        tk.Button(btn_bar, text="Course Report", command=lambda: run(CourseReport())).pack(side="left", padx=5)
+        tk.Button(btn_bar, text="Instructor Load", command=lambda: run(InstructorLoadReport())).pack(side="left", padx=5)
+        tk.Button(btn_bar, text="Export...", command=export).pack(side="right", padx=5)
 
+    @metrics.timed("render.logs")
     def show_logs(self):
         for w in self.main_work.winfo_children(): w.destroy()
 
         tk.Label(self.main_work, text="Security Logs", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=10)
-        log_box = tk.Text(self.main_work, bg=MAROON, fg="#2ecc71", font=("Consolas", 10))
-        log_box.pack(fill="both", expand=True)
-
-        for log in reversed(self.lms.logs): log_box.insert(tk.END, f"> {log}\n")
-        log_box.config(state="disabled")
 
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        tk.Label(bar, text="Actor:", bg="#ecf0f1").pack(side="left")
+        actor_ent = tk.Entry(bar, width=15); actor_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Level:", bg="#ecf0f1").pack(side="left")
+        level_cb = ttk.Combobox(bar, values=["All", "DEBUG", "INFO", "WARNING", "ERROR"], width=9, state="readonly")
+        level_cb.set("All"); level_cb.pack(side="left", padx=5)
+        tk.Label(bar, text="From (YYYY-MM-DD):", bg="#ecf0f1").pack(side="left")
+        start_ent = tk.Entry(bar, width=11); start_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="To:", bg="#ecf0f1").pack(side="left")
+        end_ent = tk.Entry(bar, width=11); end_ent.pack(side="left", padx=5)
+
+        def day(entry, extra=0):
+            text = entry.get().strip()
+            return to_epoch(text, DAY) + extra if text else None
+
+        def fetch(after, limit):
+            try:
+                start, end = day(start_ent), day(end_ent, 24 * 60 * 60)
+            except ValueError:
+                messagebox.showerror("Error", "Dates must look like 2024-01-31")
+                return [], after
+            level = level_cb.get()
+            rows, last = self.lms.logs.page(after, limit, start, end, actor_ent.get().strip() or None,
+                                            None if level == "All" else level)
+            return [dict(r, time=format_ts(r["ts"]), actor=r["actor"] or "") for r in rows], last
+
+        logs = PagedTreeview(self.main_work, [("time", "Time", 140), ("level", "Level", 80), ("actor", "Actor", 120),
+                                              ("message", "Event", 600)], fetch)
+        tk.Button(bar, text="Apply", command=logs.reload).pack(side="left", padx=5)
+        logs.pack(fill="both", expand=True)
+
+    @metrics.timed("render.search")
+    def show_search(self):
+        for w in self.main_work.winfo_children(): w.destroy()
+        tk.Label(self.main_work, text="Search", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=10)
+
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        query_ent = tk.Entry(bar, width=40); query_ent.pack(side="left", padx=5)
+        tk.Label(bar, text="Course ID:", bg="#ecf0f1").pack(side="left")
+        course_ent = tk.Entry(bar, width=10); course_ent.pack(side="left", padx=5)
+
+        def fetch(after, limit):
+            text = query_ent.get().strip()
+            if not text:
+                return [], after
+            offset = after or 0
+            rows = self.db.search(text, self.user, course_ent.get().strip() or None, limit, offset)
+            return [dict(r, course_cid=r["course_cid"] or "", author=r["author"] or "",
+                         title=r["title"] or "") for r in rows], offset + len(rows)
+
+        def show(row):
+            messagebox.showinfo(row["title"] or row["kind"].title(), row["snippet"])
+
+        results = PagedTreeview(self.main_work, [("kind", "Type", 100), ("course_cid", "Course", 80), ("author", "By", 120),
+                                                 ("title", "Title", 260), ("snippet", "Match", 520)], fetch, on_open=show,
+                                busy=self.db.saving)
+        tk.Button(bar, text="Search", command=results.reload).pack(side="left", padx=5)
+        query_ent.bind("<Return>", lambda e: results.reload())
+        results.pack(fill="both", expand=True)
+
+    @metrics.timed("render.inbox")
     def show_inbox(self):
         for w in self.main_work.winfo_children(): w.destroy()
         tk.Label(self.main_work, text="Admin Inbox", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=20)
@@ -160,16 +306,160 @@ class AdminDashboard(BaseWindow):
             tk.Label(self.main_work, text="No messages.", bg="#ecf0f1", fg="gray").pack(pady=50)
             return
 
-        for msg in reversed(self.user.inbox):
-            f = tk.Frame(self.main_work, bg="white", pady=10, padx=15, relief="solid", bd=1); f.pack(fill="x", pady=5)
-            tk.Label(f, text=f"From: {msg.sender} | {msg.subject}", bg="white").pack(side="left")
-            tk.Button(f, text="Read", command=lambda m=msg: messagebox.showinfo(m.subject, m.body)).pack(side="right")
+        bodies = {}
+
+        def fetch(after, limit):
+            rows, last = self.db.page_inbox(self.user.get_username(), after, limit)
+            for r in rows:
+                bodies[r["key"]] = (r["subject"], r["body"])
+            return [dict(r, date=format_ts(r["sent_at"] or 0)) for r in rows], last
+
+        def read(row):
+            subject, body = bodies[row["key"]]
+            messagebox.showinfo(subject, body)
+
+        PagedTreeview(self.main_work, [("key", "#", 60), ("sender", "From", 160), ("subject", "Subject", 320), ("date", "Date", 140)],
+                      fetch, on_open=read, busy=self.db.saving).pack(fill="both", expand=True)
+
+    @metrics.timed("render.archives")
+    def show_archives(self):
+        for w in self.main_work.winfo_children(): w.destroy()
+        tk.Label(self.main_work, text="Term Archives", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=10)
+
+        archive = TermArchive(self.db)
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        tk.Label(bar, text="Term:", bg="#ecf0f1").pack(side="left")
+        term_cb = ttk.Combobox(bar, width=20, state="readonly")
+        term_cb.pack(side="left", padx=5)
+
+        def terms():
+            term_cb["values"] = ["All"] + [t for t, _ in archive.terms()]
+            if not term_cb.get():
+                term_cb.set("All")
+
+        def fetch(after, limit):
+            term = term_cb.get()
+            rows, last = archive.page_courses(None if term in ("", "All") else term, after, limit)
+            return [dict(r, archived=format_ts(r["archived_at"] or 0)) for r in rows], last
+
+        def report():
+            term = term_cb.get()
+            if term in ("", "All"):
+                return messagebox.showinfo("Report", "Pick a term first.")
+            lines = [f"{'Course':<8} {'Title':<30} {'Instructor':<16} {'Students':>8} {'Subs':>6} {'Avg %':>6}"]
+            for r in archive.course_report(term):
+                lines.append(f"{r['cid']:<8} {r['title'][:30]:<30} {(r['instructor'] or '')[:16]:<16} "
+                             f"{r['students']:>8} {r['submissions']:>6} {r['average'] if r['average'] is not None else '-':>6}")
+            win = tk.Toplevel(self.win); win.title(f"Archive {term}")
+            text = tk.Text(win, font=("Consolas", 11), width=84, height=30)
+            text.insert(tk.END, "\n".join(lines)); text.config(state="disabled")
+            text.pack(fill="both", expand=True)
+
+        def run():
+            term = simpledialog.askstring("Archive", "Term name (e.g. 2024-fall):", parent=self.win)
+            if not term:
+                return
+            cutoff = simpledialog.askstring("Archive", "Archive courses whose assignments were all due before (YYYY-MM-DD):",
+                                            parent=self.win)
+            if not cutoff:
+                return
+            try:
+                archive.path(term)
+                cids = archive.finished_courses(to_epoch(cutoff.strip(), DAY))
+            except ValueError as e:
+                return messagebox.showerror("Error", str(e))
+            if not cids:
+                return messagebox.showinfo("Archive", "No course has finished by then.")
+            if not messagebox.askyesno("Archive", f"Move {len(cids)} courses into the {term} archive?"):
+                return
+            moved = archive.archive(term, cids)
+            self.lms.log_event(f"Admin archived {moved} courses into term {term}")
+            self.lms.save_to_file()
+            terms()
+            courses.reload()
+
+        tk.Button(bar, text="Show", command=lambda: courses.reload()).pack(side="left", padx=5)
+        tk.Button(bar, text="Term Report", command=report).pack(side="left", padx=5)
+        tk.Button(bar, text="Archive Finished Courses...", command=run).pack(side="right", padx=5)
+        terms()
+        courses = PagedTreeview(self.main_work, [("term", "Term", 120), ("cid", "Course", 80), ("title", "Title", 300),
+                                                 ("instructor_username", "Instructor", 140), ("students", "Students", 90),
+                                                 ("submissions", "Submissions", 100), ("archived", "Archived", 140)], fetch)
+        term_cb.bind("<<ComboboxSelected>>", lambda e: courses.reload())
+        courses.pack(fill="both", expand=True)
+
+    def show_performance(self):
+        for w in self.main_work.winfo_children(): w.destroy()
+        tk.Label(self.main_work, text="Performance", font=("Arial", 22, "bold"), bg="#ecf0f1").pack(anchor="w", pady=10)
+
+        bar = tk.Frame(self.main_work, bg="#ecf0f1"); bar.pack(fill="x", pady=(0,10))
+        state = tk.Label(bar, bg="#ecf0f1", font=FONT)
+        state.pack(side="left", padx=5)
+
+        def ms(seconds):
+            return f"{seconds * 1000:.2f}"
+
+        def page(rows):
+            def fetch(after, limit):
+                offset = after or 0
+                chunk = rows()[offset:offset + limit]
+                return chunk, offset + len(chunk)
+            return fetch
+
+        def span_rows():
+            return [{"name": name, "count": h.count, "mean": ms(h.sum / h.count) if h.count else "0",
+                     "p95": ms(h.quantile(0.95)), "max": ms(h.max), "queries": q, "sql": ms(t)}
+                    for name, (h, q, t) in sorted(metrics.spans.items(), key=lambda i: -i[1][0].sum)]
+
+        def query_rows():
+            return [{"sql": sql, "count": s.latency.count, "total": ms(s.latency.sum + s.fetch),
+                     "p95": ms(s.latency.quantile(0.95)), "max": ms(s.latency.max), "rows": s.rows}
+                    for sql, s in metrics.top_queries(200, by="total")]
+
+        spans = PagedTreeview(self.main_work, [("name", "Operation", 220), ("count", "Calls", 70), ("mean", "Mean ms", 90),
+                                               ("p95", "p95 ms", 90), ("max", "Max ms", 90), ("queries", "Queries", 80),
+                                               ("sql", "SQL ms", 90)], page(span_rows))
+        queries = PagedTreeview(self.main_work, [("sql", "Statement", 560), ("count", "Calls", 70), ("total", "Total ms", 90),
+                                                 ("p95", "p95 ms", 80), ("max", "Max ms", 80), ("rows", "Rows", 80)],
+                                page(query_rows), on_open=lambda row: messagebox.showinfo("Statement", row["sql"]))
+
+        def refresh():
+            state.config(text="Recording" if metrics.enabled else "Off", fg=GREEN if metrics.enabled else RED)
+            toggle.config(text="Stop" if metrics.enabled else "Record")
+            spans.reload()
+            queries.reload()
+
+        def switch():
+            metrics.disable() if metrics.enabled else metrics.enable()
+            refresh()
+
+        def reset():
+            metrics.reset()
+            refresh()
+
+        def export(kind):
+            path = filedialog.asksaveasfilename(defaultextension=".json" if kind == "json" else ".prom",
+                                                filetypes=[("JSON", "*.json"), ("Prometheus text", "*.prom *.txt")])
+            if path:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(metrics.to_json() if kind == "json" else metrics.to_prometheus())
+                self.lms.log_event("Admin exported performance metrics")
+
+        toggle = tk.Button(bar, command=switch); toggle.pack(side="left", padx=5)
+        tk.Button(bar, text="Refresh", command=refresh).pack(side="left", padx=5)
+        tk.Button(bar, text="Reset", command=reset).pack(side="left", padx=5)
+        tk.Button(bar, text="Export Prometheus...", command=lambda: export("prom")).pack(side="right", padx=5)
+        tk.Button(bar, text="Export JSON...", command=lambda: export("json")).pack(side="right", padx=5)
+        spans.pack(fill="both", expand=True, pady=(0,10))
+        queries.pack(fill="both", expand=True)
+        refresh()
 
 
 
 
 
     def logout(self):
+        self.deadlines.stop()
         self.win.destroy()
         from .auth_gui import LoginGUI
         LoginGUI(self.lms)
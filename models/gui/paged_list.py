@@ -0,0 +1,94 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class PagedTreeview(tk.Frame):
+    """Treeview that pulls rows a page at a time as the user scrolls.
+
+    fetch_page(after, limit) must return (rows, last_key); rows are
+    sequences matching the column order, and last_key is handed back as
+    `after` to fetch the following page.
+
+    While busy() returns True the rows are not fetched yet; the view polls
+    from the Tk loop instead of blocking it, e.g. until queued saves land.
+    """
+
+    LOAD_AHEAD = 0.85  # fetch the next page once this fraction has scrolled by
+    BUSY_POLL_MS = 50
+
+    def __init__(self, parent, columns, fetch_page, page_size=200, on_open=None, busy=None, **kw):
+        super().__init__(parent, **kw)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.on_open = on_open
+        self.busy = busy
+        self._poll = None
+        self._keys = [c[0] for c in columns]
+
+        self.tree = ttk.Treeview(self, columns=self._keys, show="headings", selectmode="browse")
+        for key, heading, width in columns:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w")
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scroll.pack(side="right", fill="y")
+        if on_open:
+            self.tree.bind("<Double-1>", lambda e: self._open())
+
+        self.reload()
+
+    def reload(self, fetch_page=None):
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.tree.delete(*self.tree.get_children())
+        self._after = None
+        self._loading = False
+        if self._poll is not None:
+            self.after_cancel(self._poll)
+            self._poll = None
+        if self.busy is not None and self.busy():
+            self._exhausted = True  # nothing to scroll to until the first page
+            self._poll = self.after(self.BUSY_POLL_MS, self._retry)
+            return
+        self._exhausted = False
+        self.load_more()
+
+    def _retry(self):
+        self._poll = None
+        self.reload()
+
+    def load_more(self):
+        if self._exhausted or self._loading:
+            return
+        self._loading = True
+        try:
+            rows, self._after = self.fetch_page(self._after, self.page_size)
+            for row in rows:
+                self.tree.insert("", "end", values=[row[k] for k in self._keys])
+            self._exhausted = len(rows) < self.page_size
+        finally:
+            self._loading = False
+
+    def destroy(self):
+        if self._poll is not None:
+            self.after_cancel(self._poll)
+            self._poll = None
+        super().destroy()
+
+    def selected(self):
+        """Values of the selected row as a dict, or None."""
+        sel = self.tree.selection()
+        if not sel:
+            return None
+        return dict(zip(self._keys, self.tree.item(sel[0], "values")))
+
+    def _open(self):
+        row = self.selected()
+        if row:
+            self.on_open(row)
+
+    def _on_scroll(self, first, last):
+        self.scroll.set(first, last)
+        if float(last) >= self.LOAD_AHEAD and not self._exhausted:
+            self.after_idle(self.load_more)
@@ -0,0 +1,315 @@
+"""Query and operation metrics, switchable at runtime.
+
+    from models.instrumentation import metrics
+    metrics.enable()
+    ...
+    print(metrics.to_prometheus())
+
+Pooled connections hand out InstrumentedCursor, which times every
+statement and counts the rows it touched; the sqlite3 trace callback
+also counts what runs outside a cursor (BEGIN/COMMIT, scripts). Spans
+time whole operations and note how many queries ran inside them. While
+disabled, the cost is one attribute check per statement. LMS_METRICS=1
+turns recording on at startup.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in seconds, as Prometheus expects."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "max": self.max,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts))}
+
+
+class QueryStats:
+    __slots__ = ("latency", "rows", "fetch")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+        self.fetch = 0.0  # seconds spent stepping through results after execute() returned
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = {}          # normalised SQL -> QueryStats
+            self.spans = {}            # name -> [Histogram, queries, seconds in SQL]
+            self.statements = Counter()  # leading keyword -> statements seen by the trace callback
+            self.started = time.time()
+
+    # Switching
+    def enable(self):
+        self.enabled = True
+        for conn in list(self._connections):
+            conn.set_trace_callback(self._trace)
+
+    def disable(self):
+        self.enabled = False
+        for conn in list(self._connections):
+            conn.set_trace_callback(None)
+
+    def attach(self, conn):
+        self._connections.add(conn)
+        if self.enabled:
+            conn.set_trace_callback(self._trace)
+
+    # Recording
+    def _trace(self, sql):
+        keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "?"
+        with self._lock:
+            self.statements[keyword] += 1
+
+    def record_query(self, sql, seconds, rows):
+        key = _normalise(sql)
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                stats = self.queries[key] = QueryStats()
+            stats.latency.observe(seconds)
+            if rows > 0:
+                stats.rows += rows
+        for frame in getattr(self._local, "spans", ()):
+            frame[0] += 1
+            frame[1] += seconds
+
+    def record_rows(self, sql, rows, seconds):
+        with self._lock:
+            stats = self.queries.get(_normalise(sql))
+            if stats is not None:
+                stats.rows += rows
+                stats.fetch += seconds
+        for frame in getattr(self._local, "spans", ()):
+            frame[1] += seconds
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        stack = getattr(self._local, "spans", None)
+        if stack is None:
+            stack = self._local.spans = []
+        frame = [0, 0.0]  # queries, seconds in SQL
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.remove(frame)
+            with self._lock:
+                entry = self.spans.get(name)
+                if entry is None:
+                    entry = self.spans[name] = [Histogram(), 0, 0.0]
+                entry[0].observe(elapsed)
+                entry[1] += frame[0]
+                entry[2] += frame[1]
+
+    def timed(self, name):
+        """Decorator form of span()."""
+        def wrap(fn):
+            @wraps(fn)
+            def call(*args, **kw):
+                if not self.enabled:
+                    return fn(*args, **kw)
+                with self.span(name):
+                    return fn(*args, **kw)
+            return call
+        return wrap
+
+    # Reading
+    def top_queries(self, n=50, by="sum"):
+        with self._lock:
+            items = list(self.queries.items())
+        key = {"sum": lambda i: i[1].latency.sum, "count": lambda i: i[1].latency.count,
+               "max": lambda i: i[1].latency.max, "rows": lambda i: i[1].rows,
+               "total": lambda i: i[1].latency.sum + i[1].fetch}[by]
+        return sorted(items, key=key, reverse=True)[:n]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.started,
+                "queries": {sql: dict(s.latency.to_dict(), rows=s.rows, fetch_seconds=s.fetch) for sql, s in self.queries.items()},
+                "spans": {name: dict(h.to_dict(), queries=q, sql_seconds=t) for name, (h, q, t) in self.spans.items()},
+                "statements": dict(self.statements),
+            }
+
+    def to_json(self, path=None):
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(metric, label, value, h):
+            seen = 0
+            for bound, n in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                seen += n
+                lines.append(f'{metric}_bucket{{{label}="{_escape(value)}",le="{bound}"}} {seen}')
+            lines.append(f'{metric}_sum{{{label}="{_escape(value)}"}} {h.sum}')
+            lines.append(f'{metric}_count{{{label}="{_escape(value)}"}} {h.count}')
+
+        with self._lock:
+            lines += ["# HELP lms_query_seconds SQL statement latency.", "# TYPE lms_query_seconds histogram"]
+            for sql, s in self.queries.items():
+                histogram("lms_query_seconds", "query", sql, s.latency)
+            lines += ["# HELP lms_query_rows_total Rows returned or changed.", "# TYPE lms_query_rows_total counter"]
+            lines += [f'lms_query_rows_total{{query="{_escape(sql)}"}} {s.rows}' for sql, s in self.queries.items()]
+            lines += ["# HELP lms_query_fetch_seconds_total Time spent fetching result rows.",
+                      "# TYPE lms_query_fetch_seconds_total counter"]
+            lines += [f'lms_query_fetch_seconds_total{{query="{_escape(sql)}"}} {s.fetch}' for sql, s in self.queries.items()]
+            lines += ["# HELP lms_span_seconds Operation duration.", "# TYPE lms_span_seconds histogram"]
+            for name, (h, _, _) in self.spans.items():
+                histogram("lms_span_seconds", "span", name, h)
+            lines += ["# HELP lms_span_queries_total Queries run inside an operation.",
+                      "# TYPE lms_span_queries_total counter"]
+            lines += [f'lms_span_queries_total{{span="{_escape(name)}"}} {q}' for name, (_, q, _) in self.spans.items()]
+            lines += ["# HELP lms_statements_total Statements seen by the SQLite trace callback.",
+                      "# TYPE lms_statements_total counter"]
+            lines += [f'lms_statements_total{{kind="{_escape(k)}"}} {n}' for k, n in self.statements.items()]
+        return "\n".join(lines) + "\n"
+
+
+_WS = re.compile(r"\s+")
+_normalised = {}
+
+
+def _normalise(sql):
+    # Statements are parameterised, so collapsing whitespace is enough to group them
+    key = _normalised.get(sql)
+    if key is None:
+        key = _normalised[sql] = _WS.sub(" ", sql).strip()
+        if len(_normalised) > 10000:
+            _normalised.clear()
+    return key
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+if os.environ.get("LMS_METRICS") == "1":
+    metrics.enable()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        self._last_sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start, self.rowcount)
+
+    # SQLite does most of a SELECT's work while stepping, so fetches are timed too
+    def fetchall(self):
+        if not metrics.enabled:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        metrics.record_rows(self._sql(), len(rows), time.perf_counter() - start)
+        return rows
+
+    def fetchmany(self, size=None):
+        if not metrics.enabled:
+            return super().fetchmany(size if size is not None else self.arraysize)
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        metrics.record_rows(self._sql(), len(rows), time.perf_counter() - start)
+        return rows
+
+    def fetchone(self):
+        if not metrics.enabled:
+            return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        metrics.record_rows(self._sql(), row is not None, time.perf_counter() - start)
+        return row
+
+    def _sql(self):
+        return self.__dict__.get("_last_sql", "")
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the ones execute() makes, are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # While disabled these take sqlite3's own path and return a plain cursor
+    def execute(self, sql, parameters=()):
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
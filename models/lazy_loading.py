@@ -0,0 +1,118 @@
+from collections import OrderedDict
+
+from .change_tracker import TrackedList, tracker
+
+
+class LazyList(TrackedList):
+    """TrackedList whose contents are fetched the first time it is used."""
+
+    def _guard(method):
+        def wrapper(self, *args, **kwargs):
+            self._owner._ensure_content()
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    __len__ = _guard(TrackedList.__len__)
+    __iter__ = _guard(TrackedList.__iter__)
+    __reversed__ = _guard(TrackedList.__reversed__)
+    __getitem__ = _guard(TrackedList.__getitem__)
+    __contains__ = _guard(TrackedList.__contains__)
+    __eq__ = _guard(TrackedList.__eq__)
+    __ne__ = _guard(TrackedList.__ne__)
+    __add__ = _guard(TrackedList.__add__)
+    __mul__ = _guard(TrackedList.__mul__)
+    __repr__ = _guard(TrackedList.__repr__)
+    index = _guard(TrackedList.index)
+    count = _guard(TrackedList.count)
+    copy = _guard(TrackedList.copy)
+    append = _guard(TrackedList.append)
+    extend = _guard(TrackedList.extend)
+    remove = _guard(TrackedList.remove)
+    pop = _guard(TrackedList.pop)
+    insert = _guard(TrackedList.insert)
+    clear = _guard(TrackedList.clear)
+    sort = _guard(TrackedList.sort)
+    reverse = _guard(TrackedList.reverse)
+    __setitem__ = _guard(TrackedList.__setitem__)
+    __delitem__ = _guard(TrackedList.__delitem__)
+    __iadd__ = _guard(TrackedList.__iadd__)
+    __imul__ = _guard(TrackedList.__imul__)
+    del _guard
+
+
+class CourseContentCache:
+    """Loads course content on demand and keeps at most max_courses of it resident."""
+
+    LISTS = ("announcements", "materials", "assignments", "submissions")
+
+    def __init__(self, db, max_courses=None):
+        self.db = db
+        self.max_courses = max_courses
+        self._loaded = OrderedDict()  # cid -> Course, least recently used first
+
+    def attach(self, course):
+        with tracker.paused():
+            for name in self.LISTS:
+                setattr(course, name, LazyList(course, name))
+        course._content_source = self
+
+    def is_loaded(self, course):
+        return course.cid in self._loaded
+
+    def forget(self, course):
+        self._loaded.pop(course.cid, None)
+
+    def ensure(self, course, content=None):
+        """Makes the course's content resident; `content` is what load_content already fetched."""
+        if course.cid in self._loaded:
+            self._loaded.move_to_end(course.cid)
+            return
+        self._loaded[course.cid] = course
+        try:
+            if content is None:
+                content = self.db._load_course_content(course)
+        except Exception:
+            del self._loaded[course.cid]
+            raise
+        with tracker.paused():
+            for name, items in content.items():
+                target = getattr(course, name)
+                if isinstance(target, LazyList):
+                    list.extend(target, items)
+                    if name in ("materials", "assignments"):
+                        for item in items:
+                            item._course = course
+                    course._collection_reset(name)
+        self._evict(keep=course)
+
+    def _evict(self, keep):
+        if self.max_courses is None:
+            return
+        for cid in list(self._loaded):
+            if len(self._loaded) <= self.max_courses:
+                break
+            course = self._loaded[cid]
+            if course is keep or self._has_pending(course):
+                continue
+            counts = dict(course._counts)
+            with tracker.paused():
+                for name in self.LISTS:
+                    target = getattr(course, name)
+                    if isinstance(target, LazyList):
+                        list.clear(target)
+                        course._collection_reset(name)
+            del self._loaded[cid]
+            # Counters describe the stored content, which has not changed
+            for name, value in counts.items():
+                course._set_count(name, value)
+
+    def _has_pending(self, course):
+        def belongs(obj):
+            return obj is course or getattr(obj, "_course", None) is course or getattr(obj, "course", None) is course
+        unsaved = [tracker] + (self.db.writer.queued() if self.db.writer is not None else [])
+        for changes in unsaved:
+            if any(belongs(o) for o in changes.dirty.values()) or any(belongs(o) for o in changes.deleted.values()):
+                return True
+            if any(belongs(entry[0]) for entry in changes.collections.values()):
+                return True
+        return False
@@ -0,0 +1,477 @@
+"""Versioned schema migrations keyed on PRAGMA user_version."""
+from .blob_store import pack
+from .timestamps import parse_deadline
+
+MIGRATIONS = []
+
+
+def migration(version):
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Applies every migration newer than the database, each in its own transaction."""
+    for version, fn in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version > schema_version(conn):
+                fn(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return schema_version(conn)
+
+
+@migration(1)
+def create_base_tables(cursor):
+
+    # Users
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT,
+            email TEXT,
+            role TEXT
+        )
+    """)
+
+    # Courses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS courses (
+            cid TEXT PRIMARY KEY,
+            title TEXT,
+            instructor_username TEXT,
+            FOREIGN KEY(instructor_username) REFERENCES users(username)
+        )
+    """)
+
+    # Enrollments
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrollments (
+            student_username TEXT,
+            course_cid TEXT,
+            FOREIGN KEY(student_username) REFERENCES users(username),
+            FOREIGN KEY(course_cid) REFERENCES courses(cid)
+        )
+    """)
+
+    # Assignments
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assignments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_cid TEXT,
+            title TEXT,
+            description TEXT,
+            deadline TEXT,
+            max_marks INTEGER,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid)
+        )
+    """)
+
+    # Assignment Grades
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assignment_grades (
+            assignment_id INTEGER,
+            student_username TEXT,
+            score INTEGER,
+            FOREIGN KEY(assignment_id) REFERENCES assignments(id),
+            FOREIGN KEY(student_username) REFERENCES users(username)
+        )
+    """)
+
+    # Materials
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_cid TEXT,
+            title TEXT,
+            description TEXT,
+            file_path TEXT,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid)
+        )
+    """)
+
+
+
+    # Submissions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_cid TEXT,
+            assignment_title TEXT,
+            student_username TEXT,
+            content TEXT,
+            date TEXT,
+            is_graded INTEGER,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid),
+            FOREIGN KEY(student_username) REFERENCES users(username)
+        )
+    """)
+
+
+
+    # Messages
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT,
+            recipient TEXT,
+            subject TEXT,
+            body TEXT,
+            timestamp TEXT,
+            is_read INTEGER,
+            FOREIGN KEY(recipient) REFERENCES users(username)
+        )
+    """)
+
+    # Notifications
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            message TEXT,
+            FOREIGN KEY(username) REFERENCES users(username)
+        )
+    """)
+
+    # Logs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT
+        )
+    """)
+
+    # Announcements
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS announcements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_cid TEXT,
+            message TEXT,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid)
+        )
+    """)
+
+
+@migration(2)
+def add_lookup_indexes(cursor):
+    # Duplicate pairs must go before the unique indexes can be built
+    cursor.execute("""
+        DELETE FROM enrollments WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM enrollments GROUP BY course_cid, student_username)
+    """)
+    cursor.execute("""
+        DELETE FROM assignment_grades WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM assignment_grades GROUP BY assignment_id, student_username)
+    """)
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_enrollments_course_student ON enrollments(course_cid, student_username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_enrollments_student ON enrollments(student_username)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_grades_assignment_student ON assignment_grades(assignment_id, student_username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_grades_student ON assignment_grades(student_username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_submissions_lookup ON submissions(course_cid, assignment_title, student_username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_submissions_student ON submissions(student_username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_messages_recipient ON messages(recipient, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_notifications_username ON notifications(username, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_assignments_course ON assignments(course_cid, title)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_materials_course ON materials(course_cid)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_announcements_course ON announcements(course_cid)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_courses_instructor ON courses(instructor_username)")
+
+    # Quizzes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quizzes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_cid TEXT,
+            title TEXT,
+            max_marks INTEGER,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_quizzes_course ON quizzes(course_cid)")
+
+    # Quiz Attempts
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quiz_id INTEGER,
+            student_username TEXT,
+            score INTEGER,
+            date TEXT,
+            FOREIGN KEY(quiz_id) REFERENCES quizzes(id),
+            FOREIGN KEY(student_username) REFERENCES users(username)
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_quiz_attempts_quiz_student ON quiz_attempts(quiz_id, student_username)")
+
+
+@migration(3)
+def add_sequences(cursor):
+    # Monotonic id allocators that survive deletes and restarts
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """)
+
+
+@migration(4)
+def add_epoch_timestamps(cursor):
+    # Times are stored as integer epoch seconds and formatted only for display
+    cursor.execute("ALTER TABLE messages ADD COLUMN sent_at INTEGER")
+    cursor.execute("ALTER TABLE submissions ADD COLUMN submitted_at INTEGER")
+    cursor.execute("UPDATE messages SET sent_at = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)")
+    cursor.execute("UPDATE submissions SET submitted_at = CAST(strftime('%s', date, 'utc') AS INTEGER)")
+
+
+@migration(5)
+def add_listing_indexes(cursor):
+    # Keyset pagination for the admin lists walks these in order
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_users_role ON users(role, username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_courses_title ON courses(title, cid)")
+    cursor.execute("DROP INDEX IF EXISTS ix_courses_instructor")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_courses_instructor ON courses(instructor_username, cid)")
+
+
+@migration(6)
+def add_audit_columns(cursor):
+    # Existing lines predate timestamps; they are dated to the upgrade
+    cursor.execute("ALTER TABLE logs ADD COLUMN ts INTEGER")
+    cursor.execute("ALTER TABLE logs ADD COLUMN level TEXT NOT NULL DEFAULT 'INFO'")
+    cursor.execute("ALTER TABLE logs ADD COLUMN actor TEXT")
+    cursor.execute("UPDATE logs SET ts = CAST(strftime('%s', 'now') AS INTEGER)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_logs_ts ON logs(ts)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_logs_actor ON logs(actor, ts)")
+
+
+@migration(7)
+def add_broadcasts(cursor):
+    # A broadcast's text is stored once; recipients get a delivery row each
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT,
+            course_cid TEXT,
+            kind TEXT NOT NULL DEFAULT 'message',
+            subject TEXT,
+            body TEXT,
+            sent_at INTEGER,
+            FOREIGN KEY(course_cid) REFERENCES courses(cid) ON DELETE SET NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS deliveries (
+            broadcast_id INTEGER,
+            recipient TEXT,
+            is_read INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(broadcast_id, recipient),
+            FOREIGN KEY(broadcast_id) REFERENCES broadcasts(id) ON DELETE CASCADE,
+            FOREIGN KEY(recipient) REFERENCES users(username)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_deliveries_recipient ON deliveries(recipient, broadcast_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_broadcasts_course ON broadcasts(course_cid)")
+
+
+# Full-text search covers several tables through one FTS5 index. An entry's
+# rowid is the source id * 8 + the source's tag, so triggers can find it.
+# Who may see an entry is written into its `scope` column as tokens, so
+# permission checks are part of the MATCH instead of a filter on every hit:
+#   c<cid>  course content          s<cid>  submissions in a course
+#   u<user> a user's own rows       b<id>   a broadcast's recipients
+#   staff   visible to admins
+# Keys are hex encoded so the tokenizer keeps each one whole.
+SEARCH_SOURCES = {
+    # table: (tag, kind, title, body, course, author, scope, only rows where)
+    "materials": (1, "material", "title", "description", "course_cid", None,
+                  "'c' || lower(hex({row}.course_cid)) || ' staff'", None),
+    "assignments": (2, "assignment", "title", "description", "course_cid", None,
+                    "'c' || lower(hex({row}.course_cid)) || ' staff'", None),
+    "announcements": (3, "announcement", None, "message", "course_cid", None,
+                      "'c' || lower(hex({row}.course_cid)) || ' staff'", None),
+    "messages": (4, "message", "subject", "body", None, "sender",
+                 "'u' || lower(hex({row}.recipient)) || ' u' || lower(hex({row}.sender))", None),
+    # Migration 9 moves submission text to the blob store and indexes it from Python
+    "submissions": (5, "submission", "assignment_title", "content", "course_cid", "student_username",
+                    "'s' || lower(hex({row}.course_cid)) || ' u' || lower(hex({row}.student_username)) || ' staff'", None),
+    "broadcasts": (6, "broadcast", "subject", "body", "course_cid", "sender",
+                   "'b' || lower(hex({row}.id)) || ' u' || lower(hex({row}.sender))", "kind = 'message'"),
+}
+
+
+def scope_token(prefix, value):
+    """The scope token SQLite's lower(hex(value)) produces for a key."""
+    return prefix + str(value).encode().hex()
+
+
+def search_entry(table, row):
+    """INSERT ... SELECT writing the index entry for `row` (new, or the table itself)."""
+    tag, kind, title, body, course, author, scope, condition = SEARCH_SOURCES[table]
+    values = ", ".join(f"{row}.{c}" if c else "NULL" for c in (title, body, course, author))
+    sql = f"""
+        INSERT INTO search_index (rowid, title, body, course_cid, author, scope, kind, ref)
+        SELECT {row}.id * 8 + {tag}, {values}, {scope.format(row=row)}, '{kind}', {row}.id"""
+    if row == table:
+        sql += f" FROM {table}"
+    return sql + (f" WHERE {row}.{condition}" if condition else "")
+
+
+def create_search_triggers(cursor, table):
+    tag = SEARCH_SOURCES[table][0]
+    watched = [c for c in SEARCH_SOURCES[table][2:6] if c] + (["recipient"] if table == "messages" else [])
+    changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in watched)
+    remove = f"DELETE FROM search_index WHERE rowid = old.id * 8 + {tag}"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}
+        BEGIN {search_entry(table, "new")}; END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table}
+        BEGIN {remove}; END""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE ON {table} WHEN {changed}
+        BEGIN {remove}; {search_entry(table, "new")}; END""")
+
+
+@migration(8)
+def add_search_index(cursor):
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title, body, scope,
+            course_cid UNINDEXED, author UNINDEXED, kind UNINDEXED, ref UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+    """)
+    for table in SEARCH_SOURCES:
+        cursor.execute(search_entry(table, table))
+        create_search_triggers(cursor, table)
+
+
+def index_submission(cursor, row_id, course_cid, title, student, text, replace=True):
+    """Submission text lives in the blob store, so its index entry is written from Python."""
+    key = row_id * 8 + SEARCH_SOURCES["submissions"][0]
+    if replace:
+        cursor.execute("DELETE FROM search_index WHERE rowid = ?", (key,))
+    cursor.execute("""
+        INSERT INTO search_index (rowid, title, body, course_cid, author, scope, kind, ref)
+        VALUES (?, ?, ?, ?, ?, ?, 'submission', ?)
+    """, (key, title, text, course_cid, student,
+          f"{scope_token('s', course_cid)} {scope_token('u', student)} staff", row_id))
+
+
+@migration(9)
+def add_blob_store(cursor):
+    # Compressed content keyed by its SHA-256; rows only keep the hash and size
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            id INTEGER PRIMARY KEY,
+            hash TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    for table in ("submissions", "materials"):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN content_hash TEXT")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN content_size INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_blob ON {table}(content_hash)")
+
+    # Move submission text into blobs a chunk at a time; the index entries already hold it
+    last = 0
+    while True:
+        cursor.execute("SELECT id, content FROM submissions WHERE id > ? ORDER BY id LIMIT 1000", (last,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last = rows[-1][0]
+        packed = [(row_id, pack(content)) for row_id, content in rows if content is not None]
+        cursor.executemany("INSERT INTO blobs (hash, size, data) VALUES (?, ?, ?) ON CONFLICT(hash) DO NOTHING",
+                           [p for _, p in packed])
+        cursor.executemany("UPDATE submissions SET content_hash = ?, content_size = ? WHERE id = ?",
+                           [(p[0], p[1], row_id) for row_id, p in packed])
+
+    cursor.execute("DROP TRIGGER IF EXISTS submissions_search_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS submissions_search_update")
+    cursor.execute("ALTER TABLE submissions DROP COLUMN content")
+
+
+@migration(10)
+def add_due_dates(cursor):
+    # Deadlines parsed once into epoch seconds; deadline_stage counts reminders sent
+    cursor.execute("ALTER TABLE assignments ADD COLUMN due_at INTEGER")
+    cursor.execute("ALTER TABLE assignments ADD COLUMN deadline_stage INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("SELECT id, deadline FROM assignments WHERE deadline IS NOT NULL")
+    cursor.executemany("UPDATE assignments SET due_at = ? WHERE id = ?",
+                       [(parse_deadline(deadline), row_id) for row_id, deadline in cursor.fetchall()])
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_assignments_due ON assignments(due_at)")
+
+
+@migration(11)
+def add_archive_catalog(cursor):
+    # Courses moved out to a term archive; see models/archive.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archived_courses (
+            cid TEXT PRIMARY KEY,
+            title TEXT,
+            instructor_username TEXT,
+            term TEXT NOT NULL,
+            students INTEGER,
+            submissions INTEGER,
+            archived_at INTEGER
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_archived_courses_term ON archived_courses(term, cid)")
+
+
+@migration(12)
+def fix_broadcast_search_scope(cursor):
+    # Broadcast entries were scoped 'b<id>' while searches ask for scope_token('b', id)
+    for kind in ("insert", "delete", "update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS broadcasts_search_{kind}")
+    cursor.execute("DELETE FROM search_index WHERE kind = 'broadcast'")
+    cursor.execute(search_entry("broadcasts", "broadcasts"))
+    create_search_triggers(cursor, "broadcasts")
+
+
+# Hot lookups that must be answered from an index rather than a table scan
+HOT_QUERIES = (
+    "SELECT 1 FROM submissions WHERE course_cid = ? AND assignment_title = ? AND student_username = ?",
+    "SELECT id FROM submissions WHERE course_cid = ?",
+    "SELECT student_username FROM enrollments WHERE course_cid = ?",
+    "SELECT course_cid FROM enrollments WHERE student_username = ?",
+    "SELECT * FROM messages WHERE recipient = ?",
+    "SELECT message FROM notifications WHERE username = ?",
+    "SELECT * FROM assignment_grades WHERE assignment_id = ?",
+    "SELECT id FROM assignments WHERE course_cid = ?",
+    "SELECT id FROM materials WHERE course_cid = ?",
+    "SELECT message FROM announcements WHERE course_cid = ?",
+    "SELECT id FROM logs WHERE ts >= ? AND ts < ?",
+    "SELECT id FROM logs WHERE actor = ? AND ts >= ?",
+    "SELECT broadcast_id FROM deliveries WHERE recipient = ?",
+    "SELECT id FROM broadcasts WHERE course_cid = ?",
+    "SELECT id FROM assignments WHERE due_at >= ? AND due_at < ?",
+    "SELECT cid FROM archived_courses WHERE term = ?",
+)
+
+
+def unindexed_queries(conn, queries=HOT_QUERIES):
+    """Returns (sql, plan detail) for every query whose plan scans a table."""
+    slow = []
+    for sql in queries:
+        params = (None,) * sql.count("?")
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if detail.startswith("SCAN") and "USING" not in detail:
+                slow.append((sql, detail))
+    return slow
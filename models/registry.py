@@ -0,0 +1,163 @@
+from .change_tracker import tracker
+from .user_models import Instructor, Student
+from .stats import DashboardStats
+
+
+class IndexedCollection:
+    """Ordered, list-like view of a registry index.
+
+    Iteration, len() and membership behave like the old plain lists, while
+    append/remove are routed through the registry so its indexes stay valid.
+    """
+
+    def __init__(self, registry, items, key, add, remove):
+        self.registry = registry
+        self._items = items
+        self._key = key
+        self._add = add
+        self._remove = remove
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __reversed__(self):
+        return reversed(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __contains__(self, obj):
+        return self._items.get(self._key(obj)) is obj
+
+    def __getitem__(self, index):
+        return list(self._items.values())[index]
+
+    def get(self, key, default=None):
+        return self._items.get(key, default)
+
+    def append(self, obj):
+        self._add(obj)
+
+    def remove(self, obj):
+        if obj not in self:
+            raise ValueError("object is not registered")
+        self._remove(obj)
+
+
+class Registry:
+    """Owns every user and course and indexes them by key, role and instructor."""
+
+    FIRST_COURSE_ID = 100
+
+    def __init__(self, users=(), courses=(), next_course_id=FIRST_COURSE_ID):
+        self._users = {}         # username -> User
+        self._courses = {}       # cid -> Course
+        self._by_role = {}       # role -> {username: User}
+        self._by_instructor = {} # username -> {cid: Course}
+        self._next_cid = next_course_id
+        self.db = None
+        self.stats = DashboardStats(self)
+        self.users = IndexedCollection(self, self._users, lambda u: u.get_username(), self.add_user, self.remove_user)
+        self.courses = IndexedCollection(self, self._courses, lambda c: c.cid, self.add_course, self.remove_course)
+        for u in users:
+            self.add_user(u)
+        for c in courses:
+            self.add_course(c)
+
+    # Lookups
+    def get_user(self, username):
+        return self._users.get(username)
+
+    def get_course(self, cid):
+        return self._courses.get(cid)
+
+    def users_by_role(self, role):
+        return self._by_role.get(role, {}).values()
+
+    def courses_for_instructor(self, username):
+        return self._by_instructor.get(username, {}).values()
+
+    @property
+    def course_id_counter(self):
+        return self._next_cid
+
+    def next_course_id(self):
+        cid = self._next_cid
+        self._next_cid += 1
+        return str(cid)
+
+    # Registration
+    def add_user(self, user):
+        name = user.get_username()
+        if name in self._users:
+            raise ValueError(f"username {name!r} is already taken")
+        self._users[name] = user
+        self._by_role.setdefault(user.get_role(), {})[name] = user
+
+    def add_course(self, course):
+        if course.cid in self._courses:
+            raise ValueError(f"course id {course.cid!r} is already taken")
+        self._courses[course.cid] = course
+        self.stats.attach(course)
+        if str(course.cid).isdigit():
+            self._next_cid = max(self._next_cid, int(course.cid) + 1)
+        inst = course.instructor
+        if inst is not None:
+            self._by_instructor.setdefault(inst.get_username(), {})[course.cid] = course
+            if isinstance(inst, Instructor) and course not in inst.assigned_courses:
+                inst.assigned_courses.append(course)
+
+    # Cascading removal
+    def remove_course(self, course):
+        self._courses.pop(course.cid, None)
+        if course._stats is self.stats:
+            self.stats.detach(course)
+        inst = course.instructor
+        if inst is not None:
+            self._by_instructor.get(inst.get_username(), {}).pop(course.cid, None)
+            if isinstance(inst, Instructor) and course in inst.assigned_courses:
+                inst.assigned_courses.remove(course)
+        for s in course.students:
+            if course in s.enrolled_courses:
+                s.enrolled_courses.remove(course)
+        course.mark_deleted()
+
+    def remove_user(self, user):
+        """Removes the user with their enrollments, grades, submissions and inbox.
+
+        Courses are never deleted along with their instructor: an instructor
+        who still teaches is refused until the courses are reassigned or removed.
+        """
+        name = user.get_username()
+        if isinstance(user, Instructor):
+            teaching = self.courses_for_instructor(name)
+            if teaching:
+                raise ValueError(f"{name} still teaches {len(teaching)} course(s); reassign or delete them first")
+            self._by_instructor.pop(name, None)
+        if isinstance(user, Student):
+            # The courses' rosters are the truth; enrolled_courses misses add_student enrollments
+            for course in [c for c in self._courses.values() if c.is_enrolled(name)]:
+                self._withdraw(user, course)
+        # Their inbox rows go with the user row; unsaved messages to them are dropped
+        for m in user.inbox:
+            tracker.mark_deleted(m)
+        with tracker.paused():
+            user.inbox.clear()
+        self._users.pop(name, None)
+        self._by_role.get(user.get_role(), {}).pop(name, None)
+        user.mark_deleted()
+
+    def _withdraw(self, student, course):
+        name = student.get_username()
+        for a in course.assignments:
+            a.remove_grade(name)
+            sub = course.get_submission(name, a.title)
+            while sub is not None:
+                course.submissions.remove(sub)
+                sub = course.get_submission(name, a.title)
+        course.remove_student(student)
+        if course in student.enrolled_courses:
+            student.enrolled_courses.remove(course)
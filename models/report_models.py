@@ -0,0 +1,142 @@
+import csv
+import weakref
+from abc import ABC
+
+
+class BaseReport(ABC):
+    """A report computed by one grouped SQL query.
+
+    Results are cached per database and reused until one of the tables in
+    TABLES has been written since, so regenerating an unchanged report is
+    free. Exports stream straight from the cursor.
+    """
+
+    TITLE = ""
+    TABLES = ()   # tables the query reads
+    COLUMNS = ()  # (heading, text width)
+    SQL = ""
+
+    _cache = weakref.WeakKeyDictionary()  # db -> {report class: (versions, rows)}
+
+    def rows(self, db):
+        versions = db.table_versions(self.TABLES)
+        cached = self._cache.setdefault(db, {}).get(type(self))
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        rows = [tuple(r) for r in db.stream_query(self.SQL)]
+        self._cache[db][type(self)] = (versions, rows)
+        return rows
+
+    def iter_rows(self, db):
+        cached = self._cache.get(db, {}).get(type(self))
+        if cached is not None and cached[0] == db.table_versions(self.TABLES):
+            return iter(cached[1])
+        return (tuple(r) for r in db.stream_query(self.SQL))
+
+    def generate(self, lms):
+        db = self._db(lms)
+        return "".join(self._text_lines(self.rows(db)))
+
+    def export(self, lms, path):
+        """Writes the report to path as CSV, or as text for any other extension."""
+        db = self._db(lms)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                self.write_csv(db, f)
+            else:
+                self.write_text(db, f)
+
+    def write_csv(self, db, out):
+        writer = csv.writer(out)
+        writer.writerow([c[0] for c in self.COLUMNS])
+        writer.writerows(self.iter_rows(db))
+
+    def write_text(self, db, out):
+        out.writelines(self._text_lines(self.iter_rows(db)))
+
+    def _text_lines(self, rows):
+        yield f"{self.TITLE}\n"
+        header = "".join(h.ljust(w) for h, w in self.COLUMNS).rstrip()
+        yield header + "\n"
+        yield "-" * len(header) + "\n"
+        count = 0
+        for row in rows:
+            count += 1
+            yield "".join(self._cell(v).ljust(w) for v, (_, w) in zip(row, self.COLUMNS)).rstrip() + "\n"
+        yield f"\n{count} rows\n"
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.1f}"
+        return str(value)
+
+    @staticmethod
+    def _db(lms):
+        db = lms.users.registry.db
+        db.flush()
+        return db
+
+
+class UserReport(BaseReport):
+    TITLE = "User Audit"
+    TABLES = ("users", "enrollments", "courses", "submissions", "messages", "deliveries", "broadcasts")
+    COLUMNS = (("Username", 20), ("Role", 12), ("Email", 30), ("Enrolled", 10),
+               ("Teaching", 10), ("Submissions", 13), ("Unread", 8))
+    SQL = """
+        SELECT u.username, u.role, u.email,
+            COALESCE(e.n, 0), COALESCE(c.n, 0), COALESCE(s.n, 0), COALESCE(m.n, 0)
+        FROM users u
+        LEFT JOIN (SELECT student_username AS k, COUNT(*) AS n FROM enrollments GROUP BY student_username) e ON e.k = u.username
+        LEFT JOIN (SELECT instructor_username AS k, COUNT(*) AS n FROM courses GROUP BY instructor_username) c ON c.k = u.username
+        LEFT JOIN (SELECT student_username AS k, COUNT(*) AS n FROM submissions GROUP BY student_username) s ON s.k = u.username
+        LEFT JOIN (SELECT recipient AS k, COUNT(*) AS n FROM (
+                       SELECT recipient FROM messages WHERE is_read = 0
+                       UNION ALL
+                       SELECT d.recipient FROM deliveries d JOIN broadcasts b ON b.id = d.broadcast_id
+                       WHERE d.is_read = 0 AND b.kind = 'message')
+                   GROUP BY recipient) m ON m.k = u.username
+        ORDER BY u.role, u.username
+    """
+
+
+class CourseReport(BaseReport):
+    TITLE = "Course Enrollment & Grading"
+    TABLES = ("courses", "enrollments", "assignments", "submissions", "assignment_grades")
+    COLUMNS = (("ID", 8), ("Title", 28), ("Instructor", 16), ("Students", 10), ("Assignments", 13),
+               ("Submissions", 13), ("Ungraded", 10), ("Avg %", 8))
+    SQL = """
+        SELECT c.cid, c.title, c.instructor_username,
+            COALESCE(e.n, 0), COALESCE(a.n, 0), COALESCE(s.n, 0), COALESCE(s.ungraded, 0), g.avg_pct
+        FROM courses c
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n FROM enrollments GROUP BY course_cid) e ON e.k = c.cid
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n FROM assignments GROUP BY course_cid) a ON a.k = c.cid
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n, SUM(is_graded = 0) AS ungraded
+                   FROM submissions GROUP BY course_cid) s ON s.k = c.cid
+        LEFT JOIN (SELECT a.course_cid AS k, AVG(100.0 * g.score / a.max_marks) AS avg_pct
+                   FROM assignment_grades g JOIN assignments a ON a.id = g.assignment_id
+                   WHERE a.max_marks > 0 GROUP BY a.course_cid) g ON g.k = c.cid
+        ORDER BY c.cid
+    """
+
+
+class InstructorLoadReport(BaseReport):
+    TITLE = "Instructor Load"
+    TABLES = ("users", "courses", "enrollments", "assignments", "submissions")
+    COLUMNS = (("Instructor", 20), ("Courses", 10), ("Students", 10), ("Assignments", 13),
+               ("Submissions", 13), ("To Grade", 10))
+    SQL = """
+        SELECT u.username, COUNT(c.cid), COALESCE(SUM(e.n), 0), COALESCE(SUM(a.n), 0),
+            COALESCE(SUM(s.n), 0), COALESCE(SUM(s.ungraded), 0)
+        FROM users u
+        LEFT JOIN courses c ON c.instructor_username = u.username
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n FROM enrollments GROUP BY course_cid) e ON e.k = c.cid
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n FROM assignments GROUP BY course_cid) a ON a.k = c.cid
+        LEFT JOIN (SELECT course_cid AS k, COUNT(*) AS n, SUM(is_graded = 0) AS ungraded
+                   FROM submissions GROUP BY course_cid) s ON s.k = c.cid
+        WHERE u.role = 'Instructor'
+        GROUP BY u.username
+        ORDER BY COALESCE(SUM(s.ungraded), 0) DESC, u.username
+    """
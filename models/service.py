@@ -0,0 +1,421 @@
+"""Headless JSON-over-HTTP service on the LMS models, standard library only.
+
+    python -m models.service --db lms_data.db --port 8080
+
+    POST /login                                 {"username", "password"} -> {"token", "role"}
+    POST /logout
+    GET  /courses                               yours; admins page through all with ?after=&limit=
+    GET  /courses/{cid}
+    POST /courses/{cid}/enroll                  students enroll themselves; admins send {"student"}
+    GET  /courses/{cid}/assignments/{title}/submissions     course instructor or admin
+    POST /courses/{cid}/assignments/{title}/submission      {"content"}
+    POST /courses/{cid}/assignments/{title}/grades          {"student", "score"}
+    GET  /inbox                                 newest first, ?after=&limit=
+    GET  /search                                ?q=&course=&after=&limit=
+    POST /messages                              {"to", "subject", "body"}
+    GET  /health
+
+Send the token as "Authorization: Bearer <token>". Paged responses
+carry "next", which goes back as ?after= (JSON) for the following page.
+
+The models are not thread-safe, so only the event loop touches them,
+the way only the Tk thread does in the GUI. Saves are collected there
+and written by the write-behind thread. Queries that only read the
+database go to a bounded pool of threads, each with its own read-only
+connection, so they run concurrently. When every slot is busy,
+requests wait their turn and the pool does not grow. Course content is
+loaded lazily: it is read in that pool and only installed on the loop.
+"""
+import argparse
+import asyncio
+import json
+import re
+import secrets
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+from .content_models import Submission
+from .database_manager import DatabaseManager
+from .timestamps import now
+from .user_models import Admin, Student
+
+MAX_BODY = 1 << 20
+SESSION_SECONDS = 8 * 60 * 60
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    __slots__ = ("method", "path", "params", "query", "body", "user", "token")
+
+    def __init__(self, method, path, query, body):
+        self.method, self.path, self.query, self.body = method, path, query, body
+        self.params = {}
+        self.user = None
+        self.token = None
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        return data
+
+    def field(self, name, kind=str):
+        value = self.json().get(name)
+        if value is None or (kind is str and not str(value).strip()):
+            raise HTTPError(400, f"missing {name}")
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{name} must be a {kind.__name__}")
+
+    def page(self, default=50, most=500):
+        try:
+            limit = min(int(self.query.get("limit", default)), most)
+            after = json.loads(self.query["after"]) if self.query.get("after") else None
+        except ValueError:
+            raise HTTPError(400, "bad paging parameters")
+        return (tuple(after) if isinstance(after, list) else after), max(limit, 1)
+
+
+def route(method, pattern, auth=True):
+    def mark(fn):
+        fn._route = (method, re.compile("^" + re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", pattern) + "$"), auth)
+        return fn
+    return mark
+
+
+class LMSService:
+    def __init__(self, db, readers=8, save_delay=0.05):
+        self.db = db
+        self.readers = readers
+        self.save_delay = save_delay
+        self.registry = None
+        self.logs = None
+        self._sessions = {}  # token -> (username, expires)
+        self._executor = None
+        self._slots = None
+        self._open = set()  # writers of live connections
+        self._routes = [getattr(self, n)._route + (getattr(self, n),) for n in dir(self)
+                        if hasattr(getattr(self, n), "_route")]
+
+    # Lifecycle
+    async def start(self, host="127.0.0.1", port=8080):
+        self._executor = ThreadPoolExecutor(self.readers, thread_name_prefix="lms-reader")
+        self._slots = asyncio.Semaphore(self.readers * 4)
+        users, courses, self.logs = await self._blocking(self.db.load_full_state, True)
+        self.registry = users.registry
+        self.db.start_write_behind(self.save_delay, self._save_failed)
+        self.server = await asyncio.start_server(self._connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self.server.close()
+        for writer in list(self._open):
+            writer.close()
+        await self.server.wait_closed()
+        self._save()
+        await self._blocking(self.db.flush)
+        self._executor.shutdown()
+
+    async def _blocking(self, fn, *args):
+        # Bounded: at most readers * 4 calls queued or running at once
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _save(self):
+        self.db.save_full_state(self.registry.users, self.registry.courses, self.logs)
+
+    @staticmethod
+    def _save_failed(changes, exc):
+        # Called on the writer thread once it gives up on a change set
+        print(f"A save was set aside after repeated failures: {exc!r}", file=sys.stderr, flush=True)
+
+    # HTTP
+    async def _connection(self, reader, writer):
+        self._open.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._dispatch(method, target, headers, body)
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._open.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n"
+                     .encode("latin-1") + data)
+        await writer.drain()
+
+    async def _dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        req = Request(method, unquote(url.path), dict(parse_qsl(url.query)), body)
+        allowed = False
+        try:
+            for verb, pattern, auth, handler in self._routes:
+                m = pattern.match(url.path)
+                if not m:
+                    continue
+                allowed = True
+                if verb != method:
+                    continue
+                req.params = {k: unquote(v) for k, v in m.groupdict().items()}
+                if auth:
+                    self._authenticate(req, headers)
+                return 200, await handler(req)
+            raise HTTPError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            self.logs.append(f"Service error on {method} {url.path}: {e}", level="ERROR")
+            return 500, {"error": "internal error"}
+
+    def _authenticate(self, req, headers):
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        session = self._sessions.get(token) if scheme.lower() == "bearer" else None
+        if session is None or session[1] < time.time():
+            self._sessions.pop(token, None)
+            raise HTTPError(401, "log in first")
+        req.user, req.token = self.registry.get_user(session[0]), token
+        if req.user is None:
+            raise HTTPError(401, "log in first")
+
+    # Lookups shared by the handlers
+    async def _course(self, req, content=True):
+        course = self.registry.get_course(req.params["cid"])
+        if course is None:
+            raise HTTPError(404, "no such course")
+        if content:
+            await self._load_content(course)
+        return course
+
+    async def _load_content(self, course):
+        # Touching a lazy list would read SQLite on the loop; fetch in the pool instead
+        cache = self.db.content_cache
+        if cache is None or cache.is_loaded(course):
+            return
+        content = await self._blocking(self.db._load_course_content, course, True)
+        if self.registry.get_course(course.cid) is course:
+            cache.ensure(course, content)  # a no-op if another request got there first
+
+    def _assignment(self, course, req):
+        assignment = course.get_assignment(req.params["title"])
+        if assignment is None:
+            raise HTTPError(404, "no such assignment")
+        return assignment
+
+    def _teaches(self, user, course):
+        if not (isinstance(user, Admin) or course.instructor is user):
+            raise HTTPError(403, "only the course instructor can do that")
+
+    @staticmethod
+    def _course_row(course):
+        return {"cid": course.cid, "title": course.title,
+                "instructor": course.instructor.get_username() if course.instructor else None,
+                "students": course.count("students")}
+
+    # Endpoints
+    @route("GET", "/health", auth=False)
+    async def health(self, req):
+        return {"status": "ok", "users": len(self.registry.users), "courses": len(self.registry.courses)}
+
+    @route("POST", "/login", auth=False)
+    async def login(self, req):
+        user = self.registry.get_user(req.field("username"))
+        if user is None or not user.check_password(req.field("password")):
+            raise HTTPError(401, "wrong username or password")
+        token = secrets.token_urlsafe(24)
+        self._sessions[token] = (user.get_username(), time.time() + SESSION_SECONDS)
+        self.logs.append("Logged in through the service", actor=user.get_username())
+        return {"token": token, "role": user.get_role()}
+
+    @route("POST", "/logout")
+    async def logout(self, req):
+        self._sessions.pop(req.token, None)
+        return {"ok": True}
+
+    @route("GET", "/courses")
+    async def courses(self, req):
+        user = req.user
+        if isinstance(user, Admin):
+            after, limit = req.page()
+            rows, last = await self._blocking(self.db.page_courses, after, limit)
+            return {"courses": [dict(r) for r in rows], "next": last if len(rows) == limit else None}
+        mine = user.enrolled_courses if isinstance(user, Student) else self.registry.courses_for_instructor(
+            user.get_username())
+        return {"courses": [self._course_row(c) for c in mine], "next": None}
+
+    @route("GET", "/courses/{cid}")
+    async def course(self, req):
+        course = await self._course(req)
+        return dict(self._course_row(course), enrolled=course.is_enrolled(req.user.get_username()),
+                    announcements=list(course.announcements)[-20:],
+                    assignments=[{"title": a.title, "deadline": a.deadline, "max_marks": a.max_marks,
+                                  "overdue": a.is_overdue()} for a in course.assignments])
+
+    @route("POST", "/courses/{cid}/enroll")
+    async def enroll(self, req):
+        course = await self._course(req, content=False)
+        if isinstance(req.user, Admin):
+            student = self.registry.get_user(req.field("student"))
+        elif isinstance(req.user, Student):
+            student = req.user
+        else:
+            raise HTTPError(403, "instructors cannot enroll")
+        if not isinstance(student, Student):
+            raise HTTPError(404, "no such student")
+        if not course.is_enrolled(student.get_username()):
+            course.add_student(student)
+            student.enrolled_courses.append(course)
+            self.logs.append(f"Enrolled {student.get_username()} in {course.cid}", actor=req.user.get_username())
+            self._save()
+        return {"enrolled": True, "students": course.count("students")}
+
+    @route("GET", "/courses/{cid}/assignments/{title}/submissions")
+    async def submissions(self, req):
+        course = await self._course(req)
+        self._teaches(req.user, course)
+        assignment = self._assignment(course, req)
+        return {"submissions": [{"student": s.student.get_username(), "submitted_at": s.submitted_at,
+                                 "size": s.content_size, "late": s.is_late, "graded": bool(s.is_graded),
+                                 "grade": assignment.get_grade(s.student.get_username())}
+                                for s in course.submissions if s.assignment is assignment]}
+
+    @route("POST", "/courses/{cid}/assignments/{title}/submission")
+    async def submit(self, req):
+        course = await self._course(req)
+        assignment = self._assignment(course, req)
+        student = req.user
+        if not isinstance(student, Student) or not course.is_enrolled(student.get_username()):
+            raise HTTPError(403, "only enrolled students can submit")
+        content = req.field("content")
+        sub = course.get_submission(student.get_username(), assignment.title)
+        if sub is None:
+            sub = Submission(student, course, assignment, content)
+            course.submissions.append(sub)
+        else:
+            # A resubmission replaces the graded work, so its grade goes too
+            sub.content = content
+            sub.submitted_at = now()
+            sub.is_graded = False
+            assignment.remove_grade(student.get_username())
+        self._save()
+        return {"submitted_at": sub.submitted_at, "late": sub.is_late, "size": sub.content_size}
+
+    @route("POST", "/courses/{cid}/assignments/{title}/grades")
+    async def grade(self, req):
+        course = await self._course(req)
+        self._teaches(req.user, course)
+        assignment = self._assignment(course, req)
+        student, score = req.field("student"), req.field("score", float)
+        sub = course.get_submission(student, assignment.title)
+        if sub is None:
+            raise HTTPError(404, "nothing submitted")
+        if not 0 <= score <= (assignment.max_marks or 0):
+            raise HTTPError(400, f"score must be between 0 and {assignment.max_marks}")
+        assignment.set_grade(student, int(score) if score == int(score) else score)
+        sub.is_graded = True
+        self.logs.append(f"Graded {student} on {assignment.title} in {course.cid}", actor=req.user.get_username())
+        self._save()
+        return {"student": student, "score": assignment.get_grade(student)}
+
+    @route("GET", "/inbox")
+    async def inbox(self, req):
+        # The loaded inbox is current even before the write-behind thread catches up
+        offset, limit = req.page()
+        offset = offset or 0
+        if not isinstance(offset, int):
+            raise HTTPError(400, "bad paging parameters")
+        newest = sorted(reversed(req.user.inbox), key=lambda m: m.sent_at or 0, reverse=True)[offset:offset + limit]
+        return {"unread": req.user.get_unread_count(),
+                "messages": [{"sender": m.sender, "subject": m.subject, "body": m.body, "sent_at": m.sent_at,
+                              "is_read": bool(m.is_read)} for m in newest],
+                "next": offset + limit if len(newest) == limit else None}
+
+    @route("GET", "/search")
+    async def search(self, req):
+        # Sees what has been saved, which trails the models by the write-behind delay
+        text = req.query.get("q", "").strip()
+        if not text:
+            raise HTTPError(400, "missing q")
+        offset, limit = req.page(20, 100)
+        offset = offset or 0
+        if not isinstance(offset, int):
+            raise HTTPError(400, "bad paging parameters")
+        rows = await self._blocking(self.db.search, text, req.user, req.query.get("course"), limit, offset)
+        return {"results": [dict(r) for r in rows], "next": offset + limit if len(rows) == limit else None}
+
+    @route("POST", "/messages")
+    async def message(self, req):
+        recipient = self.registry.get_user(req.field("to"))
+        if recipient is None:
+            raise HTTPError(404, "no such user")
+        req.user.send_message(recipient, req.field("subject"), req.json().get("body", ""))
+        self._save()
+        return {"sent": True}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the LMS as JSON over HTTP.")
+    parser.add_argument("--db", default=DatabaseManager.DB_NAME)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=8, help="threads for database reads")
+    args = parser.parse_args(argv)
+
+    DatabaseManager.DB_NAME = args.db
+    service = LMSService(DatabaseManager(), args.readers)
+
+    async def serve():
+        host, port = await service.start(args.host, args.port)
+        print(f"Serving on http://{host}:{port}", flush=True)
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    service.db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
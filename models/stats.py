@@ -0,0 +1,78 @@
+class DashboardStats:
+    """Registry-wide counters for the dashboards.
+
+    Courses and users keep their own counts as their lists change and push
+    the deltas here, so every read is O(1) instead of a scan.
+    """
+
+    FIELDS = ("students", "materials", "submissions", "ungraded")
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+
+    def adjust(self, name, delta):
+        self.totals[name] += delta
+
+    def attach(self, course):
+        course._stats = self
+        for name in self.FIELDS:
+            self.totals[name] += course.count(name)
+
+    def detach(self, course):
+        for name in self.FIELDS:
+            self.totals[name] -= course.count(name)
+        course._stats = None
+
+    # Reads
+    def user_count(self, role=None):
+        return len(self.registry.users) if role is None else len(self.registry.users_by_role(role))
+
+    def course_count(self):
+        return len(self.registry.courses)
+
+    def total(self, name):
+        return self.totals[name]
+
+    def course(self, course):
+        return dict(course._counts)
+
+    def unread(self, user):
+        return user.get_unread_count()
+
+    def verify(self):
+        """Recomputes every counter from scratch; returns a list of mismatches."""
+        problems = []
+
+        def check(what, kept, actual):
+            if kept != actual:
+                problems.append(f"{what}: counter {kept}, actual {actual}")
+
+        roles = {}
+        for u in self.registry.users:
+            roles[u.get_role()] = roles.get(u.get_role(), 0) + 1
+            check(f"unread[{u.get_username()}]", u.get_unread_count(), sum(1 for m in u.inbox if not m.is_read))
+        for role in set(roles) | set(self.registry._by_role):
+            check(f"users[{role}]", self.user_count(role), roles.get(role, 0))
+
+        totals = dict.fromkeys(self.FIELDS, 0)
+        stored = None
+        for c in self.registry.courses:
+            if c._content_resident():
+                actual = {"students": len({s.get_username() for s in c.students}),
+                          "materials": len(c.materials), "submissions": len(c.submissions),
+                          "ungraded": sum(1 for s in c.submissions if not s.is_graded)}
+            else:
+                # Counting an unloaded course must not load it
+                if stored is None:
+                    db = self.registry.db
+                    db.flush()
+                    stored = db.course_counts()
+                actual = dict(stored.get(c.cid, dict.fromkeys(self.FIELDS[1:], 0)),
+                              students=len({s.get_username() for s in c.students}))
+            for name in self.FIELDS:
+                check(f"{name}[{c.cid}]", c.count(name), actual[name])
+                totals[name] += actual[name]
+        for name in self.FIELDS:
+            check(f"total {name}", self.totals[name], totals[name])
+        return problems
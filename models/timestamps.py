@@ -0,0 +1,44 @@
+import time
+
+MINUTE = "%Y-%m-%d %H:%M"
+DAY = "%Y-%m-%d"
+
+
+def now():
+    return int(time.time())
+
+
+def format_ts(ts, fmt=MINUTE):
+    return time.strftime(fmt, time.localtime(ts))
+
+
+def to_epoch(value, fmt=MINUTE):
+    """Accepts an epoch number or a legacy formatted string."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    try:
+        return int(value)
+    except ValueError:
+        return int(time.mktime(time.strptime(value, fmt)))
+
+
+DEADLINE_FORMATS = (MINUTE, "%Y-%m-%d %H:%M:%S", DAY, "%d/%m/%Y")
+
+
+def parse_deadline(value):
+    """Epoch seconds for a deadline, or None if it cannot be read.
+
+    A bare date means the end of that day.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+    value = str(value).strip()
+    for fmt in DEADLINE_FORMATS:
+        try:
+            ts = int(time.mktime(time.strptime(value, fmt)))
+        except ValueError:
+            continue
+        return ts + 24 * 60 * 60 - 1 if fmt in (DAY, "%d/%m/%Y") else ts
+    return None
@@ -1,25 +1,108 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+import time
 from utils import Validator
+from .change_tracker import Trackable, tracker
+from .timestamps import now, format_ts, to_epoch, DAY
+
+_set = object.__setattr__  # loader fast path: bypasses change tracking
+
+class PrivateMessage(Trackable):
+    __slots__ = ("sender", "recipient", "subject", "body", "sent_at", "is_read", "_row_id", "_inbox")
+    _tracked_fields = frozenset({"sender", "recipient", "subject", "body", "sent_at", "is_read"})
 
-class PrivateMessage:
     def __init__(self, sender_name, subject, body):
+        # High-volume object: fill the slots directly, then record one insert
+        _set(self, "sender", sender_name); _set(self, "recipient", None); _set(self, "subject", subject)
+        _set(self, "body", body); _set(self, "sent_at", now()); _set(self, "is_read", False)
+        _set(self, "_row_id", None); _set(self, "_inbox", None)
+        tracker.mark_dirty(self)
+
+    @classmethod
+    def restore(cls, row_id, sender_name, recipient, subject, body, sent_at, is_read):
+        m = cls.__new__(cls)
+        _set(m, "sender", sender_name); _set(m, "recipient", recipient); _set(m, "subject", subject)
+        _set(m, "body", body); _set(m, "sent_at", sent_at); _set(m, "is_read", is_read)
+        _set(m, "_row_id", row_id); _set(m, "_inbox", None)
+        return m
+
+    def __setattr__(self, name, value):
+        if name == "is_read" and self._inbox is not None and bool(value) != bool(self.is_read):
+            self._inbox._unread += -1 if value else 1
+        super().__setattr__(name, value)
+
+    @property
+    def timestamp(self):
+        return format_ts(self.sent_at)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self.sent_at = to_epoch(value)
+
+class Broadcast:
+    """One message or announcement fanned out to many users.
+
+    The text is stored once; each recipient only gets a delivery row.
+    """
+    __slots__ = ("sender", "course", "kind", "subject", "body", "sent_at", "recipients", "_row_id")
+
+    def __init__(self, sender_name, subject, body, recipients, course=None, kind="message"):
         self.sender = sender_name
+        self.course = course
+        self.kind = kind
         self.subject = subject
         self.body = body
-        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        self.is_read = False
+        self.sent_at = now()
+        self.recipients = recipients  # usernames
+        self._row_id = None
+
+    @classmethod
+    def restore(cls, row_id, sender_name, subject, body, sent_at, kind="message"):
+        b = cls.__new__(cls)
+        b.sender, b.course, b.kind, b.subject, b.body = sender_name, None, kind, subject, body
+        b.sent_at, b.recipients, b._row_id = sent_at, [], row_id
+        return b
+
+    def note(self):
+        """Text of the feed entry each recipient gets."""
+        if self.kind == "announcement":
+            return f"Announcement in {self.course.title}: {self.subject}"
+        if self.kind == "reminder":
+            return f"Reminder for {self.course.title}: {self.subject}"
+        return f"New message from {self.sender}"
+
+class DeliveredMessage(PrivateMessage):
+    """Inbox entry for a broadcast; shares the broadcast's text."""
+    __slots__ = ("_broadcast",)
+
+    @classmethod
+    def deliver(cls, broadcast, recipient, is_read=False):
+        m = cls.__new__(cls)
+        _set(m, "sender", broadcast.sender); _set(m, "recipient", recipient); _set(m, "subject", broadcast.subject)
+        _set(m, "body", broadcast.body); _set(m, "sent_at", broadcast.sent_at); _set(m, "is_read", is_read)
+        _set(m, "_row_id", None); _set(m, "_inbox", None); _set(m, "_broadcast", broadcast)
+        return m
+
 class CourseReview:
+    __slots__ = ("student", "__rating", "created_at")
+
     def __init__(self, student_name, rating):
         self.student = student_name
         self.__rating = rating if 1 <= rating <= 5 else 5
-        self.date = datetime.now().strftime("%Y-%m-%d")
+        self.created_at = now()
+
+    @property
+    def date(self):
+        return format_ts(self.created_at, DAY)
+
+class User(Trackable, ABC):
+    _tracked_fields = frozenset({"_username", "_User__password", "_email"})
+    _tracked_lists = frozenset({"notifications", "inbox"})
 
-class User(ABC):
     def __init__(self, username, password, email):
         self._username = username
         self.__password = password
         self._email = email
+        self._unread = 0
         self.notifications = []
         self.inbox = []
 
@@ -41,15 +124,57 @@ class User(ABC):
         return False
 
     def add_notification(self, message):
-        self.notifications.append(f"[{datetime.now().strftime('%H:%M')}] {message}")
+        self.notifications.append(f"[{time.strftime('%H:%M')}] {message}")
 
     def send_message(self, recipient_obj, subject, body):
         new_msg = PrivateMessage(self._username, subject, body)
         recipient_obj.inbox.append(new_msg)
         recipient_obj.add_notification(f"New message from {self._username}")
 
+    def broadcast(self, recipients, subject, body, course=None, kind="message"):
+        """Sends one message (or announcement) to every recipient in a single batched write."""
+        recipients = [u for u in recipients if u is not self]
+        b = Broadcast(self._username, subject, body, [u.get_username() for u in recipients], course, kind)
+        note = f"[{time.strftime('%H:%M')}] {b.note()}"
+        # Deliveries and feed entries are written with the broadcast, not one by one
+        with tracker.paused():
+            for u in recipients:
+                if kind == "message":
+                    u.inbox.append(DeliveredMessage.deliver(b, u.get_username()))
+                u.notifications.append(note)
+        tracker.mark_dirty(b)
+        return b
+
     def get_unread_count(self):
-        return len([m for m in self.inbox if not m.is_read])
+        return self._unread
+
+    def _child_added(self, name, item):
+        if name == "inbox":
+            item.recipient = self._username
+            _set(item, "_inbox", self)
+            if not item.is_read:
+                self._unread += 1
+            tracker.mark_attached(item)
+        else:
+            super()._child_added(name, item)
+
+    def _child_removed(self, name, item):
+        if name == "inbox":
+            if item._inbox is self:
+                _set(item, "_inbox", None)
+                if not item.is_read:
+                    self._unread -= 1
+            tracker.mark_deleted(item)
+        else:
+            super()._child_removed(name, item)
+
+    def _collection_reset(self, name):
+        if name == "inbox":
+            self._unread = 0
+            for m in self.inbox:
+                _set(m, "_inbox", self)
+                self._unread += not m.is_read
+        super()._collection_reset(name)
 
 
 
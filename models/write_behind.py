@@ -0,0 +1,140 @@
+import atexit
+import threading
+import time
+
+
+class WriteBehindWriter:
+    """Writes change sets on a background thread.
+
+    Saves that arrive while a write is pending are merged into it, so a
+    burst of GUI mutations costs a single transaction. A change set that
+    still fails after MAX_ATTEMPTS writes is set aside in `failed` and
+    handed to on_error(changes, exc); later saves carry on without it.
+    """
+
+    RETRY_DELAY = 1.0
+    MAX_ATTEMPTS = 3
+    STOP_TIMEOUT = 10.0
+
+    def __init__(self, db, delay=0.05, on_error=None):
+        self.db = db
+        self.delay = delay  # how long to wait for more saves before writing
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._pending = None
+        self._pending_requests = 0
+        self._writing = None
+        self._submitted = 0
+        self._settled = 0  # requests written or given up
+        self._lost = []    # (first, last) request numbers of change sets given up
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="lms-write-behind", daemon=True)
+        self.saves = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_error = None
+        self.failed = []  # change sets given up, oldest first
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, changes):
+        with self._cond:
+            if self._pending is None:
+                self._pending = changes
+            else:
+                self._pending.merge(changes)
+                self.coalesced += 1
+            self._pending_requests += 1
+            self._submitted += 1
+            self._cond.notify_all()
+            return self._submitted
+
+    def flush(self, timeout=None):
+        """False on timeout, or when a save queued before the call was given up."""
+        if threading.current_thread() is self._thread:
+            return True
+        with self._cond:
+            since, target = self._settled, self._submitted
+            if not self._cond.wait_for(lambda: self._settled >= target or not self._thread.is_alive(), timeout):
+                return False
+            return self._settled >= target and not any(last > since and first <= target
+                                                       for first, last in self._lost)
+
+    def queued(self):
+        """Change sets accepted but not yet durable."""
+        with self._cond:
+            return [c for c in (self._writing, self._pending) if c is not None]
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return self._pending_requests
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": self._pending_requests,
+                "saves": self.saves,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "failed": len(self.failed),
+                "last_latency_ms": self.last_latency * 1000,
+                "avg_latency_ms": self._total_latency / self.saves * 1000 if self.saves else 0.0,
+                "max_latency_ms": self.max_latency * 1000,
+            }
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        # Bounded so a database that will not take writes cannot hang interpreter exit
+        self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._stopped)
+                if self._pending is None:
+                    return
+            time.sleep(self.delay)
+            with self._cond:
+                self._writing, self._pending = self._pending, None
+                first, target, self._pending_requests = self._settled + 1, self._submitted, 0
+            # Newer saves queue behind a failing set instead of being merged into it
+            for attempt in range(self.MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(self.RETRY_DELAY)
+                start = time.perf_counter()
+                try:
+                    self.db.write_changes(self._writing)
+                    break
+                except Exception as e:
+                    with self._cond:
+                        self.errors += 1
+                        self.last_error = e
+            else:
+                with self._cond:
+                    failed, self._writing = self._writing, None
+                    self.failed.append(failed)
+                    self._lost.append((first, target))
+                    self._settled = target
+                    self._cond.notify_all()
+                if self.on_error is not None:
+                    self.on_error(failed, self.last_error)
+                continue
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._writing = None
+                self.saves += 1
+                self.last_latency = elapsed
+                self.max_latency = max(self.max_latency, elapsed)
+                self._total_latency += elapsed
+                self._settled = target
+                self._cond.notify_all()
@@ -0,0 +1,85 @@
+import pytest
+
+from models.change_tracker import tracker
+from models.content_models import Assignment, Submission
+from models.course_models import Course
+from models.database_manager import DatabaseManager
+from models.user_models import Admin, Instructor, Student
+
+
+class LMS:
+    """One database file and the managers opened on it during a test."""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = []
+        self.db = self.registry = self.logs = None
+
+    def open(self):
+        db = DatabaseManager()
+        self.opened.append(db)
+        return db
+
+    def load(self, lazy=False, max_loaded_courses=None):
+        """Loads the stored state into a fresh manager, as a restart would."""
+        tracker.clear()
+        self.db = self.open()
+        users, courses, self.logs = self.db.load_full_state(lazy, max_loaded_courses)
+        self.registry = users.registry
+        return self.registry
+
+    def save(self):
+        self.db.save_full_state(self.registry.users, self.registry.courses, self.logs)
+        self.db.flush()
+
+    def close(self):
+        for db in self.opened:
+            if db.writer is not None:
+                db.writer.stop()
+            db.close()
+
+
+def seed(lms):
+    """Two courses, four students, graded and ungraded submissions and a message, all saved."""
+    registry = lms.load()
+    registry.add_user(Admin("admin", "secret", "admin@gmail.com"))
+    teacher = Instructor("inst0", "secret", "inst0@gmail.com")
+    registry.add_user(teacher)
+    students = [Student(f"stud{i}", "secret", f"stud{i}@gmail.com") for i in range(4)]
+    for s in students:
+        registry.add_user(s)
+    for title, roster in (("Algorithms", students[:3]), ("Databases", students[1:])):
+        course = Course(registry.next_course_id(), title, teacher)
+        registry.add_course(course)
+        for s in roster:
+            course.add_student(s)
+        for n in range(2):
+            course.assignments.append(Assignment(f"HW{n}", "Answer", "2025-06-01 23:59", 10))
+        for i, s in enumerate(roster):
+            a = course.assignments[i % 2]
+            sub = Submission(s, course, a, f"{s.get_username()} on heaps and queues")
+            course.submissions.append(sub)
+            if i == 0:
+                a.set_grade(s.get_username(), 8)
+                sub.is_graded = True
+    students[0].send_message(students[1], "Notes", "Lecture notes attached")
+    lms.save()
+
+
+@pytest.fixture
+def lms(tmp_path, monkeypatch):
+    """An empty LMS on a temporary database; call lms.load() to start."""
+    path = str(tmp_path / "lms_data.db")
+    monkeypatch.setattr(DatabaseManager, "DB_NAME", path)
+    lms = LMS(path)
+    yield lms
+    lms.close()
+    tracker.clear()
+
+
+@pytest.fixture
+def seeded(lms):
+    """The seeded LMS, saved and loaded back eagerly."""
+    seed(lms)
+    lms.load()
+    return lms
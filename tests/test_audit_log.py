@@ -0,0 +1,37 @@
+"""Paging the audit trail while some entries are not written yet."""
+from models.audit_log import AuditLog
+
+
+def messages(rows):
+    return [r["message"] for r in rows]
+
+
+def test_page_includes_unwritten_entries_once(seeded):
+    db, logs = seeded.db, seeded.logs
+    assert isinstance(logs, AuditLog)
+    logs.append("stored", actor="admin")
+    seeded.save()
+    db.start_write_behind(delay=0.5)
+    logs.append("queued", actor="admin")
+    db.save_full_state(seeded.registry.users, seeded.registry.courses, logs)
+    logs.append("unsaved", level="WARNING", actor="admin")
+
+    rows, _ = logs.page(actor="admin")
+    assert messages(rows) == ["unsaved", "queued", "stored"]
+    assert db.saving()  # paging did not wait for the queued save
+    assert messages(logs.page(actor="admin", level="WARNING")[0]) == ["unsaved"]
+
+    seeded.save()
+    rows, _ = logs.page(actor="admin")
+    assert messages(rows) == ["unsaved", "queued", "stored"]
+    assert [r["id"] is None for r in rows] == [False] * 3
+
+
+def test_pages_of_unwritten_entries_end(seeded):
+    logs = seeded.logs
+    for n in range(5):
+        logs.append(f"entry {n}", actor="inst0")
+    rows, after = logs.page(limit=2, actor="inst0")
+    assert messages(rows) == [f"entry {n}" for n in range(4, -1, -1)]
+    assert logs.page(after, 2, actor="inst0")[0] == []
+    assert len(list(logs.query(actor="inst0"))) == 5
@@ -0,0 +1,53 @@
+"""Snapshots and JSON Lines exports restore into a fresh database."""
+import sqlite3
+
+import pytest
+
+from models.database_manager import DatabaseManager
+from models.migrations import MIGRATIONS
+
+
+def counts(db):
+    """Rows per copied table, plus the search index the restore has to rebuild."""
+    with db.pool.reader() as conn:
+        found = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in db._tables(conn)}
+        found["search_index"] = conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    return found
+
+
+def fresh(lms, monkeypatch, tmp_path):
+    monkeypatch.setattr(DatabaseManager, "DB_NAME", str(tmp_path / "fresh.db"))
+    return lms.open()
+
+
+def test_snapshot_restores_into_a_fresh_database(seeded, monkeypatch, tmp_path):
+    expected = counts(seeded.db)
+    assert expected["submissions"] == 6 and expected["search_index"] > 0
+    path = seeded.db.snapshot(str(tmp_path / "backup.db"))
+    db = fresh(seeded, monkeypatch, tmp_path)
+    db.restore(path)
+    assert counts(db) == expected
+    assert len(db.search("heaps", seeded.registry.get_user("admin"))) == 6
+
+
+def test_export_imports_into_a_fresh_database(seeded, monkeypatch, tmp_path):
+    expected = counts(seeded.db)
+    exported = seeded.db.export_jsonl(str(tmp_path / "export"))
+    assert {t: expected[t] for t in exported} == exported
+    db = fresh(seeded, monkeypatch, tmp_path)
+    db.import_jsonl(str(tmp_path / "export"))
+    assert counts(db) == expected
+    assert len(db.search("heaps", seeded.registry.get_user("admin"))) == 6
+
+
+def test_restore_rejects_a_newer_schema(seeded, monkeypatch, tmp_path):
+    path = seeded.db.snapshot(str(tmp_path / "backup.db"))
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version = {MIGRATIONS[-1][0] + 1}")
+    conn.commit()
+    conn.close()
+    db = fresh(seeded, monkeypatch, tmp_path)
+    before = counts(db)
+    with pytest.raises(sqlite3.DatabaseError, match="newer version"):
+        db.restore(path)
+    assert counts(db) == before
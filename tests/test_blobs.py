@@ -0,0 +1,19 @@
+"""Content kept in the blob store while more than one database is open."""
+from models.content_models import Submission
+
+
+def test_save_through_first_of_two_managers(seeded):
+    registry = seeded.registry
+    other = seeded.open()
+    course = registry.get_course("100")
+    sub = Submission(registry.get_user("stud2"), course, course.get_assignment("HW1"), "written while two are open")
+    course.submissions.append(sub)
+    seeded.save()
+    assert sub.content == "written while two are open"
+    assert sub._blob_store is seeded.db.blobs
+    assert other.blobs._pending == {}
+
+    registry = seeded.load()
+    contents = {s.content for s in registry.get_course("100").submissions}
+    assert "written while two are open" in contents
+    assert all(s.verify() for s in registry.get_course("100").submissions)
@@ -0,0 +1,47 @@
+"""Chunked imports reject bad and duplicate rows and keep the rest."""
+from models.bulk_import import BulkImporter, read_rows
+
+USERS = """username,password,email,role
+new0,secret,new0@gmail.com,Student
+new1,secret,new1@gmail.com,Instructor
+new0,secret,new0@gmail.com,Student
+bad0,secret,bad0@yahoo.com,Student
+new2,secret,new2@gmail.com,Student
+stud0,secret,stud0@gmail.com,Student
+bad1,short,bad1@gmail.com,Student
+new1,secret,new1@gmail.com,Instructor
+bad2,secret,bad2@gmail.com,Janitor
+bad3,secret,,Student
+new3,secret,new3@gmail.com,Student
+new3,secret,new3@gmail.com,Student
+"""
+
+
+def test_chunked_user_import(seeded, tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text(USERS)
+    errors, progress = [], []
+    importer = BulkImporter(seeded.db, "users", chunk_size=2,
+                            on_error=lambda line, row, reason: errors.append((line, reason)),
+                            on_progress=lambda stats: progress.append(stats.rows), progress_every=4)
+    stats = importer.run(read_rows(str(path)))
+
+    assert (stats.rows, stats.imported, stats.duplicates, stats.errors) == (12, 4, 4, 4)
+    # Chunks of two: new0 and new1 come back in later chunks, so they are caught in the database
+    assert sorted(errors) == [
+        (4, "already in the database"),
+        (5, "e-mail must be a gmail.com address"),
+        (7, "already in the database"),
+        (8, "password must be at least 6 characters"),
+        (9, "already in the database"),
+        (10, "role must be one of Admin, Instructor, Student"),
+        (11, "missing email"),
+        (13, "duplicate in input"),
+    ]
+    assert progress == [4, 8, 12, 12]
+
+    registry = seeded.load()
+    for name, role in (("new0", "Student"), ("new1", "Instructor"), ("new2", "Student"), ("new3", "Student")):
+        assert registry.get_user(name).get_role() == role
+    assert all(registry.get_user(f"bad{i}") is None for i in range(4))
+    assert registry.stats.verify() == []
@@ -0,0 +1,75 @@
+"""Course lookup indexes stay in step with the lists they index."""
+import pytest
+
+from models.content_models import Assignment, Submission
+
+
+def expected(course):
+    assignments, submissions = {}, {}
+    for a in course.assignments:
+        assignments.setdefault(a.title, []).append(a)
+    for s in course.submissions:
+        submissions.setdefault((s.student.get_username(), s.assignment.title), []).append(s)
+    return {s.get_username() for s in course.students}, assignments, submissions
+
+
+def indexes(course):
+    course._ensure_content()
+    return course._enrolled, course._assignment_index, course._submission_index
+
+
+def assert_consistent(registry):
+    for course in registry.courses:
+        assert indexes(course) == expected(course)
+    assert registry.stats.verify() == []
+
+
+def test_list_replacement(seeded):
+    registry = seeded.registry
+    course = registry.get_course("100")
+    course.students = [registry.get_user("stud3")]
+    course.assignments = course.assignments[:1] + [Assignment("HW2", "Answer", "2025-06-01 23:59", 10)]
+    course.submissions = [s for s in course.submissions if s.student.get_username() != "stud0"]
+    assert_consistent(registry)
+    assert not course.is_enrolled("stud0") and course.is_enrolled("stud3")
+    assert course.get_assignment("HW1") is None and course.get_assignment("HW2") is not None
+    assert not course.has_submitted("stud0", "HW0")
+
+
+def test_removal(seeded):
+    registry = seeded.registry
+    course = registry.get_course("100")
+    course.remove_student(registry.get_user("stud1"))
+    course.submissions.remove(course.get_submission("stud1", "HW1"))
+    course.assignments.pop()
+    assert_consistent(registry)
+    assert not course.is_enrolled("stud1")
+    assert course.get_submission("stud1", "HW1") is None
+    assert course.get_assignment("HW1") is None
+
+
+def test_duplicate_keys(seeded):
+    registry = seeded.registry
+    course = registry.get_course("100")
+    first = course.get_submission("stud0", "HW0")
+    again = Submission(first.student, course, first.assignment, "second try")
+    course.submissions.append(again)
+    assert course.get_submission("stud0", "HW0") is again
+    course.submissions.remove(again)
+    assert course.get_submission("stud0", "HW0") is first
+    assert_consistent(registry)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_reload(seeded, lazy):
+    registry = seeded.registry
+    course = registry.get_course("101")
+    course.remove_student(registry.get_user("stud3"))
+    course.submissions.remove(course.get_submission("stud3", "HW0"))
+    course.assignments.append(Assignment("HW2", "Answer", "2025-06-01 23:59", 10))
+    seeded.save()
+    registry = seeded.load(lazy)
+    assert_consistent(registry)
+    course = registry.get_course("101")
+    assert [a.title for a in course.assignments] == ["HW0", "HW1", "HW2"]
+    assert not course.is_enrolled("stud3") and not course.has_submitted("stud3", "HW0")
@@ -0,0 +1,27 @@
+"""Deadlines are parsed into due_at once, whatever the user typed."""
+import pytest
+
+from models.content_models import Assignment
+
+
+@pytest.mark.parametrize("deadline", [None, "end of term", ""])
+def test_unreadable_deadline_saves(seeded, deadline):
+    course = seeded.registry.get_course("100")
+    course.assignments.append(Assignment("Essay", "Long answer", deadline, 20))
+    assignment = course.get_assignment("Essay")
+    assert assignment.due_at is None
+    assert not assignment.is_overdue()
+    seeded.save()
+    stored = seeded.load().get_course("100").get_assignment("Essay")
+    assert (stored.deadline, stored.due_at) == (deadline, None)
+
+
+def test_moved_deadline_updates_due_at(seeded):
+    assignment = seeded.registry.get_course("100").get_assignment("HW0")
+    due = assignment.due_at
+    assignment.deadline = "2025-06-02 23:59"
+    assert assignment.due_at == due + 24 * 60 * 60
+    assignment.deadline = "whenever"
+    assert assignment.due_at is None
+    seeded.save()
+    assert seeded.load().get_course("100").get_assignment("HW0").due_at is None
@@ -0,0 +1,116 @@
+"""Gradebook statistics against a plain-Python recount."""
+import statistics
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from models.content_models import Assignment  # noqa: E402
+
+SCORES = {  # student -> {assignment: score}; missing means ungraded
+    "stud0": {"HW0": 8, "HW1": 3, "Quiz": 20},
+    "stud1": {"HW0": 10, "Quiz": 5},
+    "stud2": {"HW1": 7},
+}
+
+
+@pytest.fixture
+def course(seeded):
+    course = seeded.registry.get_course("100")
+    course.assignments.append(Assignment("Quiz", "Answer", "2025-06-01 23:59", 25))
+    for a in course.assignments:
+        for student in list(a.grades()):
+            a.remove_grade(student)
+    for student, grades in SCORES.items():
+        for title, score in grades.items():
+            course.get_assignment(title).set_grade(student, score)
+    return course
+
+
+def percent(course, student, title):
+    a = course.get_assignment(title)
+    return a.grades()[student] * 100.0 / a.max_marks
+
+
+def graded(course, title):
+    return [s for s in SCORES if title in SCORES[s]]
+
+
+def test_assignment_stats(course):
+    stats = course.gradebook().assignment_stats()
+    for title in ("HW0", "HW1", "Quiz"):
+        marks = [SCORES[s][title] for s in graded(course, title)]
+        assert stats[title]["count"] == len(marks)
+        assert stats[title]["mean"] == pytest.approx(statistics.mean(marks))
+        assert stats[title]["median"] == pytest.approx(statistics.median(marks))
+        assert stats[title]["std"] == pytest.approx(statistics.pstdev(marks))
+        assert (stats[title]["min"], stats[title]["max"]) == (min(marks), max(marks))
+    pct = course.gradebook().assignment_stats(percent=True)["Quiz"]
+    assert pct["mean"] == pytest.approx(statistics.mean(percent(course, s, "Quiz") for s in graded(course, "Quiz")))
+
+
+def test_percentiles_and_histogram(course):
+    book = course.gradebook()
+    values = sorted(percent(course, s, t) for s in SCORES for t in SCORES[s])
+    assert list(book.percentiles().values()) == pytest.approx(statistics.quantiles(values, n=4, method="inclusive"))
+    counts, edges = book.histogram(bins=4)
+    assert edges == [0, 25, 50, 75, 100]
+    assert counts == [sum(1 for v in values if lo <= v < hi or hi == 100 and v == 100)
+                      for lo, hi in zip(edges, edges[1:])]
+    hw1 = [percent(course, s, "HW1") for s in graded(course, "HW1")]
+    assert book.percentiles((50,), "HW1") == {50: pytest.approx(statistics.median(hw1))}
+
+
+@pytest.mark.parametrize("missing", ["skip", "zero"])
+def test_weighted_totals(course, missing):
+    totals = course.gradebook().weighted_totals(missing=missing)
+    for student in course.gradebook().students:
+        earned = possible = 0.0
+        for a in course.assignments:
+            if student in a.grades():
+                earned += a.grades()[student]
+                possible += a.max_marks
+            elif missing == "zero":
+                possible += a.max_marks
+        assert totals[student] == pytest.approx(earned * 100.0 / possible if possible else 0.0)
+
+
+def test_student_with_no_grades(course):
+    book = course.gradebook()
+    assert "stud9" not in book.students
+    course.get_assignment("HW0").set_grade("stud9", 5)
+    course.get_assignment("HW0").remove_grade("stud9")
+    assert book.weighted_totals()["stud9"] == 0.0
+    assert "stud9" in book.at_risk()
+
+
+def test_at_risk(course):
+    book = course.gradebook()
+    # stud0 40/45, stud1 15/35, stud2 7/10
+    assert book.at_risk() == ["stud1"]
+    assert book.at_risk(max_missing=1) == ["stud1", "stud2"]
+    # Only HW1 counts: stud0 has 30%, stud1 has nothing graded there
+    assert book.at_risk(weights={"HW1": 1}) == ["stud0", "stud1"]
+
+
+def test_matrix_follows_grade_changes(course):
+    book = course.gradebook()
+    hw0, quiz = course.get_assignment("HW0"), course.get_assignment("Quiz")
+    hw0.set_grade("stud2", 4)
+    quiz.remove_grade("stud0")
+    hw0.set_grade("stud3", 9)  # not enrolled in this course, still gets a row
+    assert course.gradebook() is book
+    for i, student in enumerate(book.students):
+        for j, a in enumerate(book.assignments):
+            assert book.mask[i, j] == (student in a.grades())
+            assert book.scores[i, j] == a.grades().get(student, 0)
+    assert book.assignment_stats()["HW0"]["count"] == 4
+
+
+def test_removed_grade_stays_removed(seeded):
+    assignment = seeded.registry.get_course("100").get_assignment("HW0")
+    assignment.remove_grade("stud0")
+    assignment.set_grade("stud2", 5)
+    assignment.remove_grade("stud2")
+    seeded.save()
+    assert seeded.load().get_course("100").get_assignment("HW0").grades() == {}
@@ -0,0 +1,53 @@
+"""Pooled connections count and time the queries they run."""
+import pytest
+
+from models.instrumentation import metrics
+
+STUDENTS = "SELECT username FROM users WHERE role = ?"
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def students(db, times=1):
+    with db.pool.reader() as conn:
+        for _ in range(times):
+            assert len(conn.execute(STUDENTS, ("Student",)).fetchall()) == 4
+
+
+def test_queries_are_counted_and_timed(seeded, recording):
+    students(seeded.db, 3)
+    stats = recording.queries[STUDENTS]
+    assert (stats.latency.count, stats.rows) == (3, 12)
+    assert stats.latency.sum > 0 and stats.latency.max <= stats.latency.sum
+    assert sum(stats.latency.counts) == 3
+    assert recording.statements["SELECT"] >= 3
+    assert f'lms_query_seconds_count{{query="{STUDENTS}"}} 3' in recording.to_prometheus()
+
+
+def test_spans_count_the_queries_inside_them(seeded, recording):
+    with recording.span("test.lookup"):
+        students(seeded.db, 2)
+    histogram, queries, seconds = recording.spans["test.lookup"]
+    assert (histogram.count, queries) == (1, 2)
+    assert 0 < seconds <= histogram.sum
+
+    seeded.registry.get_user("stud0").update_email("stud0.new@gmail.com")
+    seeded.save()
+    histogram, queries, _ = recording.spans["write_changes"]
+    assert histogram.count == 1 and queries > 0
+    assert recording.statements["COMMIT"] >= 1
+    assert recording.to_dict()["spans"]["test.lookup"]["queries"] == 2
+
+
+def test_nothing_is_recorded_while_disabled(seeded, recording):
+    recording.disable()
+    students(seeded.db)
+    seeded.save()
+    assert recording.queries == {} and recording.spans == {} and not recording.statements
@@ -0,0 +1,38 @@
+"""Opening a new or older database brings it to the current schema."""
+import sqlite3
+
+from models.migrations import MIGRATIONS, migrate, schema_version
+
+
+def test_fresh_database_is_current(lms):
+    lms.load()
+    with lms.db.pool.reader() as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+
+
+def test_migrates_a_version_1_database(lms):
+    conn = sqlite3.connect(lms.path)
+    MIGRATIONS[0][1](conn.cursor())
+    conn.executescript("""
+        PRAGMA user_version = 1;
+        INSERT INTO users VALUES ('inst0', 'secret', 'inst0@gmail.com', 'Instructor');
+        INSERT INTO users VALUES ('stud0', 'secret', 'stud0@gmail.com', 'Student');
+        INSERT INTO courses VALUES ('100', 'Algorithms', 'inst0');
+        INSERT INTO enrollments VALUES ('stud0', '100');
+        INSERT INTO assignments (course_cid, title, description, deadline, max_marks)
+            VALUES ('100', 'HW0', 'Answer', '2025-06-01 23:59', 10);
+        INSERT INTO submissions (course_cid, assignment_title, student_username, content, date, is_graded)
+            VALUES ('100', 'HW0', 'stud0', 'my answer', '2025-05-30 10:00', 0);
+    """)
+    conn.commit()
+    conn.close()
+
+    registry = lms.load()
+    course = registry.get_course("100")
+    assert [s.get_username() for s in course.students] == ["stud0"]
+    assert course.get_assignment("HW0").due_at is not None
+    assert course.get_submission("stud0", "HW0").content == "my answer"
+    with lms.db.pool.reader() as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+        # Reopening finds nothing left to do
+        assert migrate(conn) == MIGRATIONS[-1][0]
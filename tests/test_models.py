@@ -0,0 +1,30 @@
+"""Slotted high-volume models and their epoch timestamps."""
+import pytest
+
+from models.content_models import Assignment, LectureMaterial, Submission
+from models.timestamps import format_ts, to_epoch
+from models.user_models import CourseReview, PrivateMessage
+
+
+@pytest.mark.parametrize("cls", [PrivateMessage, Submission, CourseReview, LectureMaterial, Assignment])
+def test_slotted(cls):
+    assert not hasattr(cls.__new__(cls), "__dict__")
+
+
+def test_timestamps_are_epoch_seconds(seeded):
+    registry = seeded.registry
+    sub = registry.get_course("100").get_submission("stud0", "HW0")
+    message = registry.get_user("stud1").inbox[0]
+    assert isinstance(sub.submitted_at, int) and isinstance(message.sent_at, int)
+    assert sub.date == format_ts(sub.submitted_at)
+
+    # The formatted forms are still accepted on write
+    sub.date = "2025-05-30 10:00"
+    message.timestamp = "2025-05-30 09:00"
+    assert sub.submitted_at == to_epoch("2025-05-30 10:00")
+    seeded.save()
+    registry = seeded.load()
+    sub = registry.get_course("100").get_submission("stud0", "HW0")
+    message = registry.get_user("stud1").inbox[0]
+    assert (sub.submitted_at, sub.date) == (to_epoch("2025-05-30 10:00"), "2025-05-30 10:00")
+    assert (message.sent_at, message.timestamp) == (to_epoch("2025-05-30 09:00"), "2025-05-30 09:00")
@@ -0,0 +1,86 @@
+"""Saving only the tracked changes and loading them back."""
+import pytest
+
+from models.change_tracker import tracker
+from models.content_models import Assignment, Submission
+from models.course_models import Course
+from models.user_models import Student
+
+
+def snapshot(registry):
+    """Everything a save has to preserve, as plain values."""
+    users = {u.get_username(): (u.get_role(), u.get_email(), sorted((m.sender, m.subject, m.is_read) for m in u.inbox))
+             for u in registry.users}
+    courses = {}
+    for c in registry.courses:
+        courses[c.cid] = (
+            c.title, c.instructor.get_username(), sorted(s.get_username() for s in c.students),
+            sorted((a.title, a.deadline, a.due_at, a.max_marks, sorted(a.grades().items())) for a in c.assignments),
+            sorted((s.student.get_username(), s.assignment.title, s.content, s.is_graded) for s in c.submissions),
+        )
+    return users, courses
+
+
+def test_loading_leaves_nothing_to_save(seeded):
+    assert not tracker.has_changes()
+
+
+def test_changes_round_trip(seeded):
+    registry = seeded.registry
+    course = registry.get_course("101")
+    course.assignments.append(Assignment("Project", "Build it", "2025-07-01", 30))
+    course.get_assignment("HW0").set_grade("stud2", 9)
+    course.remove_student(registry.get_user("stud3"))
+    registry.get_user("stud1").inbox[0].is_read = True
+    seeded.save()
+    before = snapshot(registry)
+    assert snapshot(seeded.load()) == before
+
+
+def test_save_writes_only_changed_rows(seeded):
+    with seeded.db.pool.reader() as conn:
+        ids = conn.execute("SELECT id, student_username FROM submissions ORDER BY id").fetchall()
+    registry = seeded.registry
+    registry.get_course("100").submissions[1].is_graded = True
+    seeded.save()
+    with seeded.db.pool.reader() as conn:
+        # Rows are updated in place, never deleted and inserted again
+        assert conn.execute("SELECT id, student_username FROM submissions ORDER BY id").fetchall() == ids
+        assert conn.execute("SELECT COUNT(*) FROM submissions WHERE is_graded = 1").fetchone()[0] == 3
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(seeded, lazy):
+    before = snapshot(seeded.registry)
+    assert snapshot(seeded.load(lazy)) == before
+
+
+def count_selects(lms):
+    """SELECTs a fresh load of the stored state runs."""
+    db = lms.open()
+    statements = []
+    # The loader reuses this thread's pooled reader, so the callback sees every query
+    with db.pool.reader() as conn:
+        conn.set_trace_callback(statements.append)
+    with tracker.paused():
+        db.load_full_state()
+    return sum(1 for sql in statements if sql.lstrip().upper().startswith("SELECT"))
+
+
+def test_load_query_count_does_not_grow(seeded):
+    small = count_selects(seeded)
+    assert small > 0
+    registry = seeded.registry
+    teacher = registry.get_user("inst0")
+    for n in range(5):
+        course = Course(registry.next_course_id(), f"Extra {n}", teacher)
+        registry.add_course(course)
+        course.assignments.append(Assignment("HW0", "Answer", "2025-06-01", 10))
+        for i in range(10):
+            s = Student(f"extra{n}_{i}", "secret", f"extra{n}_{i}@gmail.com")
+            registry.add_user(s)
+            course.add_student(s)
+            course.submissions.append(Submission(s, course, course.assignments[0], "answer"))
+            course.assignments[0].set_grade(s.get_username(), i)
+    seeded.save()
+    assert count_selects(seeded) == small
@@ -0,0 +1,11 @@
+"""Hot lookups must be answered from an index, never a full table scan."""
+import pytest
+
+from models.migrations import HOT_QUERIES, unindexed_queries
+
+
+@pytest.mark.parametrize("sql", HOT_QUERIES)
+def test_uses_an_index(lms, sql):
+    lms.load()
+    with lms.db.pool.reader() as conn:
+        assert unindexed_queries(conn, [sql]) == []
@@ -0,0 +1,21 @@
+"""Reports agree with the models they summarise."""
+from models.report_models import UserReport
+
+
+def unread(db):
+    return {row[0]: row[6] for row in UserReport().rows(db)}
+
+
+def test_unread_counts_broadcasts(seeded):
+    registry = seeded.registry
+    registry.get_user("inst0").broadcast(registry.get_course("101").students, "Exam", "Friday at nine")
+    seeded.save()
+    counts = unread(seeded.db)
+    assert {s.get_username(): counts[s.get_username()] for s in registry.users_by_role("Student")} == \
+        {s.get_username(): s.get_unread_count() for s in registry.users_by_role("Student")}
+    assert counts["stud1"] == 2
+
+    # Reading a delivery invalidates the cached report
+    registry.get_user("stud1").inbox[-1].is_read = True
+    seeded.save()
+    assert unread(seeded.db)["stud1"] == 1
@@ -0,0 +1,39 @@
+"""Search results are scoped to what the user may read."""
+import sqlite3
+
+from models.migrations import MIGRATIONS
+
+
+def kinds(db, user, text):
+    return sorted(r["kind"] for r in db.search(text, user))
+
+
+def test_broadcast_found_by_recipients(seeded):
+    registry = seeded.registry
+    registry.get_user("inst0").broadcast(registry.get_course("101").students, "Exam room", "Bring a calculator")
+    seeded.save()
+    assert kinds(seeded.db, registry.get_user("stud3"), "calculator") == ["broadcast"]
+    assert kinds(seeded.db, registry.get_user("inst0"), "calculator") == ["broadcast"]
+    assert kinds(seeded.db, registry.get_user("stud0"), "calculator") == []
+
+
+def test_private_message_found_by_its_recipient_only(seeded):
+    registry = seeded.registry
+    assert kinds(seeded.db, registry.get_user("stud1"), "lecture notes") == ["message"]
+    assert kinds(seeded.db, registry.get_user("stud2"), "lecture notes") == []
+
+
+def test_migration_rescopes_stored_broadcasts(seeded):
+    registry = seeded.registry
+    registry.get_user("inst0").broadcast(registry.get_course("101").students, "Exam room", "Bring a calculator")
+    seeded.save()
+    seeded.close()
+    # Index entries as migration 8 used to write them
+    conn = sqlite3.connect(seeded.path)
+    conn.execute("UPDATE search_index SET scope = 'b' || ref || ' u' || lower(hex(author)) WHERE kind = 'broadcast'")
+    conn.execute(f"PRAGMA user_version = {MIGRATIONS[-1][0] - 1}")
+    conn.commit()
+    conn.close()
+
+    registry = seeded.load()
+    assert kinds(seeded.db, registry.get_user("stud3"), "calculator") == ["broadcast"]
@@ -0,0 +1,77 @@
+"""The JSON service keeps SQLite reads off its event loop."""
+import asyncio
+import json
+import threading
+
+from models.service import LMSService
+
+
+async def call(host, port, method, path, body=None, token=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode() if body is not None else b""
+    auth = f"Authorization: Bearer {token}\r\n" if token else ""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\n{auth}Connection: close\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    payload = (await reader.read()).split(b"\r\n\r\n", 1)[1]
+    writer.close()
+    return status, json.loads(payload)
+
+
+def test_course_content_is_read_in_the_pool(seeded):
+    db = seeded.open()
+    threads = []
+    for name in ("_load_course_content", "_load_grades"):
+        def spy(*args, _real=getattr(db, name)):
+            threads.append(threading.current_thread().name)
+            return _real(*args)
+        setattr(db, name, spy)
+
+    async def scenario():
+        service = LMSService(db, readers=2)
+        host, port = await service.start("127.0.0.1", 0)
+        try:
+            _, body = await call(host, port, "POST", "/login", {"username": "inst0", "password": "secret"})
+            token = body["token"]
+            status, course = await call(host, port, "GET", "/courses/100", token=token)
+            assert status == 200 and [a["title"] for a in course["assignments"]] == ["HW0", "HW1"]
+            status, subs = await call(host, port, "GET", "/courses/101/assignments/HW0/submissions", token=token)
+            assert status == 200 and {s["student"]: s["grade"] for s in subs["submissions"]} == \
+                {"stud1": 8, "stud3": "Pending"}
+            status, _ = await call(host, port, "POST", "/courses/101/assignments/HW0/grades",
+                                   {"student": "stud3", "score": 7}, token=token)
+            assert status == 200
+        finally:
+            await service.stop()
+        return service
+
+    service = asyncio.run(scenario())
+    assert threads and all(t.startswith("lms-reader") for t in threads)
+    assert service.registry.stats.verify() == []
+
+
+def test_resubmitting_drops_the_grade(seeded):
+    db = seeded.open()
+
+    async def scenario():
+        service = LMSService(db, readers=2)
+        host, port = await service.start("127.0.0.1", 0)
+        try:
+            _, body = await call(host, port, "POST", "/login", {"username": "stud1", "password": "secret"})
+            status, _ = await call(host, port, "POST", "/courses/101/assignments/HW0/submission",
+                                   {"content": "a better answer"}, token=body["token"])
+            assert status == 200
+            _, body = await call(host, port, "POST", "/login", {"username": "inst0", "password": "secret"})
+            _, subs = await call(host, port, "GET", "/courses/101/assignments/HW0/submissions", token=body["token"])
+            assert {s["student"]: (s["graded"], s["grade"]) for s in subs["submissions"]} == \
+                {"stud1": (False, "Pending"), "stud3": (False, "Pending")}
+        finally:
+            await service.stop()
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.registry.stats.verify() == []
+    course = seeded.load().get_course("101")
+    assert course.get_assignment("HW0").get_grade("stud1") == "Pending"
+    assert course.get_submission("stud1", "HW0").content == "a better answer"
@@ -0,0 +1,93 @@
+"""Every counter-changing mutation keeps DashboardStats equal to a recount."""
+import pytest
+
+from models.archive import TermArchive
+from models.autograder import AutoGrader, KeywordGrader
+from models.content_models import Submission
+from models.user_models import Student
+
+
+@pytest.fixture(params=["eager", "lazy"])
+def loaded(seeded, request):
+    if request.param == "lazy":
+        seeded.load(lazy=True)
+    return seeded
+
+
+def test_loaded_counters(loaded):
+    stats = loaded.registry.stats
+    assert stats.verify() == []
+    assert (stats.total("students"), stats.total("submissions"), stats.total("ungraded")) == (6, 6, 4)
+    assert stats.user_count("Student") == 4
+
+
+def test_enroll(loaded):
+    registry = loaded.registry
+    s = Student("stud9", "secret", "stud9@gmail.com")
+    registry.add_user(s)
+    course = registry.get_course("100")
+    course.add_student(s)
+    course.add_student(s)
+    assert course.count("students") == 4
+    assert registry.stats.verify() == []
+
+
+def test_submit_and_grade(loaded):
+    registry = loaded.registry
+    course = registry.get_course("100")
+    assignment = course.get_assignment("HW1")
+    sub = Submission(registry.get_user("stud2"), course, assignment, "a late answer")
+    course.submissions.append(sub)
+    assert registry.stats.verify() == []
+    assignment.set_grade("stud2", 6)
+    sub.is_graded = True
+    assert registry.stats.verify() == []
+    loaded.save()
+    assert loaded.load().stats.verify() == []
+
+
+def test_withdraw(loaded):
+    registry = loaded.registry
+    registry.get_course("100").get_assignment("HW1").set_grade("stud1", 4)
+    registry.remove_user(registry.get_user("stud1"))
+    assert registry.stats.verify() == []
+    loaded.save()
+    registry = loaded.load()
+    assert registry.stats.verify() == []
+    assert all(not c.is_enrolled("stud1") for c in registry.courses)
+
+
+def test_read_message(loaded):
+    registry = loaded.registry
+    inbox = registry.get_user("stud1").inbox
+    assert registry.stats.unread(registry.get_user("stud1")) == 1
+    inbox[0].is_read = True
+    assert registry.stats.verify() == []
+    inbox.pop()
+    assert registry.stats.verify() == []
+
+
+@pytest.mark.parametrize("regrade", [False, True])
+def test_autograde(loaded, regrade):
+    registry = loaded.registry
+    stats = AutoGrader(loaded.db, KeywordGrader(["heaps", "queues"]), workers=1).grade("100", "HW0", regrade)
+    assert stats.graded == (2 if regrade else 1)
+    assert registry.get_course("100").count("ungraded") == 1
+    assert registry.stats.total("ungraded") == 3
+    assert registry.stats.verify() == []
+
+
+def test_lazy_eviction(seeded):
+    registry = seeded.load(lazy=True, max_loaded_courses=1)
+    for cid in ("100", "101", "100"):
+        assert len(registry.get_course(cid).submissions) == 3
+        assert registry.stats.verify() == []
+    assert not registry.get_course("101")._content_resident()
+
+
+def test_archive(loaded):
+    registry = loaded.registry
+    assert TermArchive(loaded.db).archive("2025-spring", ["100"]) == 1
+    assert registry.get_course("100") is None
+    assert registry.stats.verify() == []
+    assert loaded.load().stats.verify() == []
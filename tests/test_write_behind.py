@@ -0,0 +1,12 @@
+"""Saves queued on the write-behind thread."""
+
+
+def test_saving_reports_queued_saves_without_blocking(seeded):
+    seeded.db.start_write_behind(delay=0.2)
+    assert not seeded.db.saving()
+    seeded.registry.get_user("stud0").update_email("stud0.new@gmail.com")
+    seeded.db.save_full_state(seeded.registry.users, seeded.registry.courses, seeded.logs)
+    assert seeded.db.saving()
+    assert seeded.db.flush(timeout=5)
+    assert not seeded.db.saving()
+    assert seeded.load().get_user("stud0").get_email() == "stud0.new@gmail.com"
@@ -1,9 +1,11 @@
 import re
 
 class Validator:
+    GMAIL = re.compile(r"[^@]+@gmail\.com$")
+
     @staticmethod
     def validate_gmail(email):
-        return re.match(r"[^@]+@gmail\.com$", email)
+        return Validator.GMAIL.match(email)
 
     @staticmethod
     def validate_password(password):